@@ -0,0 +1,24 @@
+import os
+import multiprocessing
+
+# Production serving for webapp.py: gunicorn with threaded workers.
+# Sizing notes and benchmark numbers are in README.md ("Production Serving").
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv('WEB_CONCURRENCY') or min(4, multiprocessing.cpu_count() * 2))
+threads = int(os.getenv('GUNICORN_THREADS') or '8')
+worker_class = 'gthread'
+# OpenAI calls allow 60s and org-commit fan-outs can exceed that on a cold cache
+timeout = int(os.getenv('GUNICORN_TIMEOUT') or '180')
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS') or '2000')
+max_requests_jitter = 200
+accesslog = '-'
+errorlog = '-'
+
+# Workers share upstream responses through the SQLite cache unless told otherwise
+os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+os.environ.setdefault('CACHE_PATH', '/tmp/daily-digest-cache.sqlite3')
+# Warm the daily window around the 09:00 SGT cutoff (one worker runs it, all share the cache)
+os.environ.setdefault('PREFETCH_ENABLED', '1')
@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# Benchmark for the Trello board-activity classifier (src/trello_rules.py) against the
+# previous two-pass implementation, on synthetic action streams of 100k+ actions.
+# Both produce the same groups; the script checks that before reporting timings.
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import trello_rules
+
+LISTS = ["Backlog", "In Progress", "Doing", "Review", "Completed", "Done", "Meeting Notes"]
+TYPES = ["updateCard", "createCard", "copyCard", "moveCardToBoard", "commentCard", "commentCard",
+         "updateCheckItemStateOnCard", "addAttachmentToCard", "deleteAttachmentFromCard",
+         "addMemberToCard", "updateCard", "updateCard"]
+
+
+def synth_actions(n: int, cards: int, seed: int) -> list:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        t = rng.choice(TYPES)
+        cid = f"card{rng.randrange(cards)}"
+        data = {"card": {"id": cid, "name": f"Card {cid}"}}
+        if t in ("updateCard", "createCard", "copyCard", "moveCardToBoard"):
+            data["listAfter" if t == "updateCard" else "list"] = {"name": rng.choice(LISTS)}
+        elif t == "commentCard":
+            data["text"] = rng.choice(["looks good", "see https://example.com/pr/1", "ok", "http://x.y"])
+        elif t == "updateCheckItemStateOnCard":
+            data["checkItem"] = {"name": "item", "state": rng.choice(["complete", "incomplete"])}
+        elif t == "addAttachmentToCard":
+            data["attachment"] = {"name": "f.pdf", "url": "https://example.com/f.pdf"}
+        out.append({"id": f"a{i}", "type": t, "date": f"2026-01-01T00:00:{i % 60:02d}.000Z",
+                    "data": data, "memberCreator": {"fullName": "Member"}})
+    return out
+
+
+def legacy_groups(actions: list, in_progress_list=None, completed_list=None) -> list:
+    # The two-pass classifier the digest used before trello_rules, kept as the baseline
+    def norm(s):
+        return (s or '').strip().lower()
+
+    target_in_progress = {'in progress', 'in-progress', 'doing'} | ({norm(in_progress_list)} if in_progress_list else set())
+    target_completed = {'completed', 'complete', 'done'} | ({norm(completed_list)} if completed_list else set())
+
+    def action_card_id(a):
+        return ((a.get('data') or {}).get('card') or {}).get('id')
+
+    def action_list_after(a):
+        d = a.get('data') or {}
+        return ((d.get('listAfter') or {}).get('name')) or ((d.get('list') or {}).get('name'))
+
+    def is_move_or_create_into_target(a):
+        t = (a.get('type') or '').strip()
+        la = norm(action_list_after(a))
+        return ((t == 'updateCard' and la in target_in_progress.union(target_completed)) or
+                (t == 'createCard' and la in target_in_progress.union(target_completed)) or
+                (t == 'copyCard' and la in target_in_progress.union(target_completed)) or
+                (t == 'moveCardToBoard' and la in target_in_progress.union(target_completed)))
+
+    def is_comment_with_link(a):
+        txt = ((a.get('data') or {}).get('text') or '')
+        return (a.get('type') or '').strip() == 'commentCard' and ('http://' in txt or 'https://' in txt)
+
+    def is_checklist_complete(a):
+        state = (((a.get('data') or {}).get('checkItem') or {}).get('state') or '').strip().lower()
+        return (a.get('type') or '').strip() == 'updateCheckItemStateOnCard' and state == 'complete'
+
+    def is_attachment_added(a):
+        return (a.get('type') or '').strip() == 'addAttachmentToCard'
+
+    def column_key_from_action(a):
+        n = norm(action_list_after(a))
+        if n in target_in_progress:
+            return 'In Progress'
+        if n in target_completed:
+            return 'Completed'
+        return None
+
+    card_target_map = {}
+    for a in actions:
+        if is_move_or_create_into_target(a):
+            cid = action_card_id(a)
+            col = column_key_from_action(a)
+            if cid and col and card_target_map.get(cid) != 'Completed':
+                card_target_map[cid] = col
+
+    filtered = []
+    for a in actions:
+        if is_move_or_create_into_target(a):
+            filtered.append(a)
+            continue
+        if action_card_id(a) in card_target_map and (is_comment_with_link(a) or is_checklist_complete(a) or is_attachment_added(a)):
+            filtered.append(a)
+
+    groups_map = {}
+    for a in filtered:
+        col_key = card_target_map.get(action_card_id(a)) or column_key_from_action(a)
+        pa = trello_rules.pick_action(a)
+        groups_map.setdefault(col_key, {}).setdefault(pa.get('cardId'), {'name': pa.get('card'), 'actions': []})['actions'].append(pa)
+
+    result = []
+    for col, cards_map in groups_map.items():
+        cards = sorted(cards_map.values(), key=lambda x: (x.get('name') or '').lower())
+        result.append({'column': col, 'cards': cards})
+    order = {'In Progress': 0, 'Completed': 1}
+    result = [g for g in result if g['column'] in order]
+    result.sort(key=lambda g: order[g['column']])
+    return result
+
+
+def compiled_groups(actions: list, in_progress_list=None, completed_list=None) -> list:
+    result = []
+    for col, cards in trello_rules.ActionRules(in_progress_list, completed_list).group(actions):
+        entries = []
+        for _, acts in cards:
+            picked = [trello_rules.pick_action(a) for a in acts]
+            entries.append({'name': picked[0].get('card'), 'actions': picked})
+        entries.sort(key=lambda x: (x.get('name') or '').lower())
+        result.append({'column': col, 'cards': entries})
+    return result
+
+
+def best_of(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Trello action classifier")
+    parser.add_argument("--actions", type=int, default=200000)
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    actions = synth_actions(args.actions, args.cards, args.seed)
+    if legacy_groups(actions, "Review") != compiled_groups(actions, "Review"):
+        sys.exit("Classifier output differs from the two-pass baseline")
+
+    rules = trello_rules.ActionRules("Review")
+    legacy = best_of(lambda: legacy_groups(actions, "Review"), args.repeat)
+    compiled = best_of(lambda: compiled_groups(actions, "Review"), args.repeat)
+    classify = best_of(lambda: rules.group(actions), args.repeat)
+    report = {
+        "actions": args.actions,
+        "cards": args.cards,
+        "legacySeconds": round(legacy, 4),
+        "compiledSeconds": round(compiled, 4),
+        "groupOnlySeconds": round(classify, 4),
+        "speedup": round(legacy / compiled, 2) if compiled else None,
+        "actionsPerSecond": int(args.actions / compiled) if compiled else None,
+    }
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,57 @@
 import os
 import sys
 import json
-import urllib.parse
-import urllib.request
 from datetime import datetime, timedelta, timezone
 import argparse
 
 # Add src to sys.path to import digest_core
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 try:
-    from digest_core import fetch_trello_notes, fetch_org_commits, fetch_trello_actions, fetch_github_commits, load_env_file
+    from digest_core import load_env_file, trello_api_base, get_sgt_time_range, SGT_OFFSET, commit_details_enabled, enrich_commit_groups, fetch_card_comments
+    import metrics
+    import http_client
+    from profiling import StageProfiler
+    import snapshots
+    import tenants
+    import deadline
+    import openai_batch
+    import near_dupes
+    import search_index
 except ImportError:
     # Fallback if running from root
     sys.path.append(os.path.join(os.getcwd(), 'src'))
-    from digest_core import fetch_trello_notes, fetch_org_commits, fetch_trello_actions, fetch_github_commits, load_env_file
+    from digest_core import load_env_file, trello_api_base, get_sgt_time_range, SGT_OFFSET, commit_details_enabled, enrich_commit_groups, fetch_card_comments
+    import metrics
+    import http_client
+    from profiling import StageProfiler
+    import snapshots
+    import tenants
+    import deadline
+    import openai_batch
+    import near_dupes
+    import search_index
 
-# Constants
-SGT_OFFSET = timedelta(hours=8)
+# Constants (the default target when no --targets file is given)
 MEMBER_ID = "6374510bf2aa0e0071120277"
 LABEL_ID = "6924d2b9e964c12aa4cb9c9a"
 TARGET_LIST_ID = "694006049b61581da80fcd5f"
 BOARD_NAME = "Zcash Me"
 GITHUB_ORG = "zcashme"
+SYSTEM_PROMPT_PATH = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'summary_system_prompt.md')
 
-def get_sgt_time_range():
-    # Current time in UTC (when script runs)
-    now_utc = datetime.now(timezone.utc)
-    # Convert to SGT
-    now_sgt = now_utc + SGT_OFFSET
-    
-    # Target End: Today 9:00 AM SGT
-    end_sgt = now_sgt.replace(hour=9, minute=0, second=0, microsecond=0)
-    
-    start_sgt = end_sgt - timedelta(days=1)
-    
-    # Convert back to UTC for API
-    start_utc = start_sgt - SGT_OFFSET
-    end_utc = end_sgt - SGT_OFFSET
-    
-    return start_utc, end_utc, start_sgt, end_sgt
+def default_target() -> dict:
+    return tenants.normalize_target({
+        "name": GITHUB_ORG,
+        "listId": TARGET_LIST_ID,
+        "memberIds": [MEMBER_ID],
+        "labelIds": [LABEL_ID],
+        "boards": [BOARD_NAME],
+        "orgs": [GITHUB_ORG],
+        # Followed outside the org (user requested coverage)
+        "repos": ["ZcashUsersGroup/zcashme@main"],
+    })
 
 def trello_post_file(url: str, file_path: str, data: dict = None) -> dict:
-    import requests
     key = os.environ.get("TRELLO_KEY")
     token = os.environ.get("TRELLO_TOKEN")
     if not key or not token:
@@ -51,7 +61,7 @@ def trello_post_file(url: str, file_path: str, data: dict = None) -> dict:
     
     with open(file_path, 'rb') as f:
         files = {'file': (os.path.basename(file_path), f, 'text/markdown')}
-        r = requests.post(url, params=qp, data=data, files=files, timeout=120)
+        r = http_client.post(url, params=qp, data=data, files=files, timeout=120)
         r.raise_for_status()
         return r.json()
 
@@ -62,93 +72,51 @@ def trello_post(url: str, data: dict) -> dict:
         raise RuntimeError("Missing TRELLO_KEY/TRELLO_TOKEN")
     
     qp = {"key": key, "token": token}
-    full = url + "?" + urllib.parse.urlencode(qp)
-    
-    req = urllib.request.Request(full, data=json.dumps(data).encode('utf-8'), headers={'Content-Type': 'application/json'}, method='POST')
-    with urllib.request.urlopen(req, timeout=60) as r:
-        return json.loads(r.read())
+    r = http_client.post(url, params=qp, json=data, timeout=60)
+    r.raise_for_status()
+    return r.json()
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--dry-run", action="store_true", help="Print card content instead of posting to Trello")
-    args = parser.parse_args()
-
-    load_env_file()
-
-    start_utc, end_utc, start_sgt, end_sgt = get_sgt_time_range()
-    
-    since_iso = start_utc.isoformat().replace("+00:00", "Z")
-    before_iso = end_utc.isoformat().replace("+00:00", "Z")
-    
-    print(f"Time Range (UTC): {since_iso} to {before_iso}")
-    print(f"Time Range (SGT): {start_sgt} to {end_sgt}")
+def partial_note(lines: list, sections: dict, name: str):
+    if sections.get(name) == "partial":
+        lines.append("_Partial: some sources did not finish within the time budget or failed._")
 
-    # 1. Fetch Meeting Notes (Transcripts)
-    print("Fetching Meeting Notes...")
-    try:
-        notes = fetch_trello_notes(BOARD_NAME, "Meeting Notes", since_iso, before_iso)
-    except Exception as e:
-        print(f"Error fetching notes: {e}")
-        notes = []
+def commit_stats_lines(g: dict, max_files: int = 10) -> list:
+    # Per-repo totals, per-author split and most-touched files (--commit-details)
+    st = g.get("stats")
+    if not st:
+        return []
+    if not st["commits"]:
+        return [f"- _Details unavailable for {st['missing']} commit(s)._"] if st["missing"] else []
+    authors = sorted(st["authors"].items(), key=lambda kv: -(kv[1]["additions"] + kv[1]["deletions"]))
+    by_author = ", ".join(f"{name} +{a['additions']} −{a['deletions']} ({a['commits']})" for name, a in authors)
+    files = sorted(st["files"].items(), key=lambda kv: (-kv[1], kv[0]))
+    more = f", … (+{len(files) - max_files} more)" if len(files) > max_files else ""
+    lines = [
+        f"- _+{st['additions']} −{st['deletions']} across {len(files)} files; by author: {by_author}_",
+        "- _Files: " + ", ".join(f"{f} ({n})" for f, n in files[:max_files]) + more + "_",
+    ]
+    if st["missing"]:
+        lines.append(f"- _Details unavailable for {st['missing']} commit(s)._")
+    return lines
 
-    # 2. Fetch GitHub Commits
-    print("Fetching GitHub Commits...")
-    commit_groups = []
-    
-    # Fetch from zcashme org
-    try:
-        org_groups = fetch_org_commits(GITHUB_ORG, since_iso, before_iso)
-        if org_groups:
-            commit_groups.extend(org_groups)
-    except Exception as e:
-        print(f"Error fetching org commits: {e}")
-        
-    # Fetch from ZcashUsersGroup/zcashme (User requested coverage)
-    try:
-        # Check if we already have it (unlikely if GITHUB_ORG is diff)
-        zcashme_commits = fetch_github_commits("ZcashUsersGroup", "zcashme", "main", since_iso, before_iso)
-        if zcashme_commits:
-            commit_groups.append({
-                'repo': 'zcashme',
-                'url': 'https://github.com/ZcashUsersGroup/zcashme',
-                'branch': 'main',
-                'commits': zcashme_commits
-            })
-    except Exception as e:
-        print(f"Error fetching ZcashUsersGroup/zcashme: {e}")
-
-    # 3. Fetch Trello Activity
-    print("Fetching Trello Activity...")
-    try:
-        activity_groups = fetch_trello_actions(BOARD_NAME, since_iso, before_iso, in_progress_list="In Progress", completed_list="Completed")
-    except Exception as e:
-        print(f"Error fetching activity: {e}")
-        activity_groups = []
-
-    # --- Generate Markdown Report ---
-    
-    date_lcd = start_sgt.strftime("%b %d")
-    if start_sgt.month != end_sgt.month:
-        date_lcd += f" - {end_sgt.strftime('%b %d')}"
-    else:
-        date_lcd += f"-{end_sgt.day}"
-    
-    # Title Format: Update to include Date Time Range as requested
-    # User Request: "add date time range to the title"
-    # Format: YYYY-MM-DDTHH:MM am SGT to YYYY-MM-DDTHH:MM am SGT
-    fmt = "%Y-%m-%dT%I:%M %p SGT"
-    title_start = start_sgt.strftime(fmt).replace("PM", "pm").replace("AM", "am")
-    title_end = end_sgt.strftime(fmt).replace("PM", "pm").replace("AM", "am")
-    card_title = f"{title_start} to {title_end}"
-    
+def build_report_md(title_start: str, title_end: str, notes: list, commit_groups: list, activity_groups: list, sections: dict = None, summary: str = None) -> str:
+    # sections: notes/commits/activity -> "complete" | "partial"; partial sections are always shown and flagged
+    sections = sections or {}
     # Report Header matches Title
     lines = []
     lines.append(f"# Daily Digest ({title_start} to {title_end})")
     lines.append("")
+
+    # LLM summary (--summarize)
+    if summary:
+        lines.append("## Summary")
+        lines.append(summary.strip())
+        lines.append("")
     
     # Transcripts
-    if notes:
+    if notes or sections.get("notes") == "partial":
         lines.append("## Transcripts Summary")
+        partial_note(lines, sections, "notes")
         for n in notes:
             d = n.get('titleDate') or n.get('dateLastActivity') or ''
             lines.append(f"- {d} **{n.get('name')}** [link]({n.get('url')})")
@@ -157,18 +125,28 @@ def main():
         lines.append("")
     
     # Commits
-    if commit_groups:
+    if commit_groups or sections.get("commits") == "partial":
         lines.append("## GitHub Commits")
+        partial_note(lines, sections, "commits")
         for g in commit_groups:
             lines.append(f"### {g['repo']} ({g['branch']})")
+            if g.get('mirrors'):
+                lines.append(f"- _Also mirrored as {', '.join(g['mirrors'])}._")
+            if g.get('duplicates'):
+                lines.append(f"- _{g['duplicates']} commit(s) already listed under another repo are omitted here._")
+            lines.extend(commit_stats_lines(g))
             for c in g['commits']:
                 msg = (c.get('message') or '').split('\n')[0]
-                lines.append(f"- {c['date'][:10]} **{c.get('author')}**: {msg} [link]({c.get('url')})")
+                diff = f" (+{c['additions']} −{c['deletions']}, {len(c['files'])} file{'s' if len(c['files']) != 1 else ''})" if 'additions' in c else ""
+                lines.append(f"- {c['date'][:10]} **{c.get('author')}**: {msg}{diff} [link]({c.get('url')})")
+            if g.get('truncated'):
+                lines.append(f"- _List truncated after {len(g['commits'])} commits._")
             lines.append("")
     
     # Activity
-    if activity_groups:
+    if activity_groups or sections.get("activity") == "partial":
         lines.append("## Trello Activity")
+        partial_note(lines, sections, "activity")
         for g in activity_groups:
             col = g.get('column')
             lines.append(f"### {col}")
@@ -183,47 +161,298 @@ def main():
                     lines.append(f"- {dt} · {mem} · {act_type} · {txt}")
             lines.append("")
             
-    report_md = "\n".join(lines)
-    
-    # Trello Card Fields
+    return "\n".join(lines)
+
+def summary_user_content(title_start: str, title_end: str, notes: list, commit_groups: list, activity_groups: list) -> str:
+    # Same layout as the webapp's summarize prompt, plus the board activity the card lists
+    def first_line(x):
+        return str(x or "").split("\n")[0].strip()
+    def clip(x, n):
+        x = str(x or "")
+        return x[:n] + "…" if len(x) > n else x
+    header = (
+        f"Generate a daily digest (WDWDY) covering {title_start} → {title_end}\n"
+        "Integrate: GitHub commits (main), Trello Meeting Notes, Trello board activity.\n"
+        "Use precise, audit-friendly Markdown. Keep sections: Day Range, Overview, Daily Log, Cross-Day, References."
+    )
+    # Near-identical commit messages and comments (cherry-picks, reposted links) go in once, with a count
+    commits = [(g, c) for g in commit_groups for c in g["commits"]]
+    gh = "\n".join(f"- {c.get('date')} {c.get('author')} [{g['repo']}]: {first_line(c.get('message'))}{near_dupes.similar_suffix(n)} ({c.get('url')})"
+                   for (g, c), n in near_dupes.collapse(commits, lambda gc: first_line(gc[1].get("message"))))
+    tr = "\n\n".join(f"- {n.get('titleDate') or n.get('dateLastActivity')} {n.get('name')} ({n.get('url')})\n  Desc: {clip(n.get('desc'), 500)}"
+                      for n in notes)
+    cards = [(g, card) for g in activity_groups for card in g.get("cards", [])]
+    comments = [(ci, a) for ci, (_, card) in enumerate(cards) for a in card.get("actions", []) if a.get("type") == "commentCard" and a.get("text")]
+    kept = {}
+    for (ci, a), n in near_dupes.collapse(comments, lambda x: x[1].get("text")):
+        kept.setdefault(ci, []).append(f"    * {clip(first_line(a.get('text')), 300)}{near_dupes.similar_suffix(n)}")
+    act = "\n".join(f"- {g.get('column')} / {card.get('name')}: " + "; ".join(f"{(a.get('date') or '')[:10]} {a.get('member')} {a.get('type')}" for a in card.get("actions", []))
+                    + "".join("\n" + line for line in kept.get(ci, []))
+                    for ci, (g, card) in enumerate(cards))
+    return f"{header}\n\n== GitHub Commits ==\n{gh}\n\n== Trello Meeting Notes ==\n{tr}\n\n== Trello Activity ==\n{act}"
+
+def summarize_all(prompts: dict, mode: str, batch_timeout: float, batch_poll: float) -> dict:
+    # prompts: { target name: user content } -> { target name: summary text }. Batch mode sends
+    # them all as one OpenAI batch; anything it did not answer in time is completed synchronously.
+    if not prompts:
+        return {}
+    if not os.environ.get("OPENAI_API_KEY", "").strip():
+        print("OPENAI_API_KEY not set; skipping summaries")
+        return {}
+    with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
+        system_prompt = f.read()
+    bodies = {name: openai_batch.chat_body(system_prompt, content) for name, content in prompts.items()}
+    texts, errors = {}, {}
+    if mode == "batch":
+        try:
+            texts, errors = openai_batch.run(bodies, batch_timeout, batch_poll)
+        except Exception as e:
+            print(f"Batch summarization failed: {e}")
+            errors = {name: str(e) for name in bodies}
+        if errors:
+            print(f"{len(errors)} summary request(s) not answered by the batch; completing them synchronously")
+    else:
+        errors = {name: None for name in bodies}
+    for name in errors:
+        try:
+            texts[name] = openai_batch.complete(bodies[name])
+        except Exception as e:
+            print(f"[{name}] Summary unavailable: {e}")
+    return texts
+
+def index_digests(indexed: list, day: str) -> list:
+    # indexed: (target, card title, report markdown, card url, notes) per target.
+    # Digests are keyed by target and day, notes by card, so re-runs and backfills replace them.
+    # -> the documents added, for push_search_documents
+    index = search_index.get_index()
+    counts = {"added or updated": 0, "unchanged": 0}
+    docs = []
+
+    def add(key: str, kind: str, title: str, body: str, url: str, date: str, target: str):
+        doc = {"key": key, "kind": kind, "title": title, "body": body, "url": url, "date": date, "target": target}
+        docs.append(doc)
+        changed = index.add(key, kind, title, body, url=url, date=date, target=target)
+        counts["added or updated" if changed else "unchanged"] += 1
+
+    notes_seen = {}
+    for target, title, report_md, url, notes in indexed:
+        add(f"digest:{target['name']}:{day}", search_index.DIGEST, f"Daily digest {title}", report_md, url, day, target["name"])
+        for n in notes:
+            notes_seen.setdefault(n.get("cardId"), (target, n))
+    for card_id, (target, n) in notes_seen.items():
+        if not card_id:
+            continue
+        try:
+            comments = fetch_card_comments(card_id)
+        except Exception as e:
+            print(f"Comments for note {n.get('name')} unavailable: {e}")
+            comments = []
+        body = "\n\n".join([n.get("desc") or ""] + [f"{c['member']}: {c['text']}" for c in comments if c["text"]])
+        add(f"note:{card_id}", search_index.NOTE, n.get("name") or "", body, n.get("url"),
+            n.get("titleDate") or (n.get("dateLastActivity") or "")[:10], target["name"])
+    print("Search index: " + ", ".join(f"{n} {k}" for k, n in counts.items()) + f" ({index.path})")
+    return docs
+
+def push_search_documents(docs: list, batch: int = 50):
+    # The webapp searches its own index, not the one built here, so documents are sent to its
+    # ingest endpoint (POST /api/search/documents). Failures are reported, not raised: the
+    # cards are already posted.
+    url = os.environ.get("SEARCH_INGEST_URL", "").strip()
+    token = os.environ.get("SEARCH_INGEST_TOKEN", "").strip()
+    if not url or not token:
+        print("Search ingest: SEARCH_INGEST_URL/SEARCH_INGEST_TOKEN not set; the webapp's index was not updated")
+        return
+    counts = {}
+    try:
+        for i in range(0, len(docs), batch):
+            r = http_client.post(url, json={"documents": docs[i:i + batch]}, headers={"Authorization": f"Bearer {token}"}, timeout=60)
+            r.raise_for_status()
+            for k, n in r.json().items():
+                counts[k] = counts.get(k, 0) + n
+    except Exception as e:
+        print(f"Search ingest failed after {i} of {len(docs)} documents: {e}")
+        return
+    print("Search ingest: " + (", ".join(f"{n} {k}" for k, n in counts.items()) or "nothing to send") + f" ({url})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="Print card content instead of posting to Trello")
+    parser.add_argument("--metrics-out", help="Write a JSON metrics summary (upstream calls, latency, cache hits) to this path")
+    parser.add_argument("--profile", nargs="?", const="digest-profile.json", help="Record wall/CPU time, upstream calls and bytes per stage and write a JSON report (default: digest-profile.json)")
+    parser.add_argument("--cprofile", help="Also write cProfile stats to this path (view with snakeviz, or flameprof for a flamegraph)")
+    parser.add_argument("--snapshot-dir", help="Also export the digest's data as a static JSON snapshot for the frontend's loader mode into this directory (e.g. snapshots; one subdirectory per target with --targets)")
+    parser.add_argument("--targets", help="JSON file listing digest targets (boards, orgs, repos, destination list); default: the built-in zcashme target")
+    parser.add_argument("--only", action="append", help="Only build the named target(s) from --targets; repeatable")
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("DIGEST_BUDGET_SECONDS") or 0) or None,
+                        help="Time budget in seconds for collecting sources; the digest is built from whatever finished, with late sections marked partial (default: DIGEST_BUDGET_SECONDS, else none)")
+    parser.add_argument("--workers", type=int, help="Fetch processes (default with --targets: one per unique fetch, up to max(4, CPU count); otherwise 1)")
+    parser.add_argument("--commit-details", action="store_true", default=commit_details_enabled(),
+                        help="Add additions/deletions and touched files per commit, repo and author; each commit is fetched once ever and kept in COMMIT_DETAILS_PATH (default: DIGEST_COMMIT_DETAILS)")
+    parser.add_argument("--summarize", choices=["off", "batch", "sync"], default=os.environ.get("DIGEST_SUMMARIZE") or "off",
+                        help="Add an LLM summary to each card: batch submits every summary as one OpenAI batch and waits for it, sync calls chat completions directly (default: DIGEST_SUMMARIZE, else off)")
+    parser.add_argument("--batch-timeout", type=float, default=float(os.environ.get("OPENAI_BATCH_TIMEOUT_SECONDS") or 1800),
+                        help="Seconds to wait for the batch before cancelling it and completing the rest synchronously (default: 1800)")
+    parser.add_argument("--batch-poll", type=float, default=float(os.environ.get("OPENAI_BATCH_POLL_SECONDS") or 30),
+                        help="Seconds between batch status polls (default: 30)")
+    parser.add_argument("--search-index", action="store_true", default=(os.environ.get("DIGEST_SEARCH_INDEX") or "").strip().lower() in ("1", "true", "yes", "on"),
+                        help="Add each posted digest and its meeting notes (with comments) to the full-text index at SEARCH_INDEX_PATH and send them to SEARCH_INGEST_URL; dry runs are not indexed (default: DIGEST_SEARCH_INDEX)")
+    parser.add_argument("--search-push-all", action="store_true",
+                        help="With --search-index, send every document in the local index to SEARCH_INGEST_URL, not only this run's (to fill a new backend)")
+    args = parser.parse_args()
+    profiler = StageProfiler(enabled=bool(args.profile), cprofile_path=args.cprofile)
+    try:
+        run(args, profiler)
+    finally:
+        write_metrics(args.metrics_out)
+        report = profiler.finish(args.profile)
+        if report:
+            for st in report['stages']:
+                print(f"  [profile] {st['name']}: {st['wallSeconds']:.3f}s wall, {st['cpuSeconds']:.3f}s cpu, {st['upstreamCalls']} calls, {st['bytes']} bytes")
+            if args.profile:
+                print(f"Profile report written to {args.profile}")
+
+def write_metrics(path: str = None):
+    summary = metrics.summary()
+    calls = sum(u.get('calls', 0) for u in summary['upstream'].values())
+    print(f"Upstream calls: {calls} across {len(summary['upstream'])} hosts")
+    for host, u in sorted(summary['upstream'].items()):
+        print(f"  {host}: {u['calls']} calls, {u['seconds']:.2f}s, {u['bytes']} bytes, status {u['byStatus']}")
+    if path:
+        metrics.write_summary(path)
+        print(f"Metrics summary written to {path}")
+
+def export_snapshots(out_dir: str, day: str, since: str, until: str, built: list, per_target: bool):
+    # Snapshots are the digest's own inputs, so publishing them costs no upstream calls.
+    # With several targets each gets its own directory under out_dir.
+    for target, notes, commit_groups, activity_groups, sections in built:
+        partial = [k for k, v in sections.items() if v != "complete"]
+        if partial:
+            # Never publish a partial day; the page falls back to the live API for it
+            print(f"[{target['name']}] Snapshot {day} skipped: {', '.join(partial)} partial")
+            continue
+        target_dir = os.path.join(out_dir, target["name"]) if per_target else out_dir
+        entry = snapshots.write_snapshot(target_dir, day, {
+            "window": {"since": since, "until": until},
+            "orgGroups": commit_groups,
+            "meetingNotes": notes,
+            "actionGroups": activity_groups,
+        })
+        print(f"[{target['name']}] Snapshot {day}: {os.path.join(target_dir, entry['file'])} ({entry['bytes']} bytes)")
+
+def run(args, profiler: StageProfiler):
+    load_env_file()
+
+    start_utc, end_utc, start_sgt, end_sgt = get_sgt_time_range()
     
-    # Title Format: YYYY-MM-DDTHH:MM am SGT to YYYY-MM-DDTHH:MM am SGT (Retaining user's preferred title format from previous context if they want it, but they asked for "same stuff as weekly")
-    # Weekly Title: "Weekly Digest: 2024-01-01 - 2024-01-07"
-    # Let's match Weekly Digest Title format as requested.
-    # Title is already set above
-    # card_title = f"{title_start} to {title_end}"
+    since_iso = start_utc.isoformat().replace("+00:00", "Z")
+    before_iso = end_utc.isoformat().replace("+00:00", "Z")
     
+    print(f"Time Range (UTC): {since_iso} to {before_iso}")
+    print(f"Time Range (SGT): {start_sgt} to {end_sgt}")
+    profiler.start(since=since_iso, until=before_iso, dryRun=bool(args.dry_run))
+
+    targets = tenants.load_targets(args.targets) if args.targets else [default_target()]
+    if args.only:
+        targets = [t for t in targets if t["name"] in args.only]
+        if not targets:
+            raise SystemExit(f"No targets named {', '.join(args.only)}")
+
+    # 1. Fetch every board, org and repo once, shared by all targets
+    with profiler.stage("fetch"), deadline.budget(args.budget):
+        units, orgs, mirrors = tenants.plan(targets)
+        if mirrors:
+            print("Skipping mirrors: " + ", ".join(f"{m[1]}/{m[2]} (same head as {c[1]}/{c[2]})" for m, c in mirrors.items()))
+        # Fetches wait on upstreams, so the pool is not limited to the CPU count
+        workers = args.workers or (min(len(units), max(4, os.cpu_count() or 1)) if args.targets else 1)
+        print(f"Fetching {len(units)} sources for {len(targets)} target(s) with {workers} worker(s)...")
+        results = tenants.fetch_all(units, since_iso, before_iso, workers)
+        if deadline.hit() or deadline.expired():
+            print(f"Time budget of {args.budget:g}s reached; building digests from the sources that finished")
+
+    # Title Format: Update to include Date Time Range as requested
+    # User Request: "add date time range to the title"
+    # Format: YYYY-MM-DDTHH:MM am SGT to YYYY-MM-DDTHH:MM am SGT
+    fmt = "%Y-%m-%dT%I:%M %p SGT"
+    title_start = start_sgt.strftime(fmt).replace("PM", "pm").replace("AM", "am")
+    title_end = end_sgt.strftime(fmt).replace("PM", "pm").replace("AM", "am")
+    card_title = f"{title_start} to {title_end}"
+
     # Due Date: Today 1 PM SGT
     due_sgt = end_sgt.replace(hour=13, minute=0, second=0, microsecond=0)
     due_utc = due_sgt - SGT_OFFSET
     due_iso = due_utc.isoformat().replace("+00:00", "Z")
-    
-    if args.dry_run:
-        print("\n--- DRY RUN ---")
-        print(f"Title: {card_title}")
-        print(f"Due:   {due_iso}")
-        print(f"List:  {TARGET_LIST_ID}")
-        print("--- Report Content ---")
-        print(report_md)
-        print("----------------------\n")
-        return
 
-    # Check for temporary file
-    temp_filename = f"daily-digest-{start_sgt.strftime('%Y-%m-%d')}.md"
-    
-    # Create Card
+    # 2. Build each target's report inputs from the shared results
+    built = []
+    for target in targets:
+        notes, commit_groups, activity_groups, errors, sections = tenants.assemble(target, results, orgs, mirrors)
+        late = [e for e in errors if ": DeadlineExceeded" in e]
+        for err in errors:
+            if err not in late:
+                print(f"[{target['name']}] Error fetching {err}")
+        if late:
+            print(f"[{target['name']}] {len(late)} source(s) did not finish within the time budget")
+        print(f"[{target['name']}] Sections: " + ", ".join(f"{k} {v}" for k, v in sections.items()))
+        built.append((target, notes, commit_groups, activity_groups, sections))
+
+    if args.commit_details:
+        # One call for all targets, so each commit is looked up once by SHA. Every target has its
+        # own copies of the groups (duplicates are dropped per target), and each copy gets its stats.
+        groups = [g for _, _, c, _, _ in built for g in c]
+        with profiler.stage("commit_details"):
+            counts = enrich_commit_groups(groups)
+        print("Commit details: " + ", ".join(f"{n} {k}" for k, n in counts.items()))
+
+    if args.snapshot_dir:
+        with profiler.stage("snapshot"):
+            export_snapshots(args.snapshot_dir, start_sgt.strftime("%Y-%m-%d"), since_iso, before_iso, built, len(targets) > 1)
+
+    # 3. Summaries for every target at once (one batch when --summarize batch)
+    summaries = {}
+    if args.summarize != "off":
+        prompts = {t["name"]: summary_user_content(title_start, title_end, n, c, a) for t, n, c, a, _ in built if n or c or a}
+        with profiler.stage(f"summarize:{args.summarize}"):
+            summaries = summarize_all(prompts, args.summarize, args.batch_timeout, args.batch_poll)
+
+    indexed = []
+    for target, notes, commit_groups, activity_groups, sections in built:
+        with profiler.stage(f"render_markdown:{target['name']}"):
+            report_md = build_report_md(title_start, title_end, notes, commit_groups, activity_groups, sections, summaries.get(target["name"]))
+
+        if args.dry_run:
+            print(f"\n--- DRY RUN ({target['name']}) ---")
+            print(f"Title: {card_title}")
+            print(f"Due:   {due_iso}")
+            print(f"List:  {target['listId']}")
+            print("--- Report Content ---")
+            print(report_md)
+            print("----------------------\n")
+            continue
+
+        suffix = f"-{target['name']}" if len(targets) > 1 else ""
+        url = post_card(target, card_title, report_md, due_iso, f"daily-digest{suffix}-{start_sgt.strftime('%Y-%m-%d')}.md", profiler)
+        indexed.append((target, card_title, report_md, url, notes))
+
+    if args.search_index and indexed:
+        with profiler.stage("search_index"):
+            docs = index_digests(indexed, start_sgt.strftime("%Y-%m-%d"))
+            push_search_documents(search_index.get_index().documents() if args.search_push_all else docs)
+
+def post_card(target: dict, card_title: str, report_md: str, due_iso: str, temp_filename: str, profiler: StageProfiler) -> str:
+    # Create Card; returns its short URL (None when it could not be created)
     try:
         # Create card first with truncated desc
-        card_data = trello_post("https://api.trello.com/1/cards", {
-            "idList": TARGET_LIST_ID,
-            "name": card_title,
-            "desc": report_md[:16000],
-            "idMembers": [MEMBER_ID],
-            "idLabels": [LABEL_ID],
-            "due": due_iso,
-            "pos": "top"
-        })
-        print(f"Successfully created card: {card_title} ({card_data.get('id')})")
+        with profiler.stage(f"post_card:{target['name']}"):
+            card_data = trello_post(f"{trello_api_base()}/cards", {
+                "idList": target["listId"],
+                "name": card_title,
+                "desc": report_md[:16000],
+                "idMembers": target["memberIds"],
+                "idLabels": target["labelIds"],
+                "due": due_iso,
+                "pos": "top"
+            })
+        print(f"Successfully created card: {card_title} ({card_data.get('id')}) for {target['name']}")
         
         # Write markdown to file
         with open(temp_filename, 'w', encoding='utf-8') as f:
@@ -232,7 +461,8 @@ def main():
         # Attach file
         try:
             print(f"Uploading attachment: {temp_filename}")
-            trello_post_file(f"https://api.trello.com/1/cards/{card_data.get('id')}/attachments", temp_filename)
+            with profiler.stage(f"upload_attachment:{target['name']}"):
+                trello_post_file(f"{trello_api_base()}/cards/{card_data.get('id')}/attachments", temp_filename)
             print("Attachment uploaded successfully.")
         except Exception as att_err:
             print(f"Failed to upload attachment: {att_err}")
@@ -240,9 +470,11 @@ def main():
         # Cleanup
         if os.path.exists(temp_filename):
             os.remove(temp_filename)
+        return card_data.get("shortUrl") or card_data.get("url")
             
     except Exception as e:
-        print(f"Failed to create card: {e}")
+        print(f"Failed to create card for {target['name']}: {e}")
+        return None
 
 if __name__ == "__main__":
     main()
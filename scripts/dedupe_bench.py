@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# Benchmark for the near-duplicate detector (src/near_dupes.py) on synthetic commit messages and
+# comments. A share of the items are planted near-copies of earlier ones (a word added, dropped
+# or swapped, a cherry-pick trailer, punctuation). It reports how the MinHash/LSH clustering
+# scales with the number of items, and its recall and false merges against exact Jaccard
+# comparison of every pair on the smaller sizes.
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import near_dupes
+
+VERBS = ["Fix", "Add", "Remove", "Refactor", "Update", "Document", "Speed up", "Handle", "Test", "Rename"]
+NOUNS = ["cache", "deadline", "webhook", "listing", "board", "summary", "prompt", "transcript", "metrics", "breaker",
+         "snapshot", "batch", "queue", "retry", "index", "header", "token", "worker", "budget", "parser"]
+PLACES = ["org commits", "meeting notes", "board actions", "the daily card", "the webapp", "gunicorn config",
+          "the stub", "pagination", "search", "the frontend", "http client", "event log"]
+WORDS = ["when", "empty", "after", "restart", "on", "timeout", "for", "large", "boards", "and", "long", "messages"]
+
+
+def synth_items(n: int, dup_rate: float, seed: int) -> tuple:
+    # -> (texts, source) where source[i] is the index of the original item i was copied from (or i)
+    rng = random.Random(seed)
+    texts, source = [], []
+    for i in range(n):
+        if texts and rng.random() < dup_rate:
+            j = rng.randrange(len(texts))
+            words = texts[j].split()
+            op = rng.choice(["add", "drop", "swap", "trailer", "punct"])
+            if op == "add":
+                words.insert(rng.randrange(len(words) + 1), rng.choice(WORDS))
+            elif op == "drop" and len(words) > 6:
+                words.pop(rng.randrange(len(words)))
+            elif op == "swap":
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            elif op == "trailer":
+                words.append(f"(cherry picked from commit {rng.getrandbits(40):010x})")
+            else:
+                words[-1] += rng.choice(["!", ".", "..."])
+            texts.append(" ".join(words))
+            source.append(source[j])
+        else:
+            extra = " ".join(rng.choice(WORDS + NOUNS) for _ in range(rng.randint(3, 10)))
+            texts.append(f"{rng.choice(VERBS)} {rng.choice(NOUNS)} in {rng.choice(PLACES)} {extra} #{i}")
+            source.append(i)
+    return texts, source
+
+
+def brute_force(texts: list, threshold: float) -> list:
+    # Same leader clustering with exact Jaccard over every earlier representative: O(n^2)
+    reps, clusters = [], {}
+    for i, t in enumerate(texts):
+        words = near_dupes.normalize(t)
+        sh = near_dupes.shingles(words)
+        key = " ".join(words)
+        for j, (jkey, jsh) in reps:
+            if key == jkey or (len(words) >= near_dupes.MIN_WORDS and len(sh & jsh) / len(sh | jsh) >= threshold):
+                clusters[j].append(i)
+                break
+        else:
+            reps.append((i, (key, sh)))
+            clusters[i] = [i]
+    return list(clusters.values())
+
+
+def quality(clusters: list, source: list) -> dict:
+    # recall: planted copies merged with their original; false merges: items merged with an unrelated one
+    rep_of = {i: c[0] for c in clusters for i in c}
+    planted = [i for i, s in enumerate(source) if s != i]
+    found = sum(1 for i in planted if source[rep_of[i]] == source[i])
+    wrong = sum(1 for i, r in rep_of.items() if source[r] != source[i])
+    return {"planted": len(planted), "recall": round(found / len(planted), 4) if planted else None, "falseMerges": wrong}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate detection for prompt inputs")
+    parser.add_argument("--sizes", default="1000,2000,4000,8000,16000,32000")
+    parser.add_argument("--dup-rate", type=float, default=0.3)
+    parser.add_argument("--threshold", type=float, default=near_dupes.DEFAULT_THRESHOLD)
+    parser.add_argument("--brute-max", type=int, default=4000, help="Largest size also clustered by exact pairwise Jaccard")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    rows = []
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        texts, source = synth_items(n, args.dup_rate, args.seed)
+        t0 = time.perf_counter()
+        clusters = near_dupes.cluster(texts, args.threshold)
+        seconds = time.perf_counter() - t0
+        row = {"items": n, "clusters": len(clusters), "seconds": round(seconds, 4),
+               "microsPerItem": round(seconds / n * 1e6, 1), **quality(clusters, source)}
+        if n <= args.brute_max:
+            t0 = time.perf_counter()
+            exact = brute_force(texts, args.threshold)
+            row["bruteForceSeconds"] = round(time.perf_counter() - t0, 4)
+            row["bruteForce"] = quality(exact, source)
+        rows.append(row)
+        print(f"{n:>6} items: {seconds:.3f}s ({row['microsPerItem']} µs/item), {len(clusters)} clusters, "
+              f"recall {row['recall']}, false merges {row['falseMerges']}"
+              + (f"; pairwise {row['bruteForceSeconds']:.3f}s, recall {row['bruteForce']['recall']}" if "bruteForce" in row else ""))
+    out = json.dumps({"dupRate": args.dup_rate, "threshold": args.threshold, "runs": rows}, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+import requests
+
+# Measures what response encoding buys on the large Trello payloads: bytes on the wire and
+# latency per content-coding, the cost of a 304 revalidation, and stdlib json vs orjson
+# encode time. Run against a backend pointed at scripts/stub_upstream.py (its default
+# dataset is about a week of board activity).
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import http_encoding
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def timed_get(session: requests.Session, url: str, params: dict, headers: dict) -> tuple:
+    t0 = time.perf_counter()
+    r = session.get(url, params=params, headers=headers, stream=True, timeout=180)
+    wire = r.raw.read(decode_content=False)
+    dt = time.perf_counter() - t0
+    return r, len(wire), dt
+
+
+def median(values: list) -> float:
+    s = sorted(values)
+    return s[len(s) // 2] if s else 0.0
+
+
+def best_of(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def bench_endpoint(session: requests.Session, url: str, params: dict, repeat: int) -> dict:
+    r = session.get(url, params=params, headers={"Accept-Encoding": "identity"}, timeout=180)
+    r.raise_for_status()
+    out = {"codings": {}}
+    for label, accept in (("identity", "identity"), ("gzip", "gzip"), ("br", "br, gzip")):
+        sizes, times, coding = [], [], None
+        for _ in range(repeat):
+            resp, nbytes, dt = timed_get(session, url, params, {"Accept-Encoding": accept})
+            sizes.append(nbytes)
+            times.append(dt)
+            coding = resp.headers.get("Content-Encoding") or "identity"
+        out["codings"][label] = {"servedAs": coding, "bytes": sizes[-1], "p50Ms": round(median(times) * 1000, 2)}
+    etag = r.headers.get("ETag")
+    times, nbytes, status = [], 0, None
+    for _ in range(repeat):
+        resp, nbytes, dt = timed_get(session, url, params, {"Accept-Encoding": "br, gzip", "If-None-Match": etag or ""})
+        times.append(dt)
+        status = resp.status_code
+    out["revalidate"] = {"etag": etag, "status": status, "bytes": nbytes, "p50Ms": round(median(times) * 1000, 2)}
+
+    payload = json.loads(r.content)
+    raw = r.content
+    out["encode"] = {
+        "items": len(payload.get("groups", payload)) if isinstance(payload, dict) else len(payload),
+        "jsonBytes": len(raw),
+        "stdlibJsonMs": round(best_of(lambda: json.dumps(payload, sort_keys=True, separators=(",", ":")), repeat) * 1000, 2),
+        "orjsonMs": round(best_of(lambda: orjson.dumps(payload, option=orjson.OPT_SORT_KEYS), repeat) * 1000, 2) if orjson else None,
+    }
+    out["compress"] = {c: {"bytes": len(http_encoding.compress(raw, c)),
+                           "ms": round(best_of(lambda c=c: http_encoding.compress(raw, c), repeat) * 1000, 2)}
+                       for c in http_encoding.available_codings()}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response compression, ETag revalidation and JSON encoding")
+    parser.add_argument("--base", default="http://127.0.0.1:8001")
+    parser.add_argument("--board", default="Zcash Me")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--until", help="Window end (ISO, default: now)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    end = datetime.fromisoformat(args.until.replace("Z", "+00:00")) if args.until else datetime.now(timezone.utc).replace(microsecond=0)
+    since = (end - timedelta(days=args.days)).isoformat().replace("+00:00", "Z")
+    until = end.isoformat().replace("+00:00", "Z")
+    base = args.base.rstrip("/")
+    session = requests.Session()
+    report = {
+        "window": {"since": since, "until": until},
+        "board-actions": bench_endpoint(session, f"{base}/api/trello/board-actions",
+                                        {"boardName": args.board, "since": since, "until": until, "types": "all",
+                                         "inProgressList": "In Progress", "completedList": "Completed"}, args.repeat),
+        "meeting-notes": bench_endpoint(session, f"{base}/api/trello/meeting-notes",
+                                        {"boardName": args.board, "listName": "Meeting Notes", "since": since, "until": until}, args.repeat),
+    }
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# Concurrent load generator for webapp.py. Run it against a backend that points at
+# scripts/stub_upstream.py to get repeatable numbers for sizing workers and threads.
+
+
+def default_scenarios(base: str, since: str, until: str) -> list:
+    return [
+        ("org-commits", "GET", f"{base}/api/github/org-commits", {"org": "zcashme", "since": since, "until": until}, None),
+        ("board-actions", "POST", f"{base}/api/trello/board-actions", None,
+         {"boardName": "Zcash Me", "since": since, "until": until, "types": "all", "inProgressList": "In Progress", "completedList": "Completed"}),
+        ("meeting-notes", "POST", f"{base}/api/trello/meeting-notes", None,
+         {"boardName": "Zcash Me", "listName": "Meeting Notes", "since": since, "until": until}),
+        ("summarize", "POST", f"{base}/api/openai/summarize", None,
+         {"systemPrompt": "Summarize.", "input": {"week": {"startDate": since, "endDate": until}}}),
+    ]
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(pct / 100.0 * (len(s) - 1)))))
+    return s[idx]
+
+
+def run(scenarios: list, concurrency: int, requests_per_scenario: int, timeout: float) -> dict:
+    results = {name: {"latencies": [], "errors": 0, "status": {}} for name, *_ in scenarios}
+    lock = threading.Lock()
+    session_local = threading.local()
+
+    def session():
+        s = getattr(session_local, "s", None)
+        if s is None:
+            s = session_local.s = requests.Session()
+        return s
+
+    def one(scenario):
+        name, method, url, params, body = scenario
+        t0 = time.perf_counter()
+        try:
+            r = session().request(method, url, params=params, json=body, timeout=timeout)
+            status = str(r.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        dt = time.perf_counter() - t0
+        with lock:
+            res = results[name]
+            res["latencies"].append(dt)
+            res["status"][status] = res["status"].get(status, 0) + 1
+            if not status.startswith("2"):
+                res["errors"] += 1
+
+    jobs = [sc for sc in scenarios for _ in range(requests_per_scenario)]
+    wall0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, jobs))
+    wall = time.perf_counter() - wall0
+
+    report = {"concurrency": concurrency, "requests": len(jobs), "wallSeconds": round(wall, 3),
+              "throughputRps": round(len(jobs) / wall, 2) if wall else 0.0, "scenarios": {}}
+    for name, res in results.items():
+        lat = res["latencies"]
+        report["scenarios"][name] = {
+            "count": len(lat),
+            "errors": res["errors"],
+            "status": res["status"],
+            "p50": round(percentile(lat, 50), 4),
+            "p95": round(percentile(lat, 95), 4),
+            "p99": round(percentile(lat, 99), 4),
+            "max": round(max(lat), 4) if lat else 0.0,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the Daily Digest backend")
+    parser.add_argument("--base", default="http://127.0.0.1:8001")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--scenarios", default="org-commits,board-actions,meeting-notes,summarize")
+    parser.add_argument("--days", type=int, default=1, help="Window size ending at --until")
+    parser.add_argument("--until", help="Window end (ISO, default: now); pin it to compare cold and warm runs")
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    now = datetime.fromisoformat(args.until.replace("Z", "+00:00")) if args.until else datetime.now(timezone.utc).replace(microsecond=0)
+    since = (now - timedelta(days=args.days)).isoformat().replace("+00:00", "Z")
+    until = now.isoformat().replace("+00:00", "Z")
+    wanted = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+    scenarios = [sc for sc in default_scenarios(args.base.rstrip("/"), since, until) if sc[0] in wanted]
+
+    report = run(scenarios, args.concurrency, args.requests, args.timeout)
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(out)
+
+
+if __name__ == "__main__":
+    main()
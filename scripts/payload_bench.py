@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+import requests
+
+# Bytes and parse time of the upstream calls behind the board-activity and meeting-notes
+# sections, with the parameters the code used before fetch profiles (src/fetch_profiles.py)
+# and with the profiles. Runs against TRELLO_API_BASE (scripts/stub_upstream.py, or Trello
+# itself with TRELLO_KEY/TRELLO_TOKEN). GitHub's REST API has no field selection, so the
+# commit listing is reported once for reference: received bytes against what is kept.
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import fetch_profiles
+from digest_core import load_env_file, trello_api_base, github_api_base, github_headers, normalize_commit
+
+
+def get(session: requests.Session, url: str, params: dict, repeat: int) -> dict:
+    auth = {"key": os.getenv("TRELLO_KEY", "").strip(), "token": os.getenv("TRELLO_TOKEN", "").strip()}
+    r = session.get(url, params={**params, **auth}, timeout=60, headers={"Accept-Encoding": "identity"})
+    r.raise_for_status()
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = json.loads(r.content)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return {"bytes": len(r.content), "parseSeconds": best, "body": body}
+
+
+def tally(rows: dict, name: str, res: dict):
+    row = rows.setdefault(name, {"calls": 0, "bytes": 0, "parseMs": 0.0})
+    row["calls"] += 1
+    row["bytes"] += res["bytes"]
+    row["parseMs"] += res["parseSeconds"] * 1000
+
+
+def run_profile(session: requests.Session, base: str, board_name: str, list_name: str, since: str, until: str, slim: bool, repeat: int) -> dict:
+    rows = {}
+    boards = get(session, f"{base}/members/me/boards", dict(fetch_profiles.NAME_ONLY) if slim else {}, repeat)
+    tally(rows, "boards", boards)
+    board = next(b for b in boards["body"] if (b.get("name") or "").lower() == board_name.lower())
+    lists = get(session, f"{base}/boards/{board['id']}/lists", dict(fetch_profiles.NAME_ONLY) if slim else {}, repeat)
+    tally(rows, "lists", lists)
+    old_actions = {"filter": "all", "limit": 1000, "since": since, "before": until}
+    actions = get(session, f"{base}/boards/{board['id']}/actions", fetch_profiles.board_actions(since, until) if slim else old_actions, repeat)
+    tally(rows, "board actions", actions)
+    rows["board actions"]["items"] = len(actions["body"])
+    lst = next(l for l in lists["body"] if (l.get("name") or "").lower() == list_name.lower())
+    cards = get(session, f"{base}/lists/{lst['id']}/cards", dict(fetch_profiles.NOTE_CARDS), repeat)
+    tally(rows, "note cards", cards)
+    for c in cards["body"]:
+        comments = {**fetch_profiles.COMMENTS, "limit": 1000} if slim else {"filter": "commentCard", "limit": 1000}
+        tally(rows, "note comments", get(session, f"{base}/cards/{c['id']}/actions", comments, repeat))
+        tally(rows, "note attachments", get(session, f"{base}/cards/{c['id']}/attachments", dict(fetch_profiles.ATTACHMENTS) if slim else {}, repeat))
+        if not slim:
+            # Added date came from the card's createCard/copyCard action; now from its id
+            tally(rows, "note added date", get(session, f"{base}/cards/{c['id']}/actions", {"filter": "all", "limit": 100}, repeat))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream payload size and parse time before/after fetch profiles")
+    parser.add_argument("--board", default="Zcash Me")
+    parser.add_argument("--list", default="Meeting Notes")
+    parser.add_argument("--days", type=int, default=7, help="Window for board actions (default: the last 7 days)")
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per response; the best time is kept")
+    parser.add_argument("--github-repo", default="ZcashUsersGroup/zcashme", help="Repo whose commit listing is reported for reference ('' to skip)")
+    parser.add_argument("--out", help="Write the JSON report to this path")
+    args = parser.parse_args()
+    load_env_file()
+
+    now = datetime.now(timezone.utc)
+    since = (now - timedelta(days=args.days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    until = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    session = requests.Session()
+    report = {"window": {"since": since, "until": until}}
+    for label, slim in (("before", False), ("after", True)):
+        rows = run_profile(session, trello_api_base(), args.board, args.list, since, until, slim, args.repeat)
+        total = {"calls": sum(r["calls"] for r in rows.values()), "bytes": sum(r["bytes"] for r in rows.values()),
+                 "parseMs": sum(r["parseMs"] for r in rows.values())}
+        report[label] = {"calls": rows, "total": total}
+        print(f"{label}:")
+        for name, r in rows.items():
+            items = f", {r['items']} actions" if "items" in r else ""
+            print(f"  {name:<17} {r['calls']:>4} calls {r['bytes']:>10} bytes  parse {r['parseMs']:8.2f} ms{items}")
+        print(f"  {'total':<17} {total['calls']:>4} calls {total['bytes']:>10} bytes  parse {total['parseMs']:8.2f} ms")
+    b, a = report["before"]["total"], report["after"]["total"]
+    print(f"Saved {b['calls'] - a['calls']} calls, {1 - a['bytes'] / b['bytes']:.0%} of bytes, {1 - a['parseMs'] / b['parseMs']:.0%} of parse time")
+
+    if args.github_repo:
+        owner, repo = args.github_repo.split("/")
+        r = session.get(f"{github_api_base()}/repos/{owner}/{repo}/commits", params={"per_page": 100},
+                        headers={**github_headers(), "Accept-Encoding": "identity"}, timeout=60)
+        r.raise_for_status()
+        commits = r.json()
+        kept = len(json.dumps([normalize_commit(c) for c in commits]))
+        report["githubCommits"] = {"commits": len(commits), "bytes": len(r.content), "keptBytes": kept}
+        print(f"GitHub commits (no field selection in REST): {len(commits)} commits, {len(r.content)} bytes received, {kept} bytes kept")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+// Measures how the page renders a large day: time to interactive, main-thread blocking,
+// DOM size and JS heap after a load, plus the time to render everything by scrolling to the
+// end. The page is served from the repo root with a synthetic snapshot (thousands of board
+// actions and commits, like a multi-day range), so no backend is needed. Compare renderers by
+// pointing --page at another copy of index.html, e.g.
+//   git show <rev>:index.html > /tmp/index.old.html && node scripts/render_bench.mjs --page /tmp/index.old.html
+// Needs puppeteer (npm i puppeteer).
+import http from 'node:http';
+import fs from 'node:fs';
+import path from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { parseArgs } from 'node:util';
+import puppeteer from 'puppeteer';
+
+const ROOT = path.join(path.dirname(fileURLToPath(import.meta.url)), '..');
+const DAY = '2024-01-15';
+const TYPES = { '.html': 'text/html', '.js': 'text/javascript', '.css': 'text/css', '.json': 'application/json' };
+
+function synthSnapshot(actions, commits) {
+  const columns = ['In Progress', 'Completed', 'Backlog', 'Review'];
+  const members = ['Alice', 'Bob', 'Carol', 'Dan'];
+  const cards = Math.max(1, Math.round(actions / 12));
+  const actionGroups = columns.map((column) => ({ column, cards: [] }));
+  for (let i = 0; i < cards; i++) {
+    actionGroups[i % columns.length].cards.push({
+      id: `card${i}`, name: `Card ${i}: wire up the ${['cache', 'webhook', 'index', 'queue'][i % 4]}`,
+      url: `https://trello.com/c/${i}`, labels: [{ name: 'dev' }], owners: [{ fullName: members[i % 4] }],
+      completion: { completed: i % 5, total: 5 },
+      actions: Array.from({ length: Math.round(actions / cards) }, (_, k) => (k % 3 === 0
+        ? { type: 'commentCard', date: `${DAY}T0${k % 10}:00:00Z`, member: members[k % 4], text: `Comment ${k} on card ${i}: looks good, merging after review` }
+        : { type: 'updateCard', date: `${DAY}T0${k % 10}:00:00Z`, member: members[k % 4], list: columns[k % 4] })),
+    });
+  }
+  const repos = 40;
+  const orgGroups = Array.from({ length: repos }, (_, r) => ({
+    repo: `zcashme/repo-${r}`, url: `https://github.com/zcashme/repo-${r}`, branch: 'main',
+    commits: Array.from({ length: Math.round(commits / repos) }, (_, k) => ({
+      date: `${DAY}T01:00:00Z`, author: members[k % 4], message: `Change ${k} in repo-${r}\n\nbody`, url: `https://github.com/zcashme/repo-${r}/commit/${k}`,
+    })),
+  }));
+  const meetingNotes = Array.from({ length: 20 }, (_, i) => ({ cardId: `n${i}`, name: `Meeting ${DAY}`, url: `https://trello.com/c/n${i}`, titleDate: DAY, desc: 'Notes '.repeat(40), comments: [], attachments: [] }));
+  return { date: DAY, repoCommits: [], orgGroups, meetingNotes, actionGroups };
+}
+
+function serve(page, snapshot) {
+  const server = http.createServer((req, res) => {
+    const url = new URL(req.url, 'http://x');
+    let body;
+    if (url.pathname === '/' || url.pathname === '/index.html') body = fs.readFileSync(page);
+    else if (url.pathname === '/snapshots/index.json') body = JSON.stringify({ days: { [DAY]: { file: 'bench.json' } } });
+    else if (url.pathname === '/snapshots/bench.json') body = snapshot;
+    else {
+      const file = path.join(ROOT, path.normalize(url.pathname));
+      if (!file.startsWith(ROOT) || !fs.existsSync(file)) { res.writeHead(404).end(); return; }
+      body = fs.readFileSync(file);
+    }
+    res.writeHead(200, { 'Content-Type': TYPES[path.extname(url.pathname) || '.html'] || 'application/octet-stream' }).end(body);
+  });
+  return new Promise((resolve) => server.listen(0, '127.0.0.1', () => resolve(server)));
+}
+
+async function run(browser, base) {
+  const page = await browser.newPage();
+  await page.setViewport({ width: 1280, height: 900 });
+  // No external scripts (mammoth) so only the renderer is measured
+  await page.setRequestInterception(true);
+  page.on('request', (r) => (r.url().startsWith(base) ? r.continue() : r.abort()));
+  await page.evaluateOnNewDocument(() => {
+    window.__long = [];
+    new PerformanceObserver((l) => window.__long.push(...l.getEntries().map((e) => [e.startTime, e.duration]))).observe({ type: 'longtask', buffered: true });
+  });
+  await page.goto(`${base}/index.html`, { waitUntil: 'load' });
+  await page.$eval('#dateInput', (el, d) => { el.value = d; }, DAY);
+  const out = await page.evaluate(() => new Promise((resolve) => {
+    const t0 = performance.now();
+    const el = document.getElementById('trelloActivity');
+    document.getElementById('btnGenerate').click();
+    const wait = () => {
+      if (!el.firstChild) { setTimeout(wait, 0); return; }
+      requestAnimationFrame(() => {
+        const painted = performance.now() - t0;
+        // Quiet for a second after the last long task: interactive
+        setTimeout(() => {
+          const tasks = window.__long.filter(([s]) => s >= t0);
+          const lastEnd = tasks.reduce((m, [s, d]) => Math.max(m, s + d - t0), 0);
+          resolve({
+            firstPaintMs: Math.round(painted), ttiMs: Math.round(Math.max(painted, lastEnd)),
+            longestTaskMs: Math.round(tasks.reduce((m, [, d]) => Math.max(m, d), 0)),
+            blockingMs: Math.round(tasks.reduce((s, [, d]) => s + Math.max(0, d - 50), 0)),
+          });
+        }, 1000);
+      });
+    };
+    wait();
+  }));
+  const cdp = await page.createCDPSession();
+  await cdp.send('HeapProfiler.collectGarbage');
+  const m = await page.metrics();
+  out.domNodes = m.Nodes;
+  out.heapMB = Math.round(m.JSHeapUsedSize / 1048576 * 10) / 10;
+  // Page down until the end stops moving: everything rendered
+  const t1 = Date.now();
+  let last = -1;
+  for (let stable = 0; stable < 5;) {
+    const pos = await page.evaluate(() => { window.scrollBy(0, window.innerHeight); return window.scrollY + document.body.scrollHeight; });
+    stable = pos === last ? stable + 1 : 0;
+    last = pos;
+    await new Promise((r) => setTimeout(r, 20));
+  }
+  out.fullRenderMs = Date.now() - t1;
+  out.fullDomNodes = (await page.metrics()).Nodes;
+  await page.close();
+  return out;
+}
+
+async function main() {
+  const { values } = parseArgs({ options: {
+    page: { type: 'string', default: path.join(ROOT, 'index.html') },
+    actions: { type: 'string', default: '2000,10000,40000' },
+    commits: { type: 'string', default: '2000' },
+    runs: { type: 'string', default: '3' },
+    out: { type: 'string' },
+  } });
+  const browser = await puppeteer.launch({ headless: true, args: ['--no-sandbox'] });
+  const report = { page: values.page, runs: [] };
+  try {
+    for (const n of values.actions.split(',').map(Number)) {
+      const server = await serve(values.page, JSON.stringify(synthSnapshot(n, Number(values.commits))));
+      const base = `http://127.0.0.1:${server.address().port}`;
+      const samples = [];
+      for (let i = 0; i < Number(values.runs); i++) samples.push(await run(browser, base));
+      server.close();
+      // Median run by time to interactive
+      const row = { actions: n, commits: Number(values.commits), ...samples.sort((a, b) => a.ttiMs - b.ttiMs)[samples.length >> 1] };
+      report.runs.push(row);
+      console.log(`${String(n).padStart(6)} actions: tti ${row.ttiMs} ms (first paint ${row.firstPaintMs} ms, longest task ${row.longestTaskMs} ms, blocking ${row.blockingMs} ms), `
+        + `${row.domNodes} DOM nodes, ${row.heapMB} MB heap; all rendered after ${row.fullRenderMs} ms of scrolling (${row.fullDomNodes} nodes)`);
+    }
+  } finally {
+    await browser.close();
+  }
+  if (values.out) fs.writeFileSync(values.out, JSON.stringify(report, null, 2));
+}
+
+main();
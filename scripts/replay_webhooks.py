@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import hmac
+import base64
+import hashlib
+import argparse
+import requests
+
+# Replay captured GitHub/Trello webhook deliveries against a local webapp, signed the way
+# the real senders sign them. Captures are JSON objects (one per .json file or per line of
+# a .jsonl file): {"source": "github"|"trello", "event": "push", "payload": {...}}.
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from digest_core import load_env_file
+
+
+def load_captures(paths: list) -> list:
+    out = []
+    for p in paths:
+        files = [os.path.join(p, f) for f in sorted(os.listdir(p))] if os.path.isdir(p) else [p]
+        for fp in files:
+            if fp.endswith(".jsonl"):
+                with open(fp, "r", encoding="utf-8") as f:
+                    out.extend(json.loads(line) for line in f if line.strip())
+            elif fp.endswith(".json"):
+                with open(fp, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                out.extend(data if isinstance(data, list) else [data])
+    return out
+
+
+def sign_github(body: bytes, secret: str) -> dict:
+    return {"X-Hub-Signature-256": "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()}
+
+
+def sign_trello(body: bytes, secret: str, callback_url: str) -> dict:
+    digest = hmac.new(secret.encode("utf-8"), body + callback_url.encode("utf-8"), hashlib.sha1).digest()
+    return {"X-Trello-Webhook": base64.b64encode(digest).decode("ascii")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured webhook payloads against the backend")
+    parser.add_argument("captures", nargs="+", help="Capture files (.json/.jsonl) or directories")
+    parser.add_argument("--base", default="http://127.0.0.1:8001")
+    parser.add_argument("--covered-since", help="Also mark the replayed sources as complete since this ISO time "
+                                                "(writes EVENT_LOG_PATH directly; for local testing)")
+    args = parser.parse_args()
+    load_env_file()
+
+    gh_secret = os.getenv("GITHUB_WEBHOOK_SECRET", "").strip()
+    tr_secret = os.getenv("TRELLO_WEBHOOK_SECRET", "").strip()
+    base = args.base.rstrip("/")
+    trello_callback = os.getenv("TRELLO_WEBHOOK_CALLBACK_URL", "").strip() or f"{base}/webhooks/trello"
+
+    sources = set()
+    ok = failed = 0
+    for cap in load_captures(args.captures):
+        src = cap.get("source")
+        payload = cap.get("payload") or {}
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if src == "github":
+            headers.update(sign_github(body, gh_secret))
+            headers["X-GitHub-Event"] = cap.get("event") or "push"
+            # Captures from an org hook carry "target": "organization"; repo hooks are the default
+            target = cap.get("target") or "repository"
+            headers["X-GitHub-Hook-Installation-Target-Type"] = target
+            url = f"{base}/webhooks/github"
+            if target == "organization":
+                org = ((payload.get("organization") or {}).get("login") or "").lower()
+                sources.update([f"github:{org}"] if org else [])
+            else:
+                full = ((payload.get("repository") or {}).get("full_name") or "").lower()
+                sources.update([f"github:{full}"] if full else [])
+        elif src == "trello":
+            headers.update(sign_trello(body, tr_secret, trello_callback))
+            url = trello_callback
+            board = (payload.get("model") or {}).get("id") or ((((payload.get("action") or {}).get("data") or {}).get("board") or {}).get("id"))
+            if board:
+                sources.add(f"trello:{board}")
+        else:
+            print(f"Skipping capture with unknown source: {src}")
+            continue
+        r = requests.post(url, data=body, headers=headers, timeout=30)
+        if r.status_code < 300:
+            ok += 1
+        else:
+            failed += 1
+            print(f"{src} {cap.get('event') or ''}: HTTP {r.status_code} {r.text[:200]}")
+
+    print(f"Replayed {ok} deliveries ({failed} failed)")
+    if args.covered_since:
+        import event_log
+        log = event_log.get_event_log()
+        for s in sorted(sources):
+            log.set_coverage(s, args.covered_since)
+            print(f"Marked {s} covered since {args.covered_since}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,767 @@
+import os
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from flask import Flask, request, jsonify, make_response
+
+# Local stand-in for the GitHub, Trello and OpenAI endpoints the digest calls.
+# Point the app at it with:
+#   GITHUB_API_BASE=http://127.0.0.1:8900
+#   TRELLO_API_BASE=http://127.0.0.1:8900/1
+#   OPENAI_API_BASE=http://127.0.0.1:8900/v1
+
+app = Flask(__name__)
+
+CONFIG = {
+    "latency": {},       # upstream -> (kind, params)
+    "error_rate": {},    # upstream -> probability of a 5xx
+    "rate_limit": {},    # upstream -> (requests, window_seconds)
+    "stall": {},         # upstream -> (probability, ms): rare very slow answers for tail tests
+    "per_page_max": 100,
+    "batch_seconds": 6.0,      # time for an OpenAI batch to go from validating to completed
+    "batch_outcome": "completed",
+    "batch_error_rate": 0.0,   # probability of a request inside a batch failing
+}
+STATS = {"calls": {}, "throttled": {}, "errors": {}, "stalled": {}}
+_lock = threading.Lock()
+_buckets = {}
+_rng = random.Random()
+DATA = {}
+
+
+def iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_iso(s: str):
+    try:
+        return datetime.fromisoformat((s or "").replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+
+def fake_id(*parts) -> str:
+    return hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:24]
+
+
+def trello_id(ts: datetime, *parts) -> str:
+    # Trello ids start with an 8-hex-digit creation timestamp
+    return f"{int(ts.timestamp()):08x}" + fake_id(*parts)[:16]
+
+
+# --- synthetic data ---
+
+def build_data(seed: int, repos: int, commits_per_repo: int, cards: int, actions: int, days: int, mirrors: list = None) -> dict:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    start = now - timedelta(days=days)
+    authors = ["alice", "bob", "carol", "dave", "erin", "frank"]
+    # Shaped like Trello's default member/board/list/attachment answers, so requests that ask
+    # for fewer fields see realistic savings
+    members = [{"id": fake_id("m", a), "activityBlocked": False, "avatarHash": fake_id("avatar", a)[:32],
+                "avatarUrl": f"https://trello-members.s3.amazonaws.com/{fake_id('m', a)}/{fake_id('avatar', a)[:32]}",
+                "fullName": a.title(), "idMemberReferrer": None, "initials": a[0].upper(), "nonPublic": {},
+                "nonPublicAvailable": True, "username": a} for a in authors]
+
+    def rand_time():
+        return start + timedelta(seconds=rng.randint(0, int((now - start).total_seconds())))
+
+    def make_commits(full, name, n):
+        items = []
+        for j in range(n):
+            when = rand_time()
+            author = rng.choice(authors)
+            sha = hashlib.sha1(f"{full}:{j}:{seed}".encode("utf-8")).hexdigest()
+            items.append({
+                "sha": sha,
+                "html_url": f"https://github.com/{full}/commit/{sha}",
+                "commit": {
+                    "message": f"Change {j} in {name}\n\nDetails for change {j}.",
+                    "author": {"name": author.title(), "email": f"{author}@example.org", "date": iso(when)},
+                    "committer": {"name": author.title(), "email": f"{author}@example.org", "date": iso(when)},
+                },
+                "author": {"login": author},
+                "stats": {"additions": rng.randint(0, 400), "deletions": rng.randint(0, 200)},
+                "files": [{"filename": f"src/file_{rng.randint(0, 20)}.py"} for _ in range(rng.randint(1, 4))],
+            })
+        items.sort(key=lambda c: c["commit"]["author"]["date"], reverse=True)
+        return items
+
+    org = "zcashme"
+    repo_list = []
+    commits = {}
+    for i in range(repos):
+        name = f"repo-{i:03d}"
+        full = f"{org}/{name}"
+        repo_list.append({
+            "id": i + 1,
+            "name": name,
+            "full_name": full,
+            "html_url": f"https://github.com/{full}",
+            "default_branch": "main",
+            "pushed_at": iso(rand_time()),
+            "fork": False,
+        })
+        n = commits_per_repo if i % 3 == 0 else rng.randint(0, max(1, commits_per_repo // 4))
+        commits[full] = make_commits(full, name, n)
+    # The digest also follows one repo outside the org
+    commits["ZcashUsersGroup/zcashme"] = make_commits("ZcashUsersGroup/zcashme", "zcashme", max(1, commits_per_repo // 4))
+    # Mirrors: an org repo (a fork) with exactly the source repo's history, e.g. "zcashme/zcashme=ZcashUsersGroup/zcashme"
+    for spec in mirrors or []:
+        full, _, source = spec.partition("=")
+        name = full.split("/")[-1]
+        commits[full] = [{**c, "html_url": c["html_url"].replace(f"/{source}/", f"/{full}/")} for c in commits.get(source) or []]
+        repo_list.append({"id": len(repo_list) + 1, "name": name, "full_name": full, "html_url": f"https://github.com/{full}",
+                          "default_branch": "main", "pushed_at": iso(now), "fork": True})
+    repo_list.sort(key=lambda r: r["pushed_at"], reverse=True)
+
+    board_id = trello_id(start, "board")
+    list_names = ["Meeting Notes", "Backlog", "In Progress", "Completed"]
+    lists = [{"id": trello_id(start, "list", n), "name": n, "closed": False, "color": None, "idBoard": board_id,
+              "pos": 16384 * (k + 1), "subscribed": False, "softLimit": None, "type": None,
+              "datasource": {"filter": False}} for k, n in enumerate(list_names)]
+    list_by_name = {l["name"]: l for l in lists}
+
+    card_list = []
+    for i in range(cards):
+        created = rand_time()
+        if i % 10 == 0:
+            lst = list_by_name["Meeting Notes"]
+            name = f"Meeting {created.strftime('%Y-%m-%d')}"
+        else:
+            lst = rng.choice(lists[1:])
+            name = f"Task {i}"
+        card_list.append({
+            "id": trello_id(created, "card", i),
+            "name": name,
+            "desc": f"Notes for {name}. " * rng.randint(1, 8),
+            "dateLastActivity": iso(max(created, rand_time())),
+            "shortUrl": f"https://trello.com/c/{fake_id('c', i)[:8]}",
+            "idList": lst["id"],
+            "labels": [{"name": "dev", "color": "green"}] if i % 4 == 0 else [],
+            "members": rng.sample(members, rng.randint(0, 2)),
+            "checklists": [{"checkItems": [{"name": f"item {k}", "state": rng.choice(["complete", "incomplete"])} for k in range(rng.randint(0, 4))]}],
+            "attachments": [{"id": fake_id("att", i), "bytes": 48213, "date": iso(created), "edgeColor": None, "idMember": members[0]["id"],
+                             "isMalicious": False, "isUpload": True, "mimeType": "application/pdf", "name": "doc.pdf", "previews": [],
+                             "url": f"https://example.org/{i}.pdf", "pos": 16384, "fileName": "doc.pdf"}] if i % 5 == 0 else [],
+            "_created": iso(created),
+        })
+
+    types = ["updateCard", "commentCard", "updateCheckItemStateOnCard", "addAttachmentToCard", "createCard", "addMemberToCard"]
+    weights = [30, 30, 15, 10, 10, 5]
+    action_list = []
+    list_lookup = {l["id"]: l for l in lists}
+    for i in range(actions):
+        card = rng.choice(card_list) if card_list else {"id": "", "name": "", "idList": lists[0]["id"]}
+        t = rng.choices(types, weights)[0]
+        when = rand_time()
+        data = {"card": {"id": card["id"], "name": card["name"], "idShort": i % 500 + 1, "shortLink": card["shortUrl"][-8:]},
+                "board": {"id": board_id, "name": "Zcash Me", "shortLink": board_id[-8:]}}
+        if t in ("updateCard", "createCard"):
+            after = rng.choice(lists)
+            data["listAfter"] = {"id": after["id"], "name": after["name"]}
+            data["list"] = {"id": after["id"], "name": after["name"]}
+        else:
+            lst = list_lookup.get(card["idList"]) or lists[0]
+            data["list"] = {"id": lst["id"], "name": lst["name"]}
+        if t == "commentCard":
+            data["text"] = rng.choice(["LGTM", "See https://github.com/zcashme/repo-000/pull/1", "Done, https://example.org/x", "ok"])
+        if t == "updateCheckItemStateOnCard":
+            data["checkItem"] = {"name": f"item {i % 4}", "state": rng.choice(["complete", "incomplete"])}
+        if t == "addAttachmentToCard":
+            data["attachment"] = {"name": f"file{i}.png", "url": f"https://example.org/file{i}.png"}
+        m = rng.choice(members)
+        action_list.append({
+            "id": trello_id(when, "action", i),
+            "type": t,
+            "date": iso(when),
+            "data": data,
+            "memberCreator": m,
+            "idMemberCreator": m["id"],
+            "appCreator": None,
+            "limits": {},
+        })
+    for card in card_list:
+        m = rng.choice(members)
+        lst = next(l for l in lists if l["id"] == card["idList"])
+        action_list.append({
+            "id": trello_id(parse_iso(card["_created"]), "create", card["id"]),
+            "type": "createCard",
+            "date": card["_created"],
+            "data": {"card": {"id": card["id"], "name": card["name"]}, "list": {"id": lst["id"], "name": lst["name"]}},
+            "memberCreator": m,
+            "idMemberCreator": m["id"],
+            "appCreator": None,
+            "limits": {},
+        })
+    action_list.sort(key=lambda a: a["date"], reverse=True)
+
+    return {
+        "org": org,
+        "repos": repo_list,
+        "commits": commits,
+        "boards": [{"id": board_id, "name": "Zcash Me", "desc": "", "closed": False, "idOrganization": fake_id("org"),
+                    "pinned": False, "url": f"https://trello.com/b/{board_id[-8:]}/zcash-me", "shortUrl": f"https://trello.com/b/{board_id[-8:]}",
+                    "prefs": {"permissionLevel": "org", "voting": "disabled", "comments": "members", "background": "blue",
+                              "backgroundColor": "#0079BF", "cardCovers": True, "calendarFeedEnabled": False},
+                    "labelNames": {"green": "dev", "yellow": "", "orange": "", "red": "", "purple": "", "blue": ""}}],
+        "lists": lists,
+        "cards": card_list,
+        "actions": action_list,
+        "batches": {},
+    }
+
+
+# --- fault injection ---
+
+def parse_latency(spec: str):
+    # fixed:50 | uniform:20,200 | normal:100,30 | lognormal:4.5,0.6 | exp:80 (all in ms)
+    kind, _, rest = (spec or "fixed:0").partition(":")
+    params = [float(x) for x in rest.split(",") if x.strip()] or [0.0]
+    return kind.strip().lower(), params
+
+
+def sample_latency(kind: str, params: list) -> float:
+    if kind == "uniform":
+        return _rng.uniform(params[0], params[1] if len(params) > 1 else params[0])
+    if kind == "normal":
+        return max(0.0, _rng.gauss(params[0], params[1] if len(params) > 1 else 0.0))
+    if kind == "lognormal":
+        return _rng.lognormvariate(params[0], params[1] if len(params) > 1 else 0.0)
+    if kind == "exp":
+        return _rng.expovariate(1.0 / params[0]) if params[0] > 0 else 0.0
+    return params[0]
+
+
+def upstream_for(path: str) -> str:
+    if path.startswith("/1/"):
+        return "trello"
+    if path.startswith("/v1/"):
+        return "openai"
+    return "github"
+
+
+def take_token(upstream: str):
+    limit = CONFIG["rate_limit"].get(upstream)
+    if not limit:
+        return True, None
+    capacity, window = limit
+    now = time.monotonic()
+    with _lock:
+        tokens, last = _buckets.get(upstream, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * capacity / window)
+        if tokens < 1:
+            _buckets[upstream] = (tokens, now)
+            return False, (1 - tokens) * window / capacity
+        _buckets[upstream] = (tokens - 1, now)
+        return True, None
+
+
+def bump(kind: str, upstream: str):
+    with _lock:
+        STATS[kind][upstream] = STATS[kind].get(upstream, 0) + 1
+
+
+@app.before_request
+def inject_faults():
+    if request.path.startswith("/_stub"):
+        return None
+    upstream = upstream_for(request.path)
+    bump("calls", upstream)
+    lat = CONFIG["latency"].get(upstream) or CONFIG["latency"].get("*")
+    if lat:
+        delay_ms = sample_latency(*lat)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+    stall = CONFIG["stall"].get(upstream) or CONFIG["stall"].get("*")
+    if stall and _rng.random() < stall[0]:
+        bump("stalled", upstream)
+        time.sleep(stall[1] / 1000.0)
+    ok, retry_after = take_token(upstream)
+    if not ok:
+        bump("throttled", upstream)
+        resp = make_response(jsonify({"message": "API rate limit exceeded"}), 429)
+        resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        resp.headers["X-RateLimit-Remaining"] = "0"
+        return resp
+    rate = CONFIG["error_rate"].get(upstream, CONFIG["error_rate"].get("*", 0.0))
+    if rate and _rng.random() < rate:
+        bump("errors", upstream)
+        return make_response(jsonify({"message": "injected upstream error"}), _rng.choice([500, 502, 503]))
+    return None
+
+
+@app.after_request
+def rate_limit_headers(resp):
+    # Report what is left in the bucket, like GitHub's X-RateLimit-Remaining
+    if request.path.startswith("/_stub") or resp.status_code == 429:
+        return resp
+    upstream = upstream_for(request.path)
+    if CONFIG["rate_limit"].get(upstream):
+        with _lock:
+            tokens, _ = _buckets.get(upstream, (CONFIG["rate_limit"][upstream][0], 0))
+        resp.headers["X-RateLimit-Remaining"] = str(max(0, int(tokens)))
+    return resp
+
+
+def paginate(items: list):
+    per_page = max(1, min(int(request.args.get("per_page") or 30), CONFIG["per_page_max"]))
+    page = max(1, int(request.args.get("page") or 1))
+    chunk = items[(page - 1) * per_page: page * per_page]
+    resp = make_response(jsonify(chunk))
+    if page * per_page < len(items):
+        args = request.args.to_dict()
+        args["page"] = str(page + 1)
+        qs = "&".join(f"{k}={v}" for k, v in args.items())
+        resp.headers["Link"] = f'<{request.base_url}?{qs}>; rel="next"'
+    return resp
+
+
+def in_window(date_s: str, since: str, until: str) -> bool:
+    d = parse_iso(date_s)
+    s = parse_iso(since) if since else None
+    u = parse_iso(until) if until else None
+    if d is None:
+        return False
+    return (s is None or d >= s) and (u is None or d <= u)
+
+
+# --- GitHub ---
+
+@app.route("/orgs/<org>/repos")
+def gh_org_repos(org):
+    if org.lower() != DATA["org"]:
+        return jsonify({"message": "Not Found"}), 404
+    return paginate(DATA["repos"])
+
+
+@app.route("/repos/<owner>/<repo>/commits")
+def gh_commits(owner, repo):
+    items = DATA["commits"].get(f"{owner}/{repo}")
+    if items is None:
+        return jsonify({"message": "Not Found"}), 404
+    since = request.args.get("since") or ""
+    until = request.args.get("until") or ""
+    out = [{k: v for k, v in c.items() if k not in ("stats", "files")} for c in items if in_window(c["commit"]["author"]["date"], since, until)]
+    return paginate(out)
+
+
+@app.route("/repos/<owner>/<repo>/commits/<ref>")
+def gh_commit(owner, repo, ref):
+    # ref is a SHA or a branch name (its head); Accept: application/vnd.github.sha answers with the bare SHA
+    items = DATA["commits"].get(f"{owner}/{repo}") or []
+    c = items[0] if items and ref == "main" else next((c for c in items if c["sha"] == ref), None)
+    if c is None:
+        return jsonify({"message": "Not Found"}), 404
+    if "vnd.github.sha" in (request.headers.get("Accept") or ""):
+        return make_response(c["sha"], 200, {"Content-Type": "text/plain"})
+    return jsonify(c)
+
+
+@app.route("/search/commits")
+def gh_search_commits():
+    # Supports the qualifiers the digest uses: org:NAME and committer-date:SINCE..UNTIL
+    q = request.args.get("q") or ""
+    org, since, until = None, "", ""
+    for term in q.split():
+        if term.startswith("org:"):
+            org = term[4:].lower()
+        elif term.startswith("committer-date:") and ".." in term:
+            since, until = term[len("committer-date:"):].split("..", 1)
+    if org is None:
+        return jsonify({"message": "Validation Failed"}), 422
+    items = []
+    if org == DATA["org"]:
+        repos = {r["full_name"]: r for r in DATA["repos"]}
+        for full, commits in DATA["commits"].items():
+            repo = repos.get(full)
+            if repo is None:
+                continue
+            for c in commits:
+                if in_window(c["commit"]["committer"]["date"], since, until):
+                    item = {k: v for k, v in c.items() if k not in ("stats", "files")}
+                    item["repository"] = {"name": repo.get("name"), "full_name": full, "html_url": repo.get("html_url")}
+                    items.append(item)
+    items.sort(key=lambda c: c["commit"]["committer"]["date"], reverse=True)
+    per_page = max(1, min(int(request.args.get("per_page") or 30), CONFIG["per_page_max"]))
+    page = max(1, int(request.args.get("page") or 1))
+    # Like GitHub, only the first 1000 results are reachable
+    if (page - 1) * per_page >= 1000:
+        return jsonify({"message": "Only the first 1000 search results are available"}), 422
+    resp = paginate(items[:1000])
+    body = resp.get_json()
+    resp.set_data(json.dumps({"total_count": len(items), "incomplete_results": False, "items": body}))
+    return resp
+
+
+# --- Trello ---
+
+def project(obj: dict, fields: str) -> dict:
+    # Trello's fields=: the listed fields plus the id; nothing or "all" keeps everything
+    if not fields or fields == "all":
+        return obj
+    keep = {f.strip() for f in fields.split(",")} | {"id"}
+    return {k: v for k, v in obj.items() if k in keep}
+
+
+def action_view(a: dict) -> dict:
+    out = project(a, request.args.get("fields"))
+    if request.args.get("memberCreator") != "false" and "memberCreator" in a:
+        out["memberCreator"] = project(a["memberCreator"], request.args.get("memberCreator_fields"))
+    return out
+
+
+def card_view(c: dict) -> dict:
+    fields = request.args.get("fields")
+    out = {k: v for k, v in c.items() if not k.startswith("_") and k not in ("members", "checklists", "attachments")}
+    if fields and fields != "all":
+        keep = {f.strip() for f in fields.split(",")} | {"id"}
+        out = {k: v for k, v in out.items() if k in keep}
+    if request.args.get("members") == "true":
+        out["members"] = [project(m, request.args.get("member_fields")) for m in c["members"]]
+    if request.args.get("checklists") == "all":
+        out["checklists"] = c["checklists"]
+    return out
+
+
+def filter_actions(actions: list) -> list:
+    flt = request.args.get("filter") or "all"
+    since = request.args.get("since") or ""
+    before = request.args.get("before") or ""
+    limit = min(int(request.args.get("limit") or 50), 1000)
+    types = None if flt == "all" else {t.strip() for t in flt.split(",") if t.strip()}
+    out = []
+    for a in actions:
+        if types is not None and a["type"] not in types:
+            continue
+        if (since or before) and not in_window(a["date"], since, before):
+            continue
+        out.append(action_view(a))
+        if len(out) >= limit:
+            break
+    return out
+
+
+@app.route("/1/members/me/boards")
+def trello_boards():
+    return jsonify([project(b, request.args.get("fields")) for b in DATA["boards"]])
+
+
+@app.route("/1/boards/<board_id>/actions")
+def trello_board_actions(board_id):
+    return jsonify(filter_actions(DATA["actions"]))
+
+
+@app.route("/1/boards/<board_id>/lists")
+def trello_board_lists(board_id):
+    return jsonify([project(l, request.args.get("fields")) for l in DATA["lists"]])
+
+
+@app.route("/1/boards/<board_id>/cards")
+def trello_board_cards(board_id):
+    return jsonify([card_view(c) for c in DATA["cards"]])
+
+
+@app.route("/1/lists/<list_id>/cards")
+def trello_list_cards(list_id):
+    return jsonify([card_view(c) for c in DATA["cards"] if c["idList"] == list_id])
+
+
+def find_card(card_id: str):
+    return next((c for c in DATA["cards"] if c["id"] == card_id), None)
+
+
+@app.route("/1/cards/<card_id>")
+def trello_card(card_id):
+    c = find_card(card_id)
+    if not c:
+        return jsonify({"message": "not found"}), 404
+    return jsonify(card_view(c))
+
+
+@app.route("/1/cards/<card_id>/actions")
+def trello_card_actions(card_id):
+    return jsonify(filter_actions([a for a in DATA["actions"] if ((a.get("data") or {}).get("card") or {}).get("id") == card_id]))
+
+
+@app.route("/1/cards/<card_id>/attachments", methods=["GET", "POST"])
+def trello_card_attachments(card_id):
+    c = find_card(card_id)
+    if request.method == "POST":
+        f = request.files.get("file")
+        att = {"id": fake_id("att", card_id, time.time()), "name": f.filename if f else "", "url": "", "mimeType": f.mimetype if f else ""}
+        if c:
+            c["attachments"].append(att)
+        return jsonify(att)
+    return jsonify([project(att, request.args.get("fields")) for att in (c["attachments"] if c else [])])
+
+
+@app.route("/1/cards/<card_id>/<path:rest>")
+def trello_card_misc(card_id, rest):
+    c = find_card(card_id)
+    if not c:
+        return jsonify({"message": "not found"}), 404
+    if rest in ("checklists", "members", "labels"):
+        return jsonify(c.get(rest) or [])
+    return jsonify({})
+
+
+@app.route("/1/cards", methods=["POST"])
+def trello_create_card():
+    data = request.get_json(silent=True) or request.form.to_dict() or {}
+    now = datetime.now(timezone.utc)
+    card = {
+        "id": trello_id(now, "new", len(DATA["cards"])),
+        "name": data.get("name") or "",
+        "desc": data.get("desc") or "",
+        "dateLastActivity": iso(now),
+        "shortUrl": f"https://trello.com/c/{fake_id('new', len(DATA['cards']))[:8]}",
+        "idList": data.get("idList") or "",
+        "labels": [], "members": [], "checklists": [], "attachments": [],
+        "_created": iso(now),
+    }
+    DATA["cards"].append(card)
+    return jsonify(card_view(card))
+
+
+@app.route("/1/batch")
+def trello_batch():
+    urls = [u for u in (request.args.get("urls") or "").split(",") if u]
+    out = []
+    client = app.test_client()
+    for u in urls[:10]:
+        path = u if u.startswith("/1/") else "/1" + (u if u.startswith("/") else "/" + u)
+        r = client.get(path)
+        out.append({str(r.status_code): r.get_json()} if r.status_code == 200 else {"statusCode": r.status_code})
+    return jsonify(out)
+
+
+# --- OpenAI ---
+
+def chat_completion(body: dict) -> dict:
+    messages = body.get("messages") or []
+    prompt_chars = sum(len(str(m.get("content") or "")) for m in messages)
+    user = next((m for m in reversed(messages) if m.get("role") == "user"), {})
+    first = str(user.get("content") or "").split("\n")[0]
+    text = f"# Stub summary\n\n- {first[:200]}\n- input size: {prompt_chars} chars"
+    prompt_tokens = max(1, prompt_chars // 4)
+    completion_tokens = max(1, len(text) // 4)
+    return {
+        "id": "chatcmpl-" + fake_id("chat", time.time()),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model") or "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+@app.route("/v1/chat/completions", methods=["POST"])
+def openai_chat():
+    return jsonify(chat_completion(request.get_json(silent=True) or {}))
+
+
+# Batch API: files plus batches that walk validating -> in_progress -> finalizing -> completed
+# over --batch-seconds (or end failed/expired with --batch-outcome). Cancelling keeps the
+# requests finished so far, like the real service.
+
+FILES = {}
+BATCHES = {}
+
+
+@app.route("/v1/files", methods=["POST"])
+def openai_file_upload():
+    f = request.files.get("file")
+    if f is None:
+        return jsonify({"error": {"message": "file is required"}}), 400
+    fid = "file-" + fake_id("file", f.filename, time.time(), _rng.random())
+    with _lock:
+        FILES[fid] = f.read().decode("utf-8")
+    return jsonify({"id": fid, "object": "file", "purpose": request.form.get("purpose"), "filename": f.filename,
+                    "bytes": len(FILES[fid]), "created_at": int(time.time())})
+
+
+@app.route("/v1/files/<fid>/content")
+def openai_file_content(fid):
+    if fid not in FILES:
+        return jsonify({"error": {"message": "No such file"}}), 404
+    return make_response(FILES[fid], 200, {"Content-Type": "application/jsonl"})
+
+
+def batch_line(line: dict) -> dict:
+    if _rng.random() < CONFIG["batch_error_rate"]:
+        return {"id": "batch_req_" + fake_id(line["custom_id"]), "custom_id": line["custom_id"],
+                "response": {"status_code": 500, "body": {"error": {"message": "injected batch request error"}}}, "error": None}
+    return {"id": "batch_req_" + fake_id(line["custom_id"]), "custom_id": line["custom_id"],
+            "response": {"status_code": 200, "request_id": fake_id("req", line["custom_id"]), "body": chat_completion(line.get("body") or {})}, "error": None}
+
+
+def advance_batch(b: dict):
+    # Moves a batch along its lifecycle from the time elapsed since it was created
+    if b["status"] in ("completed", "failed", "expired", "cancelled"):
+        return
+    progress = (time.time() - b["_created"]) / max(0.001, CONFIG["batch_seconds"])
+    lines = b["_lines"]
+    done = len(lines) if progress >= 0.8 else int(len(lines) * max(0.0, progress - 0.1) / 0.7)
+    if b["status"] == "cancelling":
+        finish_batch(b, "cancelled", lines[:max(done, b["_done"])])
+        return
+    b["_done"] = max(b["_done"], done)
+    b["request_counts"] = {"total": len(lines), "completed": b["_done"], "failed": 0}
+    if progress < 0.1:
+        b["status"] = "validating"
+    elif progress < 0.8:
+        b["status"] = "in_progress"
+        b.setdefault("in_progress_at", int(time.time()))
+    elif progress < 1.0:
+        b["status"] = "finalizing"
+        b.setdefault("finalizing_at", int(time.time()))
+    elif CONFIG["batch_outcome"] == "completed":
+        finish_batch(b, "completed", lines)
+    else:
+        finish_batch(b, CONFIG["batch_outcome"], lines[:len(lines) // 2] if CONFIG["batch_outcome"] == "expired" else [])
+
+
+def finish_batch(b: dict, status: str, lines: list):
+    results = [batch_line(line) for line in lines]
+    ok = [r for r in results if r["response"]["status_code"] == 200]
+    bad = [r for r in results if r["response"]["status_code"] != 200]
+    for key, rows in (("output_file_id", ok), ("error_file_id", bad)):
+        if rows:
+            fid = "file-" + fake_id(b["id"], key)
+            FILES[fid] = "".join(json.dumps(r) + "\n" for r in rows)
+            b[key] = fid
+    if status == "failed":
+        b["errors"] = {"data": [{"code": "injected", "message": "injected batch failure"}]}
+    b["status"] = status
+    b[f"{status}_at"] = int(time.time())
+    b["request_counts"] = {"total": len(b["_lines"]), "completed": len(ok), "failed": len(bad)}
+
+
+def batch_view(b: dict) -> dict:
+    return {k: v for k, v in b.items() if not k.startswith("_")}
+
+
+@app.route("/v1/batches", methods=["POST"])
+def openai_batch_create():
+    body = request.get_json(silent=True) or {}
+    content = FILES.get(body.get("input_file_id"))
+    if content is None:
+        return jsonify({"error": {"message": "input_file_id not found"}}), 400
+    lines = [json.loads(x) for x in content.splitlines() if x.strip()]
+    bid = "batch_" + fake_id("batch", body.get("input_file_id"), time.time())
+    with _lock:
+        BATCHES[bid] = {"id": bid, "object": "batch", "endpoint": body.get("endpoint"), "input_file_id": body.get("input_file_id"),
+                        "completion_window": body.get("completion_window"), "status": "validating", "created_at": int(time.time()),
+                        "output_file_id": None, "error_file_id": None, "metadata": body.get("metadata") or {},
+                        "request_counts": {"total": len(lines), "completed": 0, "failed": 0}, "_lines": lines, "_done": 0, "_created": time.time()}
+        return jsonify(batch_view(BATCHES[bid]))
+
+
+@app.route("/v1/batches/<bid>")
+def openai_batch_get(bid):
+    with _lock:
+        b = BATCHES.get(bid)
+        if b is None:
+            return jsonify({"error": {"message": "No such batch"}}), 404
+        advance_batch(b)
+        return jsonify(batch_view(b))
+
+
+@app.route("/v1/batches/<bid>/cancel", methods=["POST"])
+def openai_batch_cancel(bid):
+    with _lock:
+        b = BATCHES.get(bid)
+        if b is None:
+            return jsonify({"error": {"message": "No such batch"}}), 404
+        advance_batch(b)
+        if b["status"] not in ("completed", "failed", "expired", "cancelled"):
+            b["status"] = "cancelling"
+        return jsonify(batch_view(b))
+
+
+# --- control ---
+
+@app.route("/_stub/stats")
+def stub_stats():
+    with _lock:
+        return jsonify(json.loads(json.dumps(STATS)))
+
+
+@app.route("/_stub/reset", methods=["POST"])
+def stub_reset():
+    with _lock:
+        for v in STATS.values():
+            v.clear()
+        _buckets.clear()
+    return jsonify({"ok": True})
+
+
+def parse_per_upstream(values: list, parse) -> dict:
+    # "github=uniform:20,200" or a bare value applying to all upstreams ("*")
+    out = {}
+    for v in values or []:
+        name, sep, spec = v.partition("=")
+        if sep and name in ("github", "trello", "openai", "*"):
+            out[name] = parse(spec)
+        else:
+            out["*"] = parse(v)
+    return out
+
+
+def parse_stall(spec: str):
+    # "0.02:5000" -> 2% of requests take an extra 5000 ms
+    p, _, ms = spec.partition(":")
+    return float(p), float(ms or 5000)
+
+
+def parse_rate_limit(spec: str):
+    # "5000/3600" -> 5000 requests per 3600 seconds
+    n, _, window = spec.partition("/")
+    return float(n), float(window or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local GitHub/Trello/OpenAI stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("STUB_PORT", "8900")))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repos", type=int, default=50)
+    parser.add_argument("--commits-per-repo", type=int, default=40)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--actions", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=7, help="Spread synthetic activity over the last N days")
+    parser.add_argument("--latency", action="append", help="[upstream=]fixed:MS|uniform:LO,HI|normal:MU,SD|lognormal:MU,SIGMA|exp:MEAN")
+    parser.add_argument("--error-rate", action="append", help="[upstream=]PROBABILITY of an injected 5xx")
+    parser.add_argument("--rate-limit", action="append", help="[upstream=]REQUESTS/SECONDS before answering 429")
+    parser.add_argument("--stall", action="append", help="[upstream=]PROBABILITY:MS of an extra delay (slow-tail injection)")
+    parser.add_argument("--per-page-max", type=int, default=100)
+    parser.add_argument("--mirror", action="append", help="OWNER/NAME=SOURCE_OWNER/NAME: add a fork with the source repo's exact history to the org")
+    parser.add_argument("--batch-seconds", type=float, default=6.0, help="Seconds an OpenAI batch takes to complete")
+    parser.add_argument("--batch-outcome", choices=["completed", "failed", "expired"], default="completed")
+    parser.add_argument("--batch-error-rate", type=float, default=0.0, help="Probability of a request inside a batch failing")
+    args = parser.parse_args()
+
+    _rng.seed(args.seed)
+    CONFIG["latency"] = parse_per_upstream(args.latency, parse_latency)
+    CONFIG["error_rate"] = parse_per_upstream(args.error_rate, float)
+    CONFIG["rate_limit"] = parse_per_upstream(args.rate_limit, parse_rate_limit)
+    CONFIG["stall"] = parse_per_upstream(args.stall, parse_stall)
+    CONFIG["per_page_max"] = args.per_page_max
+    CONFIG["batch_seconds"] = args.batch_seconds
+    CONFIG["batch_outcome"] = args.batch_outcome
+    CONFIG["batch_error_rate"] = args.batch_error_rate
+    DATA.update(build_data(args.seed, args.repos, args.commits_per_repo, args.cards, args.actions, args.days, args.mirror))
+
+    print(f"Stub upstream on http://{args.host}:{args.port} "
+          f"({len(DATA['repos'])} repos, {len(DATA['cards'])} cards, {len(DATA['actions'])} actions)")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
 import os
+import sys
 import json
+import time
+import argparse
 import urllib.parse
 import urllib.request
 from datetime import datetime, timedelta, timezone
 
+# Incremental Trello activity analytics. Each run streams the board's actions for the window
+# not yet synced into persistent per-day counters (src/activity_stats.py), then answers from
+# the counters: the daily summary card, or trends over months with --trend. Nothing already
+# counted is fetched again.
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+import activity_stats
+import fetch_profiles
+
+
+def trello_api_base() -> str:
+    return (os.environ.get("TRELLO_API_BASE") or "https://api.trello.com/1").strip().rstrip("/")
+
 
 def trello_get(url: str, qp: dict) -> dict:
     key = os.environ.get("TRELLO_KEY")
@@ -26,35 +42,61 @@ def iso_day_range(now_utc: datetime):
     return since, before
 
 
-def summarize_actions(actions: list) -> dict:
-    by_type = {}
-    for a in actions:
-        t = a.get("type") or "unknown"
-        by_type[t] = by_type.get(t, 0) + 1
-
-    def pick(a):
-        data = a.get("data") or {}
-        card = (data.get("card") or {}).get("name")
-        text = data.get("text")
-        list_name = (data.get("list") or {}).get("name") or (
-            (data.get("listAfter") or {}).get("name")
+def fetch_action_pages(board_id: str, since: str, until: str, limit: int = 1000):
+    # Streams the board's actions in [since, until], newest first, one page at a time
+    before = until
+    while True:
+        page = trello_get(
+            f"{trello_api_base()}/boards/{board_id}/actions",
+            {**fetch_profiles.ACTION_FIELDS, "filter": "all", "limit": limit, "since": since, "before": before},
         )
-        return {
-            "date": a.get("date"),
-            "type": a.get("type"),
-            "member": (a.get("memberCreator") or {}).get("fullName"),
-            "card": card,
-            "list": list_name,
-            "text": text,
-        }
+        yield page
+        oldest = min((a.get("date") or "" for a in page), default="")
+        if len(page) < limit or not oldest or oldest >= before or oldest <= since:
+            return
+        before = oldest
+
 
+def sync(stats: activity_stats.ActivityStats, board: dict, since: str, until: str) -> dict:
+    # Counts whatever of [since, until] the store has not synced yet. Re-fetched page
+    # boundaries are harmless: actions already counted are skipped by id.
+    pages = fetched = counted = 0
+    windows = stats.gaps(board["id"], since, until)
+    for s, u in windows:
+        for page in fetch_action_pages(board["id"], s, u):
+            pages += 1
+            fetched += len(page)
+            counted += stats.ingest(board["id"], page)
+        stats.mark_synced(board["id"], board.get("name"), s, u)
+    return {"windows": [list(w) for w in windows], "calls": pages, "fetched": fetched, "counted": counted}
+
+
+def summarize_range(stats: activity_stats.ActivityStats, board_id: str, since_day: str, until_day: str) -> dict:
+    by_type = dict(stats.totals(board_id, activity_stats.TYPE, since_day, until_day))
+    top_cards = stats.totals(board_id, activity_stats.CARD, since_day, until_day, limit=10)
+    names = stats.card_names(board_id, [c for c, _ in top_cards])
     return {
-        "total": len(actions),
+        "total": sum(by_type.values()),
         "byType": by_type,
-        "sample": [pick(x) for x in actions[:10]],
+        "byMember": dict(stats.totals(board_id, activity_stats.MEMBER, since_day, until_day)),
+        "byList": dict(stats.totals(board_id, activity_stats.LIST, since_day, until_day)),
+        "topCards": [{"cardId": c, "card": names.get(c), "actions": n} for c, n in top_cards],
     }
 
 
+def trend(stats: activity_stats.ActivityStats, board_id: str, kind: str, since_day: str, until_day: str, period: str,
+          top: int = 20, in_progress_list: str = None, completed_list: str = None) -> dict:
+    if kind == "cycle":
+        return stats.cycle_times(board_id, since_day, until_day, in_progress_list, completed_list, period)
+    # Only the most active keys get a series; a year of every card per week is mostly noise
+    keys = [k for k, _ in stats.totals(board_id, kind, since_day, until_day, limit=top)]
+    series = stats.series(board_id, kind, since_day, until_day, period, keys)
+    if kind == activity_stats.CARD:
+        names = stats.card_names(board_id, keys)
+        series = {p: {names.get(c) or c: n for c, n in counts.items()} for p, counts in series.items()}
+    return series
+
+
 def trello_post(url: str, data: dict) -> dict:
     key = os.environ.get("TRELLO_KEY")
     token = os.environ.get("TRELLO_TOKEN")
@@ -69,23 +111,58 @@ def trello_post(url: str, data: dict) -> dict:
         return json.loads(r.read())
 
 def main():
+    parser = argparse.ArgumentParser(description="Incremental Trello activity analytics for one board")
+    parser.add_argument("--board", default="Zcash Me")
+    parser.add_argument("--since", help="Start of the window to sync and summarize, ISO UTC (default: start of yesterday)")
+    parser.add_argument("--until", help="End of the window, ISO UTC (default: start of today)")
+    parser.add_argument("--stats", default=activity_stats.stats_path(), help="Counter store (default: TRELLO_STATS_PATH)")
+    parser.add_argument("--trend", choices=["type", "member", "list", "card", "cycle"],
+                        help="Print counts per period (or cycle times from In Progress to Completed) instead of the daily card")
+    parser.add_argument("--weeks", type=int, default=26, help="Trend window when --since is not given (default: 26)")
+    parser.add_argument("--period", choices=["day", "week", "month"], default="week")
+    parser.add_argument("--top", type=int, default=20, help="Series only for the N most active keys (default: 20)")
+    parser.add_argument("--in-progress-list", help="Extra list counted as In Progress for --trend cycle")
+    parser.add_argument("--completed-list", help="Extra list counted as Completed for --trend cycle")
+    parser.add_argument("--offline", action="store_true", help="Answer from the stored counters only; no Trello calls")
+    parser.add_argument("--no-post", action="store_true", help="Print the daily summary without creating the card")
+    args = parser.parse_args()
+
     now = datetime.now(timezone.utc)
     since, before = iso_day_range(now)
+    if args.trend:
+        since = (now - timedelta(weeks=args.weeks)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat().replace("+00:00", "Z")
+        before = now.replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    since, before = args.since or since, args.until or before
+    stats = activity_stats.ActivityStats(args.stats)
+
+    if args.offline:
+        board = {"id": stats.board_id(args.board), "name": args.board}
+        if not board["id"]:
+            raise RuntimeError(f"Board never synced: {args.board}")
+    else:
+        boards = trello_get(f"{trello_api_base()}/members/me/boards", {"fields": "name"})
+        board = next((b for b in boards if (b.get("name") or "") == args.board), None)
+        if not board:
+            raise RuntimeError(f"Board not found: {args.board}")
+        synced = sync(stats, board, since, before)
+        print(f"Synced {synced['counted']} new actions in {synced['calls']} calls ({synced['fetched']} fetched)", file=sys.stderr)
 
-    boards = trello_get("https://api.trello.com/1/members/me/boards", {"fields": "name"})
-    board = next((b for b in boards if (b.get("name") or "") == "Zcash Me"), None)
-    if not board:
-        raise RuntimeError("Board not found: Zcash Me")
+    # Counters are per UTC day; an end at midnight belongs to the day before
+    since_day = since[:10]
+    until_day = (datetime.fromisoformat(before.replace("Z", "+00:00")) - timedelta(seconds=1)).strftime("%Y-%m-%d")
 
-    bid = board.get("id")
-    actions = trello_get(
-        f"https://api.trello.com/1/boards/{bid}/actions",
-        {"filter": "all", "limit": 1000, "since": since, "before": before},
-    )
+    if args.trend:
+        t0 = time.perf_counter()
+        out = trend(stats, board["id"], args.trend, since_day, until_day, args.period, args.top, args.in_progress_list, args.completed_list)
+        print(json.dumps({"range": {"since": since_day, "until": until_day}, "period": args.period, args.trend: out,
+                          "queryMs": round((time.perf_counter() - t0) * 1000, 1)}, indent=2))
+        return
 
-    summary = summarize_actions(actions)
+    summary = summarize_range(stats, board["id"], since_day, until_day)
     json_summary = json.dumps({"range": {"since": since, "before": before}, **summary}, indent=2)
     print(json_summary)
+    if args.no_post:
+        return
     
     # Publish to Trello
     target_list_id = "694006049b61581da80fcd5f"
@@ -94,7 +171,7 @@ def main():
     card_desc = f"**Daily Digest (WDWDY)**\nRange: {since} to {before}\n\n```json\n{json_summary}\n```"
     
     try:
-        trello_post("https://api.trello.com/1/cards", {
+        trello_post(f"{trello_api_base()}/cards", {
             "idList": target_list_id,
             "name": card_title,
             "desc": card_desc[:16000]
@@ -104,4 +181,4 @@ def main():
         print(f"Failed to create card: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
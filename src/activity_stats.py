@@ -0,0 +1,253 @@
+import os
+import math
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import trello_rules
+from cache import SQLiteStore, lazy
+
+# Persistent per-day counters of Trello board activity (by type, member, list and card), so
+# trend questions over months are answered from counters instead of refetching actions.
+# Each action is counted once: ids already counted are skipped, and every board records the
+# window it has fully synced so later runs fetch only what lies outside it. Cycle time is
+# derived from when each card first and last entered each list, kept per card and list name,
+# so changing which lists count as In Progress/Completed needs no refetch either.
+
+TYPE, MEMBER, LIST, CARD = 'type', 'member', 'list', 'card'
+DIMENSIONS = (TYPE, MEMBER, LIST, CARD)
+
+# Action types that put a card into data.list; an updateCard does so only when it has listAfter
+ENTRY_TYPES = ('createCard', 'copyCard', 'moveCardToBoard', 'convertToCardFromCheckItem')
+
+# SQLite expressions bucketing a YYYY-MM-DD day column; weeks start on Monday
+PERIODS = {
+    'day': 'day',
+    'week': "date(day, '-6 days', 'weekday 1')",
+    'month': "substr(day, 1, 7) || '-01'",
+}
+
+
+def entered_list(a):
+    # -> name of the list an action put its card into, or None
+    d = a.get('data') or {}
+    after = (d.get('listAfter') or {}).get('name')
+    if after:
+        return after
+    if a.get('type') in ENTRY_TYPES:
+        return (d.get('list') or {}).get('name')
+    return None
+
+
+def percentile(values, p):
+    # Nearest rank over sorted values
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+def period_start(day, period):
+    # Python twin of PERIODS for a YYYY-MM-DD day
+    if period == 'week':
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    if period == 'month':
+        return day[:8] + '01'
+    return day
+
+
+def iso_hours(start, end):
+    parse = lambda s: datetime.fromisoformat(s.replace('Z', '+00:00'))
+    return (parse(end) - parse(start)).total_seconds() / 3600.0
+
+
+class ActivityStats(SQLiteStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS seen_actions (id TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS daily_counts (
+                board TEXT, dim TEXT, day TEXT, key TEXT, n INTEGER,
+                PRIMARY KEY (board, dim, day, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS card_lists (
+                board TEXT, card TEXT, list TEXT, first TEXT, last TEXT,
+                PRIMARY KEY (board, card, list)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS card_lists_last ON card_lists (board, last);
+            CREATE TABLE IF NOT EXISTS cards (
+                board TEXT, card TEXT, name TEXT, named TEXT, PRIMARY KEY (board, card)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS synced (board TEXT PRIMARY KEY, name TEXT, since TEXT, until TEXT);
+        ''')
+
+    def ingest(self, board, actions):
+        # Counts the actions not seen before, in one transaction. -> number counted
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            ids = [a.get('id') for a in actions if a.get('id')]
+            seen = set()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                seen.update(r[0] for r in conn.execute(
+                    f'SELECT id FROM seen_actions WHERE id IN ({",".join("?" * len(chunk))})', chunk))
+            counts = Counter()
+            entries = {}
+            names = {}
+            fresh = []
+            for a in actions:
+                aid = a.get('id')
+                when = a.get('date') or ''
+                if not aid or aid in seen or len(when) < 10:
+                    continue
+                seen.add(aid)
+                fresh.append((aid,))
+                p = trello_rules.pick_action(a)
+                day = when[:10]
+                counts[(TYPE, day, p['type'] or 'unknown')] += 1
+                counts[(MEMBER, day, p['member'] or 'unknown')] += 1
+                if p['list']:
+                    counts[(LIST, day, p['list'])] += 1
+                cid = p['cardId']
+                if not cid:
+                    continue
+                counts[(CARD, day, cid)] += 1
+                if p['card'] and when > names.get(cid, ('', ''))[1]:
+                    names[cid] = (p['card'], when)
+                lst = entered_list(a)
+                if lst:
+                    first, last = entries.get((cid, lst), (when, when))
+                    entries[(cid, lst)] = (min(first, when), max(last, when))
+            conn.executemany('INSERT OR IGNORE INTO seen_actions (id) VALUES (?)', fresh)
+            conn.executemany('''
+                INSERT INTO daily_counts (board, dim, day, key, n) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (board, dim, day, key) DO UPDATE SET n = n + excluded.n''',
+                [(board, dim, day, key, n) for (dim, day, key), n in counts.items()])
+            conn.executemany('''
+                INSERT INTO card_lists (board, card, list, first, last) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (board, card, list) DO UPDATE SET first = min(first, excluded.first), last = max(last, excluded.last)''',
+                [(board, cid, lst, first, last) for (cid, lst), (first, last) in entries.items()])
+            conn.executemany('''
+                INSERT INTO cards (board, card, name, named) VALUES (?, ?, ?, ?)
+                ON CONFLICT (board, card) DO UPDATE SET name = excluded.name, named = excluded.named
+                WHERE excluded.named > named''',
+                [(board, cid, name, named) for cid, (name, named) in names.items()])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(fresh)
+
+    def synced(self, board):
+        # -> (since, until) of the window fully ingested for board, or None
+        row = self._conn().execute('SELECT since, until FROM synced WHERE board = ?', (board,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def board_id(self, name):
+        row = self._conn().execute('SELECT board FROM synced WHERE lower(name) = lower(?)', (name,)).fetchone()
+        return row[0] if row else None
+
+    def gaps(self, board, since, until):
+        # -> windows still to fetch so that [since, until] is covered. The synced window stays
+        # contiguous: a later window is fetched from where the last sync ended.
+        have = self.synced(board)
+        if not have:
+            return [(since, until)]
+        out = []
+        if until > have[1]:
+            out.append((have[1], until))
+        if since < have[0]:
+            out.append((since, have[0]))
+        return out
+
+    def mark_synced(self, board, name, since, until):
+        self._conn().execute('''
+            INSERT INTO synced (board, name, since, until) VALUES (?, ?, ?, ?)
+            ON CONFLICT (board) DO UPDATE SET name = excluded.name,
+                since = min(since, excluded.since), until = max(until, excluded.until)''',
+            (board, name, since, until))
+
+    def totals(self, board, dim, since_day, until_day, limit=None):
+        # -> [(key, n)] over the inclusive day range, largest first
+        rows = self._conn().execute('''
+            SELECT key, SUM(n) AS total FROM daily_counts
+            WHERE board = ? AND dim = ? AND day BETWEEN ? AND ?
+            GROUP BY key ORDER BY total DESC, key LIMIT ?''',
+            (board, dim, since_day, until_day, limit if limit else -1)).fetchall()
+        return [(k, n) for k, n in rows]
+
+    def series(self, board, dim, since_day, until_day, period='week', keys=None):
+        # -> { period start: { key: n } } over the inclusive day range, optionally only for keys
+        where, args = '', [board, dim, since_day, until_day]
+        if keys is not None:
+            keys = list(keys)
+            where = f' AND key IN ({",".join("?" * len(keys))})'
+            args += keys
+        out = {}
+        for start, key, n in self._conn().execute(f'''
+                SELECT {PERIODS[period]} AS p, key, SUM(n) FROM daily_counts
+                WHERE board = ? AND dim = ? AND day BETWEEN ? AND ?{where}
+                GROUP BY p, key ORDER BY p, key''', args):
+            out.setdefault(start, {})[key] = n
+        return out
+
+    def card_names(self, board, card_ids):
+        out = {}
+        card_ids = list(card_ids)
+        for i in range(0, len(card_ids), 500):
+            chunk = card_ids[i:i + 500]
+            out.update(self._conn().execute(
+                f'SELECT card, name FROM cards WHERE board = ? AND card IN ({",".join("?" * len(chunk))})',
+                [board] + chunk).fetchall())
+        return out
+
+    def cycle_times(self, board, since_day, until_day, in_progress_list=None, completed_list=None, period='week'):
+        # Cycle time of each card completed in the range: from its first entry into an In Progress
+        # list to its last entry into a Completed one. Cards never in progress are left out.
+        columns = trello_rules.ActionRules(in_progress_list, completed_list).columns
+        rows = self._conn().execute('''
+            SELECT card, list, first, last FROM card_lists
+            WHERE board = ? AND card IN (SELECT card FROM card_lists WHERE board = ? AND last >= ? AND last < ?)''',
+            (board, board, since_day, (date.fromisoformat(until_day) + timedelta(days=1)).isoformat())).fetchall()
+        started, completed = {}, {}
+        for card, lst, first, last in rows:
+            col = columns.get(trello_rules.norm(lst))
+            if col == trello_rules.IN_PROGRESS:
+                started[card] = min(started.get(card, first), first)
+            elif col == trello_rules.COMPLETED:
+                completed[card] = max(completed.get(card, last), last)
+        done = []
+        for card, end in completed.items():
+            start = started.get(card)
+            if start and start < end and since_day <= end[:10] <= until_day:
+                done.append((card, start, end, iso_hours(start, end)))
+        by_period = {}
+        for _, _, end, hours in done:
+            by_period.setdefault(period_start(end[:10], period), []).append(hours)
+
+        def describe(hours):
+            hours = sorted(hours)
+            return {'cards': len(hours), 'medianHours': round(percentile(hours, 50), 1), 'p90Hours': round(percentile(hours, 90), 1)}
+
+        slowest = sorted(done, key=lambda d: -d[3])[:5]
+        names = self.card_names(board, [d[0] for d in slowest])
+        return {
+            **(describe([d[3] for d in done]) if done else {'cards': 0, 'medianHours': None, 'p90Hours': None}),
+            'byPeriod': {p: describe(h) for p, h in sorted(by_period.items())},
+            'slowest': [{'cardId': c, 'card': names.get(c), 'started': s, 'completed': e, 'hours': round(h, 1)} for c, s, e, h in slowest],
+        }
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            'actions': conn.execute('SELECT COUNT(*) FROM seen_actions').fetchone()[0],
+            'counters': conn.execute('SELECT COUNT(*) FROM daily_counts').fetchone()[0],
+            'boards': {name or board: {'since': s, 'until': u} for board, name, s, u in conn.execute('SELECT board, name, since, until FROM synced')},
+        }
+
+
+def stats_path():
+    return os.getenv('TRELLO_STATS_PATH') or '/tmp/daily-digest-trello-stats.sqlite3'
+
+
+get_stats = lazy(lambda: ActivityStats(stats_path()))
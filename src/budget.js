@@ -0,0 +1,27 @@
+// Time-budgeted backend calls. The backend stops collecting when X-Digest-Budget-Ms runs out
+// and marks answers it had to cut short with X-Digest-Partial; the browser gives up a little later.
+const GRACE_MS = 2000;
+
+export async function budgetedFetch(url, budgetMs) {
+  const headers = { 'Accept': 'application/json' };
+  if (!budgetMs) return { r: await fetch(url, { headers }), partial: false };
+  headers['X-Digest-Budget-Ms'] = String(Math.max(1, Math.round(budgetMs)));
+  const r = await fetch(url, { headers, signal: AbortSignal.timeout(budgetMs + GRACE_MS) });
+  return { r, partial: r.headers.get('X-Digest-Partial') === 'true' };
+}
+
+// Carries the HTTP status so isBudgetError can recognise a 504
+export function backendError(path, status, text) {
+  return Object.assign(new Error(`Backend ${path} HTTP ${status} ${text}`), { status });
+}
+
+// Lists keep their shape; a partial one carries .partial = true for the page to flag
+export function withPartial(list, partial) {
+  if (partial) list.partial = true;
+  return list;
+}
+
+// Out of time rather than broken: the section is shown as partial instead of raising an alert
+export function isBudgetError(e) {
+  return e?.name === 'TimeoutError' || e?.name === 'AbortError' || e?.status === 504;
+}
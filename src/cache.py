@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import metrics
+
+# Response cache shared by every worker on a host.
+# CACHE_BACKEND=sqlite (shared across processes), memory (per process) or none.
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+
+class MemoryCache:
+    def __init__(self, default_ttl=300, max_entries=2000):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if not item:
+                return None
+            expires, value = item
+            if expires and expires < time.time():
+                self._data.pop(key, None)
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                # Drop the entries closest to expiry
+                for k, _ in sorted(self._data.items(), key=lambda kv: kv[1][0] or float('inf'))[: self.max_entries // 10 or 1]:
+                    self._data.pop(k, None)
+            self._data[key] = ((time.time() + ttl) if ttl else 0, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteStore:
+    # Base for everything kept in a local SQLite file: one connection per thread, WAL so readers
+    # never wait on the writer, autocommit so callers open their own BEGIN IMMEDIATE when needed
+    pragmas = ('journal_mode=WAL',)
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            for pragma in self.pragmas:
+                conn.execute(f'PRAGMA {pragma}')
+            self._local.conn = conn
+        return conn
+
+
+def lazy(make):
+    # -> a getter that builds make() once per process, on first use
+    made = []
+    lock = threading.Lock()
+
+    def get():
+        if not made:
+            with lock:
+                if not made:
+                    made.append(make())
+        return made[0]
+    return get
+
+
+class SQLiteCache(SQLiteStore):
+    pragmas = ('journal_mode=WAL', 'synchronous=NORMAL')
+
+    def __init__(self, path, default_ttl=300):
+        super().__init__(path)
+        self.default_ttl = default_ttl
+        conn = self._conn()
+        conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires REAL, value TEXT)')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+        conn.commit()
+
+    def get(self, key):
+        try:
+            row = self._conn().execute('SELECT expires, value FROM cache WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if not row:
+            return None
+        expires, value = row
+        if expires and expires < time.time():
+            return None
+        try:
+            return json.loads(value)
+        except Exception:
+            return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            conn = self._conn()
+            conn.execute('INSERT OR REPLACE INTO cache (key, expires, value) VALUES (?, ?, ?)',
+                         (key, (time.time() + ttl) if ttl else 0, json.dumps(value)))
+            # Opportunistic cleanup keeps the file from growing without bound
+            if hash(key) % 50 == 0:
+                conn.execute('DELETE FROM cache WHERE expires > 0 AND expires < ?', (time.time(),))
+        except sqlite3.Error:
+            pass
+
+    def delete(self, key):
+        try:
+            self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+        except sqlite3.Error:
+            pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is None:
+            backend = (os.getenv('CACHE_BACKEND') or 'memory').strip().lower()
+            ttl = int(os.getenv('CACHE_TTL_SECONDS') or '300')
+            if backend == 'sqlite':
+                _cache = SQLiteCache(os.getenv('CACHE_PATH') or '/tmp/daily-digest-cache.sqlite3', ttl)
+            elif backend == 'none':
+                _cache = NullCache()
+            else:
+                _cache = MemoryCache(ttl)
+    return _cache
+
+
+def get_or_compute(name, key, compute, ttl=None):
+    c = get_cache()
+    value = c.get(key)
+    metrics.record_cache(name, value is not None)
+    if value is not None:
+        return value
+    value = compute()
+    c.set(key, value, ttl)
+    return value
@@ -0,0 +1,42 @@
+import os
+import json
+import time
+from cache import SQLiteStore, lazy
+
+# Permanent store of per-commit details (additions, deletions, touched files), keyed by SHA.
+# A commit never changes once it exists, so entries never expire: each commit is fetched from
+# GitHub at most once per store, however many digests later list it.
+
+
+class CommitDetailStore(SQLiteStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self._conn().execute('''
+            CREATE TABLE IF NOT EXISTS commit_details (
+                sha TEXT PRIMARY KEY, repo TEXT, additions INTEGER, deletions INTEGER, files TEXT, fetched REAL
+            )
+        ''')
+
+    def get_many(self, shas):
+        # -> { sha: { additions, deletions, files } } for the shas already stored
+        out = {}
+        shas = list(shas)
+        for i in range(0, len(shas), 500):
+            chunk = shas[i:i + 500]
+            rows = self._conn().execute(
+                f'SELECT sha, additions, deletions, files FROM commit_details WHERE sha IN ({",".join("?" * len(chunk))})',
+                chunk).fetchall()
+            for sha, additions, deletions, files in rows:
+                out[sha] = {'additions': additions, 'deletions': deletions, 'files': json.loads(files)}
+        return out
+
+    def put(self, sha, repo, detail):
+        self._conn().execute(
+            'INSERT OR IGNORE INTO commit_details (sha, repo, additions, deletions, files, fetched) VALUES (?, ?, ?, ?, ?, ?)',
+            (sha, repo, detail['additions'], detail['deletions'], json.dumps(detail['files']), time.time()))
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM commit_details').fetchone()[0]
+
+
+get_store = lazy(lambda: CommitDetailStore(os.getenv('COMMIT_DETAILS_PATH') or '/tmp/daily-digest-commit-details.sqlite3'))
@@ -17,4 +17,14 @@ export const API_BASE_URLS = [
   isLocalHost() ? RENDER_BASE : LOCAL_BASE,
 ].filter(Boolean);
 
-export const API_BASE_URL = API_BASE_URLS[0];
\ No newline at end of file
+export const API_BASE_URL = API_BASE_URLS[0];
+// Static per-day snapshots (written by scripts/create_daily_card.py --snapshot-dir snapshots).
+// Set window.CONFIG.SNAPSHOT_BASE_URL to '' to always use the live API.
+export const SNAPSHOT_BASE_URL = (window.CONFIG && window.CONFIG.SNAPSHOT_BASE_URL !== undefined)
+  ? window.CONFIG.SNAPSHOT_BASE_URL
+  : 'snapshots';
+// Whole-digest time budget for live loads: sections still missing when it runs out are shown as partial.
+// Set window.CONFIG.DIGEST_BUDGET_MS to 0 to wait for every source.
+export const DIGEST_BUDGET_MS = (window.CONFIG && window.CONFIG.DIGEST_BUDGET_MS !== undefined)
+  ? Number(window.CONFIG.DIGEST_BUDGET_MS)
+  : 20000;
@@ -0,0 +1,74 @@
+import time
+import threading
+from contextlib import contextmanager
+import requests
+
+# Whole-operation time budgets. A deadline is an absolute wall-clock time (so it can be handed
+# to worker processes) kept per thread; http_client clamps every upstream timeout to what is
+# left and raises DeadlineExceeded once it is spent, so collection stops and callers keep
+# whatever already finished. hit() tells whether anything was cut short.
+
+_local = threading.local()
+
+
+class DeadlineExceeded(requests.Timeout):
+    pass
+
+
+@contextmanager
+def until(at):
+    # at: epoch seconds, or None for no deadline (an enclosing, earlier deadline still applies)
+    prev = getattr(_local, 'at', None), getattr(_local, 'hit', False)
+    if at is not None and prev[0] is not None:
+        at = min(at, prev[0])
+    _local.at, _local.hit = (at if at is not None else prev[0]), False
+    try:
+        yield
+    finally:
+        hit = _local.hit
+        _local.at, _local.hit = prev[0], prev[1] or hit
+
+
+def budget(seconds):
+    return until(time.time() + seconds if seconds else None)
+
+
+def at():
+    return getattr(_local, 'at', None)
+
+
+def remaining():
+    a = at()
+    return None if a is None else a - time.time()
+
+
+def expired():
+    r = remaining()
+    return r is not None and r <= 0
+
+
+def hit():
+    return getattr(_local, 'hit', False)
+
+
+def mark_hit():
+    _local.hit = True
+
+
+def check():
+    if expired():
+        mark_hit()
+        raise DeadlineExceeded('Digest time budget exhausted')
+
+
+def clamp(timeout):
+    # -> timeout no longer than the time left; raises DeadlineExceeded when none is left
+    left = remaining()
+    if left is None:
+        return timeout
+    check()
+    if timeout is None:
+        return left
+    if isinstance(timeout, tuple):
+        return tuple(min(t, left) if t is not None else left for t in timeout)
+    return min(timeout, left)
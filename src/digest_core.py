@@ -1,7 +1,14 @@
 import os
-import requests
 import re
-from datetime import datetime
+import threading
+import requests
+import http_client
+import metrics
+import trello_rules
+import fetch_profiles
+import commit_details
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 # --- simple .env loader (no external deps) ---
 def load_env_file(path='.env'):
@@ -23,69 +30,93 @@ def load_env_file(path='.env'):
     except Exception:
         pass
 
-def fetch_github_commits(owner, repo, branch, since, until):
+# Upstream base URLs; override to point at a local stand-in (scripts/stub_upstream.py)
+def github_api_base():
+    return (os.getenv('GITHUB_API_BASE') or 'https://api.github.com').strip().rstrip('/')
+
+def trello_api_base():
+    return (os.getenv('TRELLO_API_BASE') or 'https://api.trello.com/1').strip().rstrip('/')
+
+def openai_api_base():
+    return (os.getenv('OPENAI_API_BASE') or 'https://api.openai.com/v1').strip().rstrip('/')
+
+# Daily digest window: 09:00 SGT to 09:00 SGT
+SGT_OFFSET = timedelta(hours=8)
+
+def get_sgt_time_range(now_utc=None):
+    # Current time in UTC (when script runs)
+    now_utc = now_utc or datetime.now(timezone.utc)
+    # Convert to SGT
+    now_sgt = now_utc + SGT_OFFSET
+    
+    # Target End: Today 9:00 AM SGT
+    end_sgt = now_sgt.replace(hour=9, minute=0, second=0, microsecond=0)
+    
+    start_sgt = end_sgt - timedelta(days=1)
+    
+    # Convert back to UTC for API
+    start_utc = start_sgt - SGT_OFFSET
+    end_utc = end_sgt - SGT_OFFSET
+    
+    return start_utc, end_utc, start_sgt, end_sgt
+
+def github_headers():
     token = os.getenv('GITHUB_TOKEN', '').strip()
-    headers = {
+    return {
         'Accept': 'application/vnd.github+json',
         **({ 'Authorization': f'Bearer {token}' } if token else {})
     }
-    commits = []
-    page = 1
-    while page < 10:
-        url = f"https://api.github.com/repos/{owner}/{repo}/commits?sha={branch}&since={since}&until={until}&per_page=100&page={page}"
-        r = requests.get(url, headers=headers, timeout=30)
-        if r.status_code >= 400:
-            break
-        batch = r.json()
-        commits.extend(batch)
-        if len(batch) < 100:
-            break
-        page += 1
 
-    def to_utc_iso(s):
+def to_utc_iso(s):
+    try:
+        return datetime.fromisoformat(s.replace('Z', '+00:00')).astimezone().isoformat().replace('+00:00', 'Z')
+    except Exception:
         try:
-            return datetime.fromisoformat(s.replace('Z', '+00:00')).astimezone().isoformat().replace('+00:00', 'Z')
+            return datetime.strptime(s, '%Y-%m-%dT%H:%M:%S%z').astimezone().isoformat().replace('+00:00', 'Z')
         except Exception:
-            try:
-                return datetime.strptime(s, '%Y-%m-%dT%H:%M:%S%z').astimezone().isoformat().replace('+00:00', 'Z')
-            except Exception:
-                return s or ''
+            return s or ''
+
+def normalize_commit(c):
+    msg = (c.get('commit') or {}).get('message', '')
+    author_name = ((c.get('commit') or {}).get('author') or {}).get('name') or (c.get('author') or {}).get('login') or ''
+    author_date = ((c.get('commit') or {}).get('author') or {}).get('date') or ''
+    return {
+        'sha': c.get('sha'),
+        'url': c.get('html_url'),
+        'message': msg,
+        'author': author_name,
+        'date': to_utc_iso(author_date)
+    }
 
-    normalized = []
-    for c in commits:
-        msg = (c.get('commit') or {}).get('message', '')
-        author_name = ((c.get('commit') or {}).get('author') or {}).get('name') or (c.get('author') or {}).get('login') or ''
-        author_date = ((c.get('commit') or {}).get('author') or {}).get('date') or ''
-        normalized.append({
-            'sha': c.get('sha'),
-            'url': c.get('html_url'),
-            'message': msg,
-            'author': author_name,
-            'date': to_utc_iso(author_date)
-        })
-    return normalized
+def github_commit_pages(owner, repo, branch, since, until):
+    # Streams raw commits over Link pagination; check .error / .truncated after iterating
+    url = f"{github_api_base()}/repos/{owner}/{repo}/commits?sha={branch}&since={since}&until={until}&per_page=100&page=1"
+    return http_client.Pages(url, headers=github_headers(), timeout=30)
 
-def fetch_org_commits(org, since, until, repos_filter=None, max_repos=50):
-    token = os.getenv('GITHUB_TOKEN', '').strip()
-    headers = {
-        'Accept': 'application/vnd.github+json',
-        **({ 'Authorization': f'Bearer {token}' } if token else {})
+def github_org_repo_pages(org):
+    url = f"{github_api_base()}/orgs/{org}/repos?per_page=100&page=1&type=all&sort=updated"
+    return http_client.Pages(url, headers=github_headers(), timeout=30)
+
+def fetch_github_commit_group(owner, repo, branch, since, until, url=None):
+    # -> { repo, url, branch, commits, truncated } or None when there are no commits
+    pages = github_commit_pages(owner, repo, branch, since, until)
+    commits = [normalize_commit(c) for c in pages]
+    if not commits:
+        return None
+    return {
+        'repo': repo,
+        'url': url if url is not None else f'https://github.com/{owner}/{repo}',
+        'branch': branch,
+        'commits': commits,
+        'truncated': pages.truncated
     }
-    
-    # List repos
-    repos = []
-    page = 1
-    while len(repos) < max_repos and page < 10:
-        url = f"https://api.github.com/orgs/{org}/repos?per_page=100&page={page}&type=all&sort=updated"
-        r = requests.get(url, headers=headers, timeout=30)
-        if r.status_code >= 400:
-            break
-        batch = r.json() or []
-        repos.extend(batch)
-        if len(batch) < 100:
-            break
-        page += 1
 
+def fetch_github_commits(owner, repo, branch, since, until):
+    group = fetch_github_commit_group(owner, repo, branch, since, until)
+    return group['commits'] if group else []
+
+def select_repos(repos, repos_filter=None, max_repos=50):
+    # Consumes a (streamed) repo listing only as far as needed to pick max_repos repos
     filter_set = {n.strip().lower() for n in repos_filter.split(',') if n.strip()} if repos_filter else None
     selected = []
     for r in repos:
@@ -99,23 +130,202 @@ def fetch_org_commits(org, since, until, repos_filter=None, max_repos=50):
             'full_name': r.get('full_name') or name,
             'html_url': r.get('html_url') or '',
             'default_branch': r.get('default_branch') or 'main',
-            'pushed_at': r.get('pushed_at') or ''
+            'pushed_at': r.get('pushed_at') or '',
+            'fork': bool(r.get('fork'))
         })
         if len(selected) >= max_repos:
             break
+    return selected
+
+# GitHub commit search only serves the first 1000 results of a query
+SEARCH_MAX_RESULTS = 1000
+
+def commit_search_enabled():
+    return (os.getenv('GITHUB_COMMIT_SEARCH') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def search_ts(s):
+    try:
+        return datetime.fromisoformat(s.replace('Z', '+00:00')).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    except Exception:
+        return s
+
+def search_org_commits(org, since, until, selected):
+    # One paginated org-wide commit search instead of a commits probe per repo. Search covers
+    # default branches, which is what the per-repo path lists. Returns groups for the selected
+    # repos in their listing order, or None when the caller should fall back to per-repo listing
+    # (rate limited, incomplete results, or more than the search can return).
+    def fallback(reason):
+        metrics.inc('github_commit_search_total', {'outcome': reason})
+        return None
 
+    q = f'org:{org} committer-date:{search_ts(since)}..{search_ts(until)}'
+    pages = http_client.Pages(f'{github_api_base()}/search/commits',
+                              params={'q': q, 'sort': 'committer-date', 'order': 'desc', 'per_page': 100},
+                              items_key='items', headers=github_headers(), timeout=30)
+    wanted = {r['name'].lower(): r for r in selected}
+    found = {}
+    try:
+        for c in pages:
+            if (pages.total_count or 0) > SEARCH_MAX_RESULTS:
+                return fallback('too_many')
+            repo = c.get('repository') or {}
+            owner = (repo.get('full_name') or '').split('/')[0].lower()
+            name = (repo.get('name') or '').lower()
+            if owner == org.lower() and name in wanted:
+                found.setdefault(name, []).append(normalize_commit(c))
+    except requests.RequestException:
+        return fallback('error')
+    if pages.error is not None:
+        return fallback('rate_limited' if pages.error.status_code in (403, 429) else 'error')
+    if pages.incomplete:
+        return fallback('incomplete')
+    if pages.truncated:
+        return fallback('too_many')
+    metrics.inc('github_commit_search_total', {'outcome': 'ok'})
     groups = []
-    for repo in selected:
-        commits = fetch_github_commits(org, repo['name'], repo['default_branch'], since, until)
+    for r in selected:
+        commits = found.get(r['name'].lower())
         if commits:
             groups.append({
-                'repo': repo['name'],
-                'url': repo['html_url'],
-                'branch': repo['default_branch'],
-                'commits': commits
+                'repo': r['name'],
+                'url': r['html_url'],
+                'branch': r['default_branch'],
+                'commits': commits,
+                'truncated': False
             })
     return groups
 
+def fetch_org_commits(org, since, until, repos_filter=None, max_repos=50):
+    selected = select_repos(github_org_repo_pages(org), repos_filter, max_repos)
+    if commit_search_enabled() and selected:
+        groups = search_org_commits(org, since, until, selected)
+        if groups is not None:
+            return groups
+    groups = []
+    for repo in selected:
+        group = fetch_github_commit_group(org, repo['name'], repo['default_branch'], since, until, url=repo['html_url'])
+        if group:
+            groups.append(group)
+    return groups
+
+# --- mirrors and duplicate commits ---
+
+def repo_head_sha(owner, repo, branch):
+    # Just the branch head's SHA (one small call): equal heads mean identical histories
+    headers = {**github_headers(), 'Accept': 'application/vnd.github.sha'}
+    r = http_client.get(f"{github_api_base()}/repos/{owner}/{repo}/commits/{branch}", headers=headers, timeout=30)
+    r.raise_for_status()
+    return r.text.strip() or None
+
+def dedupe_commit_groups(groups):
+    # -> groups with every SHA listed once, first group wins. A group whose commits were all
+    # listed by one earlier group is a mirror: it is dropped and named in that group's 'mirrors'.
+    # Groups that keep some commits note how many were dropped as 'duplicates'.
+    # The groups passed in are not modified.
+    owner_of = {}
+    out = []
+    for g in groups:
+        commits, firsts = [], {}
+        for c in g.get('commits') or []:
+            first = owner_of.get(c.get('sha'))
+            if first is None:
+                commits.append(c)
+            else:
+                firsts[id(first)] = first
+        if g.get('commits') and not commits and len(firsts) == 1:
+            first = next(iter(firsts.values()))
+            first['mirrors'] = first.get('mirrors', []) + [(g.get('url') or '').split('github.com/')[-1] or g['repo']]
+            continue
+        dropped = len(g.get('commits') or []) - len(commits)
+        g = {**g, 'commits': commits}
+        if dropped:
+            g['duplicates'] = dropped
+        out.append(g)
+        for c in commits:
+            owner_of.setdefault(c.get('sha'), g)
+    return out
+
+# --- commit details (opt-in enrichment) ---
+
+COMMIT_URL_RE = re.compile(r'github\.com/([^/]+)/([^/]+)/commit/([0-9a-fA-F]+)')
+# Enrichment stops once GitHub reports fewer requests left than this, so listings keep working
+COMMIT_DETAILS_RATE_FLOOR = 100
+
+def commit_details_enabled():
+    return (os.getenv('DIGEST_COMMIT_DETAILS') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+def fetch_commit_detail(owner, repo, sha):
+    # -> ({ additions, deletions, files }, requests left in the rate-limit window or None)
+    r = http_client.get(f"{github_api_base()}/repos/{owner}/{repo}/commits/{sha}", headers=github_headers(), timeout=30)
+    r.raise_for_status()
+    c = r.json()
+    stats = c.get('stats') or {}
+    files = [f.get('filename') for f in c.get('files') or [] if f.get('filename')]
+    remaining = r.headers.get('X-RateLimit-Remaining')
+    return ({'additions': int(stats.get('additions') or 0), 'deletions': int(stats.get('deletions') or 0), 'files': files},
+            int(remaining) if remaining and remaining.isdigit() else None)
+
+def enrich_commit_groups(groups, workers=None):
+    # Adds additions/deletions/files to every commit and a per-repo 'stats' summary to every group,
+    # in place. Details come from the SHA-keyed store; only commits never seen before are fetched,
+    # concurrently, until GitHub's remaining rate limit reaches COMMIT_DETAILS_RATE_FLOOR.
+    # -> { cached, fetched, failed, skipped }
+    store = commit_details.get_store()
+    commits = {}
+    for g in groups:
+        for c in g.get('commits') or []:
+            m = COMMIT_URL_RE.search(c.get('url') or '')
+            if c.get('sha') and m:
+                commits.setdefault(c['sha'], (m.group(1), m.group(2)))
+    known = store.get_many(commits)
+    missing = [sha for sha in commits if sha not in known]
+    counts = {'cached': len(known), 'fetched': 0, 'failed': 0, 'skipped': 0}
+    stop = threading.Event()
+
+    def fetch(sha):
+        if stop.is_set():
+            return sha, None, 'skipped'
+        owner, repo = commits[sha]
+        try:
+            detail, remaining = fetch_commit_detail(owner, repo, sha)
+        except requests.RequestException:
+            return sha, None, 'failed'
+        if remaining is not None and remaining < COMMIT_DETAILS_RATE_FLOOR:
+            stop.set()
+        store.put(sha, f'{owner}/{repo}', detail)
+        return sha, detail, 'fetched'
+
+    if missing:
+        workers = workers or int(os.getenv('COMMIT_DETAILS_CONCURRENCY') or '8')
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing)))) as pool:
+            for sha, detail, outcome in pool.map(fetch, missing):
+                counts[outcome] += 1
+                if detail is not None:
+                    known[sha] = detail
+    for outcome, n in counts.items():
+        if n:
+            metrics.inc('commit_details_total', {'outcome': outcome}, n)
+
+    for g in groups:
+        stats = {'additions': 0, 'deletions': 0, 'commits': 0, 'missing': 0, 'files': {}, 'authors': {}}
+        for c in g.get('commits') or []:
+            d = known.get(c.get('sha'))
+            if d is None:
+                stats['missing'] += 1
+                continue
+            c.update(d)
+            stats['commits'] += 1
+            stats['additions'] += d['additions']
+            stats['deletions'] += d['deletions']
+            for f in d['files']:
+                stats['files'][f] = stats['files'].get(f, 0) + 1
+            a = stats['authors'].setdefault(c.get('author') or 'unknown', {'commits': 0, 'additions': 0, 'deletions': 0})
+            a['commits'] += 1
+            a['additions'] += d['additions']
+            a['deletions'] += d['deletions']
+        g['stats'] = stats
+    return counts
+
 def trello_get(url, params=None):
     key = os.getenv('TRELLO_KEY', '').strip()
     token = os.getenv('TRELLO_TOKEN', '').strip()
@@ -123,7 +333,7 @@ def trello_get(url, params=None):
         raise ValueError('Missing TRELLO_KEY/TRELLO_TOKEN')
     params = params or {}
     params.update({'key': key, 'token': token})
-    r = requests.get(url, params=params, timeout=30)
+    r = http_client.cached_get(url, params=params, timeout=30)
     r.raise_for_status()
     return r.json()
 
@@ -134,22 +344,29 @@ def trello_post(url, data=None, params=None):
         raise ValueError('Missing TRELLO_KEY/TRELLO_TOKEN')
     params = params or {}
     params.update({'key': key, 'token': token})
-    r = requests.post(url, json=data, params=params, timeout=30)
+    r = http_client.post(url, json=data, params=params, timeout=30)
     r.raise_for_status()
     return r.json()
 
+def fetch_card_comments(card_id):
+    # -> every comment on a card, oldest first: [{ text, date, member }]
+    actions = trello_get(f'{trello_api_base()}/cards/{card_id}/actions', params={**fetch_profiles.COMMENTS, 'limit': 1000})
+    return [{'text': (a.get('data') or {}).get('text') or '', 'date': a.get('date') or '',
+             'member': (a.get('memberCreator') or {}).get('fullName') or ''}
+            for a in sorted(actions or [], key=lambda a: a.get('date') or '')]
+
 def fetch_trello_notes(board_name, list_name, since, until):
-    boards = trello_get('https://api.trello.com/1/members/me/boards')
+    boards = trello_get(f'{trello_api_base()}/members/me/boards', params=dict(fetch_profiles.NAME_ONLY))
     board = next((b for b in boards if (b.get('name') or '').lower() == board_name.lower()), None)
     if not board:
         raise ValueError(f'Board not found: {board_name}')
     
-    lists = trello_get(f'https://api.trello.com/1/boards/{board.get("id")}/lists')
+    lists = trello_get(f'{trello_api_base()}/boards/{board.get("id")}/lists', params=dict(fetch_profiles.NAME_ONLY))
     lst = next((l for l in lists if (l.get('name') or '').lower() == list_name.lower()), None)
     if not lst:
         raise ValueError(f'List not found: {list_name}')
         
-    cards = trello_get(f'https://api.trello.com/1/lists/{lst.get("id")}/cards', params={'fields': 'name,desc,dateLastActivity,shortUrl'})
+    cards = trello_get(f'{trello_api_base()}/lists/{lst.get("id")}/cards', params=dict(fetch_profiles.NOTE_CARDS))
 
     since_t = datetime.fromisoformat(since.replace('Z', '+00:00')).timestamp()
     until_t = datetime.fromisoformat(until.replace('Z', '+00:00')).timestamp()
@@ -221,128 +438,23 @@ def fetch_trello_notes(board_name, list_name, since, until):
     return results
 
 def fetch_trello_actions(board_name, since, until, types=None, in_progress_list=None, completed_list=None):
-    boards = trello_get('https://api.trello.com/1/members/me/boards')
+    boards = trello_get(f'{trello_api_base()}/members/me/boards', params=dict(fetch_profiles.NAME_ONLY))
     board = next((b for b in boards if (b.get('name') or '').lower() == board_name.lower()), None)
     if not board:
         raise ValueError(f'Board not found: {board_name}')
 
-    params = {
-        'limit': 1000,
-        'since': since,
-        'before': until,
-    }
-    if types and types.lower() != 'all':
-        params['filter'] = types
-    else:
-        params['filter'] = 'all'
-
-    actions = trello_get(f'https://api.trello.com/1/boards/{board.get("id")}/actions', params=params) or []
-
-    def norm(s):
-        return (s or '').strip().lower()
-    
-    base_in_progress = {'in progress', 'in-progress', 'doing'}
-    base_completed = {'completed', 'complete', 'done'}
-    target_in_progress = (base_in_progress | ({norm(in_progress_list)} if in_progress_list else set()))
-    target_completed = (base_completed | ({norm(completed_list)} if completed_list else set()))
-
-    def action_card_id(a):
-        return ((a.get('data') or {}).get('card') or {}).get('id')
-
-    def action_list_after(a):
-        d = a.get('data') or {}
-        return ((d.get('listAfter') or {}).get('name')) or ((d.get('list') or {}).get('name'))
-
-    def is_move_or_create_into_target(a):
-        t = (a.get('type') or '').strip()
-        la = norm(action_list_after(a))
-        return ((t == 'updateCard' and la in target_in_progress.union(target_completed)) or
-                (t == 'createCard' and la in target_in_progress.union(target_completed)) or
-                (t == 'copyCard' and la in target_in_progress.union(target_completed)) or
-                (t == 'moveCardToBoard' and la in target_in_progress.union(target_completed)))
-
-    def is_comment_with_link(a):
-        t = (a.get('type') or '').strip()
-        txt = ((a.get('data') or {}).get('text') or '')
-        return t == 'commentCard' and ('http://' in txt or 'https://' in txt)
-
-    def is_checklist_complete(a):
-        t = (a.get('type') or '').strip()
-        d = (a.get('data') or {})
-        state = ((d.get('checkItem') or {}).get('state') or '').strip().lower()
-        return t == 'updateCheckItemStateOnCard' and state == 'complete'
-
-    def is_attachment_added(a):
-        t = (a.get('type') or '').strip()
-        return t == 'addAttachmentToCard'
-
-    def column_key_from_action(a):
-        name = action_list_after(a)
-        n = norm(name)
-        if n in target_in_progress:
-            return 'In Progress'
-        if n in target_completed:
-            return 'Completed'
-        return None
-
-    card_target_map = {}
-    for a in actions:
-        if is_move_or_create_into_target(a):
-            cid = action_card_id(a)
-            col = column_key_from_action(a)
-            if cid and col:
-                prev = card_target_map.get(cid)
-                if prev != 'Completed':
-                    card_target_map[cid] = col
-
-    filtered = []
-    for a in actions:
-        if is_move_or_create_into_target(a):
-            filtered.append(a)
-            continue
-        cid = action_card_id(a)
-        if cid in card_target_map and (is_comment_with_link(a) or is_checklist_complete(a) or is_attachment_added(a)):
-            filtered.append(a)
-
-    groups_map = {}
-    
-    def pick_action(a):
-        data = a.get('data') or {}
-        card = data.get('card') or {}
-        list_name = (data.get('list') or {}).get('name') or ((data.get('listAfter') or {}).get('name'))
-        return {
-            'date': a.get('date'),
-            'type': a.get('type'),
-            'member': (a.get('memberCreator') or {}).get('fullName'),
-            'cardId': card.get('id'),
-            'card': card.get('name'),
-            'list': list_name,
-            'text': data.get('text'),
-            'attachment': (data.get('attachment') or {}),
-            'checkItemName': ((data.get('checkItem') or {}).get('name'))
-        }
-
-    for a in filtered:
-        cid_for_group = action_card_id(a)
-        col_key = card_target_map.get(cid_for_group) or column_key_from_action(a)
-        if col_key not in groups_map:
-            groups_map[col_key] = {}
-        pa = pick_action(a)
-        cid = pa.get('cardId')
-        if cid not in groups_map[col_key]:
-            groups_map[col_key][cid] = { 'name': pa.get('card'), 'actions': [] }
-        groups_map[col_key][cid]['actions'].append(pa)
+    # Only the action types and fields the classifier reads
+    params = fetch_profiles.board_actions(since, until, types)
+    actions = trello_get(f'{trello_api_base()}/boards/{board.get("id")}/actions', params=params) or []
 
+    rules = trello_rules.ActionRules(in_progress_list, completed_list)
     result_groups = []
-    for col, cards_map in groups_map.items():
-        cards = []
-        for _, entry in cards_map.items():
-            cards.append(entry)
-        cards.sort(key=lambda x: (x.get('name') or '').lower())
-        result_groups.append({ 'column': col, 'cards': cards })
-
-    order = {'In Progress': 0, 'Completed': 1}
-    result_groups = [g for g in result_groups if g['column'] in order]
-    result_groups.sort(key=lambda g: order.get(g['column'], 99))
+    for col, cards in rules.group(actions):
+        entries = []
+        for _, acts in cards:
+            picked = [trello_rules.pick_action(a) for a in acts]
+            entries.append({'name': picked[0].get('card'), 'actions': picked})
+        entries.sort(key=lambda x: (x.get('name') or '').lower())
+        result_groups.append({'column': col, 'cards': entries})
 
     return result_groups
@@ -1,3 +1,4 @@
+import { API_BASE_URL } from './config.js';
 export function initDragDrop(dropzone, fileInput, onFilesParsed) {
   const files = [];
   function prevent(e) { e.preventDefault(); e.stopPropagation(); }
@@ -50,4 +51,14 @@ export function initDragDrop(dropzone, fileInput, onFilesParsed) {
     }
     return null;
   }
-}
\ No newline at end of file
+}
+
+// Upload raw files to the backend transcript store; summaries can then send { id } instead of the text.
+export async function uploadTranscripts(fileList) {
+  const form = new FormData();
+  for (const f of fileList) form.append('file', f, f.name);
+  const r = await fetch(`${API_BASE_URL}/api/transcripts`, { method: 'POST', body: form });
+  if (!r.ok) { const t = await r.text(); throw new Error(`Backend /transcripts HTTP ${r.status} ${t}`); }
+  const data = await r.json();
+  return (data?.transcripts || []).map(t => ({ id: t.id, filename: t.filename, dateGuess: t.dateGuess }));
+}
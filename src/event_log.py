@@ -0,0 +1,230 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+
+from cache import SQLiteStore, lazy
+
+# Local log of webhook-delivered events (GitHub push commits, Trello board actions).
+# Each source keeps coverage spans: runs of deliveries no further apart than STALE_SECONDS.
+# A span covers from its first delivery until STALE_SECONDS after its last one, so a hook
+# that goes quiet (disabled, missed deliveries, backend down) stops covering and the rest of
+# the window is polled again. A restart always starts a new span.
+# The background prefetcher also polls into the log: each source then has one contiguous
+# synced window, covered exactly (polling misses nothing while the process is down).
+
+STALE_SECONDS = int(os.getenv('WEBHOOK_STALE_SECONDS') or '7200')
+
+def parse_ts(s):
+    try:
+        return datetime.fromisoformat((s or '').replace('Z', '+00:00')).astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+def to_z(s):
+    ts = parse_ts(s)
+    return ts.strftime('%Y-%m-%dT%H:%M:%SZ') if ts else (s or '')
+
+
+def now_z():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def to_ms_z(s):
+    # Keeps the milliseconds of the page's window ends (23:59:59.999Z), so they compare as strings
+    ts = parse_ts(s)
+    return ts.strftime('%Y-%m-%dT%H:%M:%S.') + f'{ts.microsecond // 1000:03d}Z' if ts else (s or '')
+
+
+class EventLog(SQLiteStore):
+    def __init__(self, path):
+        super().__init__(path)
+        # Deliveries may have been missed while no process was up: spans never continue across it
+        self.opened = now_z()
+        conn = self._conn()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS commits (
+                owner TEXT, repo TEXT, sha TEXT, branch TEXT, date TEXT,
+                author TEXT, message TEXT, url TEXT, repo_url TEXT,
+                PRIMARY KEY (owner, repo, sha)
+            );
+            CREATE INDEX IF NOT EXISTS commits_owner_date ON commits (owner, date);
+            CREATE TABLE IF NOT EXISTS trello_actions (
+                id TEXT PRIMARY KEY, board_id TEXT, type TEXT, date TEXT, body TEXT
+            );
+            CREATE INDEX IF NOT EXISTS trello_actions_board_date ON trello_actions (board_id, date);
+            CREATE TABLE IF NOT EXISTS coverage_spans (source TEXT, start TEXT, last TEXT, PRIMARY KEY (source, start));
+            CREATE TABLE IF NOT EXISTS synced (source TEXT PRIMARY KEY, since TEXT, until TEXT);
+            CREATE TABLE IF NOT EXISTS default_branches (owner TEXT, repo TEXT, branch TEXT, PRIMARY KEY (owner, repo));
+        ''')
+
+    # --- coverage ---
+
+    def touch(self, source, at=None):
+        # A delivery (or heartbeat) from source: extends its latest span, or starts a new one
+        # when that span went stale or predates this process
+        at = at or now_z()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT start, last FROM coverage_spans WHERE source = ? ORDER BY last DESC LIMIT 1',
+                               (source,)).fetchone()
+            if row and row[1] >= self.opened and parse_ts(at) - parse_ts(row[1]) <= timedelta(seconds=STALE_SECONDS):
+                conn.execute('UPDATE coverage_spans SET last = max(last, ?) WHERE source = ? AND start = ?', (at, source, row[0]))
+            else:
+                conn.execute('INSERT OR REPLACE INTO coverage_spans (source, start, last) VALUES (?, ?, ?)', (source, at, at))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def set_coverage(self, source, since):
+        # The log is known complete for source from since until now (e.g. after a replay)
+        self._conn().execute('INSERT OR REPLACE INTO coverage_spans (source, start, last) VALUES (?, ?, ?)',
+                             (source, to_z(since), now_z()))
+
+    def spans(self, source):
+        # -> [(start, end)] covered for source, oldest first; end is capped at now
+        now = now_z()
+        out = []
+        for start, last in self._conn().execute('SELECT start, last FROM coverage_spans WHERE source = ? ORDER BY start',
+                                                (source,)).fetchall():
+            end = (parse_ts(last) + timedelta(seconds=STALE_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ')
+            out.append((start, min(end, now)))
+        return out
+
+    def coverage_all(self):
+        rows = self._conn().execute('SELECT source, start, last FROM coverage_spans ORDER BY source, start').fetchall()
+        return [{'source': r[0], 'since': r[1], 'lastEvent': r[2],
+                 'coveredUntil': min((parse_ts(r[2]) + timedelta(seconds=STALE_SECONDS)).strftime('%Y-%m-%dT%H:%M:%SZ'), now_z())}
+                for r in rows]
+
+    def synced(self, source):
+        # -> (since, until) polled into the log for source, or None
+        row = self._conn().execute('SELECT since, until FROM synced WHERE source = ?', (source,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def mark_synced(self, source, since, until):
+        # Grows the synced window; one that does not touch it replaces it, so it never spans a hole
+        since, until = to_ms_z(since), to_ms_z(until)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT since, until FROM synced WHERE source = ?', (source,)).fetchone()
+            if row and since <= row[1] and until >= row[0]:
+                since, until = min(since, row[0]), max(until, row[1])
+            conn.execute('INSERT OR REPLACE INTO synced (source, since, until) VALUES (?, ?, ?)', (source, since, until))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def synced_all(self):
+        return [{'source': r[0], 'since': r[1], 'until': r[2]}
+                for r in self._conn().execute('SELECT source, since, until FROM synced ORDER BY source').fetchall()]
+
+    # --- GitHub ---
+
+    def set_default_branch(self, owner, repo, branch):
+        self._conn().execute('INSERT OR REPLACE INTO default_branches VALUES (?, ?, ?)', (owner.lower(), repo.lower(), branch))
+
+    def default_branch(self, owner, repo):
+        # -> the repo's default branch as last seen, or None
+        row = self._conn().execute('SELECT branch FROM default_branches WHERE owner = ? AND repo = ?',
+                                   (owner.lower(), repo.lower())).fetchone()
+        return row[0] if row else None
+
+    def add_commits(self, owner, repo, branch, repo_url, commits):
+        rows = [(owner.lower(), repo.lower(), c['sha'], branch, to_z(c.get('date')), c.get('author') or '',
+                 c.get('message') or '', c.get('url') or '', repo_url or '') for c in commits if c.get('sha')]
+        self._conn().executemany('INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def commits(self, owner, since, until, repo=None, branch=None):
+        q = 'SELECT repo, sha, branch, date, author, message, url, repo_url FROM commits WHERE owner = ? AND date >= ? AND date <= ?'
+        args = [owner.lower(), to_z(since), to_z(until)]
+        if repo:
+            q += ' AND repo = ?'
+            args.append(repo.lower())
+        if branch:
+            q += ' AND branch = ?'
+            args.append(branch)
+        q += ' ORDER BY date DESC'
+        return [{'repo': r[0], 'sha': r[1], 'branch': r[2], 'date': r[3], 'author': r[4], 'message': r[5], 'url': r[6], 'repoUrl': r[7]}
+                for r in self._conn().execute(q, args).fetchall()]
+
+    # --- Trello ---
+
+    def add_trello_action(self, board_id, action):
+        aid = action.get('id')
+        if not aid:
+            return 0
+        self._conn().execute('INSERT OR REPLACE INTO trello_actions VALUES (?, ?, ?, ?, ?)',
+                             (aid, board_id, action.get('type') or '', to_z(action.get('date')), json.dumps(action)))
+        return 1
+
+    def trello_actions(self, board_id, since, until, types=None):
+        q = 'SELECT body FROM trello_actions WHERE board_id = ? AND date >= ? AND date <= ?'
+        args = [board_id, to_z(since), to_z(until)]
+        if types:
+            q += f" AND type IN ({','.join('?' for _ in types)})"
+            args.extend(types)
+        q += ' ORDER BY date DESC'
+        return [json.loads(r[0]) for r in self._conn().execute(q, args).fetchall()]
+
+
+get_event_log = lazy(lambda: EventLog(os.getenv('EVENT_LOG_PATH') or '/tmp/daily-digest-events.sqlite3'))
+
+
+def branch_source(owner, repo, branch):
+    # Synced commits are kept per repo and branch
+    return f'github:{owner.lower()}/{repo.lower()}@{branch}'
+
+
+def split_window(since, until, spans):
+    # -> (poll, logged): the sub-windows of [since, until] outside and inside the covered spans,
+    # oldest first. Spans may overlap (several sources answer the same query).
+    s, u = parse_ts(since), parse_ts(until)
+    if s is None or u is None:
+        return [(since, until)], []
+    poll, logged, cur = [], [], s
+    for a, b in sorted((parse_ts(a), parse_ts(b)) for a, b in spans):
+        if a is None or b is None or b <= cur or b <= a:
+            continue
+        if a >= u:
+            break
+        if a > cur:
+            poll.append((cur, a))
+        end = min(b, u)
+        if logged and logged[-1][1] >= a:
+            logged[-1] = (logged[-1][0], end)
+        else:
+            logged.append((max(a, cur), end))
+        cur = end
+        if cur >= u:
+            break
+    if cur < u:
+        poll.append((cur, u))
+    fmt = lambda t: since if t == s else until if t == u else t.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return [(fmt(a), fmt(b)) for a, b in poll], [(fmt(a), fmt(b)) for a, b in logged]
+
+
+# --- webhook payload normalization ---
+
+def normalize_push(payload):
+    # GitHub push event -> (owner, repo, branch, repo_url, [commit dicts in the API's normalized shape])
+    repo = payload.get('repository') or {}
+    owner = ((repo.get('owner') or {}).get('login') or (repo.get('owner') or {}).get('name') or '')
+    ref = payload.get('ref') or ''
+    branch = ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ''
+    commits = []
+    for c in payload.get('commits') or []:
+        author = c.get('author') or {}
+        commits.append({
+            'sha': c.get('id'),
+            'url': c.get('url'),
+            'message': c.get('message') or '',
+            'author': author.get('name') or author.get('username') or '',
+            'date': to_z(c.get('timestamp')),
+        })
+    return owner, repo.get('name') or '', branch, repo.get('default_branch') or '', repo.get('html_url') or '', commits
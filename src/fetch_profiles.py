@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+import trello_rules
+
+# Fetch profiles: what each Trello call asks for, cut down to what the code downstream reads.
+# Trello answers with every field of an action, its creator and the nested objects unless
+# told otherwise; these parameters ask only for the action types the classifier has rules
+# for, the fields pick_action and the rules read, and the creator's name.
+
+NAME_ONLY = {'fields': 'name'}  # board and list lookups by name
+
+# pick_action and ActionRules read type, date and data; the member is memberCreator.fullName.
+# The id always comes back and is what the webhook log dedupes on.
+ACTION_FIELDS = {'fields': 'type,date,data', 'memberCreator_fields': 'fullName', 'member': 'false'}
+
+COMMENTS = {'filter': 'commentCard', **ACTION_FIELDS}
+
+ATTACHMENTS = {'fields': 'name,url,mimeType'}
+
+NOTE_CARDS = {'fields': 'name,desc,dateLastActivity,shortUrl'}
+
+
+def action_filter(types=None):
+    # 'all' (or nothing) -> only the types a rule exists for; an explicit list is kept as given
+    if types and types.strip().lower() != 'all':
+        return types
+    return ','.join(trello_rules.RULE_TYPES)
+
+
+def board_actions(since, until, types=None):
+    return {'filter': action_filter(types), 'limit': 1000, 'since': since, 'before': until, **ACTION_FIELDS}
+
+
+def created_from_id(object_id):
+    # Trello ids start with the creation time as 8 hex digits of Unix seconds, so a card's
+    # created date needs no createCard/copyCard lookup. -> ISO UTC, or '' for a malformed id
+    try:
+        ts = int(str(object_id)[:8], 16)
+    except ValueError:
+        return ''
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
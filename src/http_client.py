@@ -0,0 +1,183 @@
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+import metrics
+import cache
+import singleflight
+import resilience
+import deadline
+from resilience import CircuitOpenError
+
+# Thin wrapper around requests so every outbound call is timed and counted per upstream host,
+# and runs under that host's circuit breaker (GETs are also hedged, see resilience.py).
+
+def _host(url):
+    try:
+        return urlsplit(url).netloc or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+def request(method, url, **kwargs):
+    host = _host(url)
+    # A digest deadline caps every call's own timeout (and stops new calls once spent)
+    if deadline.at() is not None:
+        kwargs['timeout'] = deadline.clamp(kwargs.get('timeout'))
+    hedge = method == 'GET' and not kwargs.get('stream')
+    try:
+        return resilience.call(host, lambda: _send(host, method, url, **kwargs), hedge=hedge)
+    except requests.Timeout as e:
+        if deadline.expired() and not isinstance(e, deadline.DeadlineExceeded):
+            deadline.mark_hit()
+            raise deadline.DeadlineExceeded(f'Digest time budget exhausted during {method} {host}') from e
+        raise
+
+
+def _send(host, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        r = requests.request(method, url, **kwargs)
+    except requests.RequestException as e:
+        metrics.record_upstream(host, method, type(e).__name__, time.perf_counter() - start)
+        raise
+    metrics.record_upstream(host, method, str(r.status_code), time.perf_counter() - start, len(r.content or b''))
+    return r
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+# --- shared response cache for idempotent GETs ---
+
+SECRET_PARAMS = {'key', 'token'}
+CACHED_HEADERS = ('Content-Type', 'Link', 'ETag')
+
+
+def cache_key(url, params=None, headers=None):
+    params = params or {}
+    public = sorted((k, str(v)) for k, v in params.items() if k not in SECRET_PARAMS)
+    # Credentials only contribute a digest so different tokens never share entries
+    secret = ''.join(str(params.get(k) or '') for k in sorted(SECRET_PARAMS)) + str((headers or {}).get('Authorization') or '')
+    cred = hashlib.sha256(secret.encode('utf-8')).hexdigest()[:16]
+    return f"GET {url}?{urlencode(public)}#{cred}"
+
+
+def _response_from_cache(url, entry):
+    r = requests.Response()
+    r.status_code = entry.get('status', 200)
+    r._content = entry.get('body', '').encode('utf-8')
+    r.headers = CaseInsensitiveDict(entry.get('headers') or {})
+    r.encoding = 'utf-8'
+    r.url = url
+    return r
+
+
+_policy = threading.local()
+
+
+@contextmanager
+def cache_policy(refresh=False, ttl=None):
+    # Thread-local override: refresh=True bypasses lookups and rewrites entries (used by prefetch)
+    prev = getattr(_policy, 'value', None)
+    _policy.value = {'refresh': refresh, 'ttl': ttl}
+    try:
+        yield
+    finally:
+        _policy.value = prev
+
+
+def refreshing():
+    return bool((getattr(_policy, 'value', None) or {}).get('refresh'))
+
+
+def cached_get(url, params=None, ttl=None, **kwargs):
+    policy = getattr(_policy, 'value', None) or {}
+    ttl = policy.get('ttl') or ttl
+    key = cache_key(url, params, kwargs.get('headers'))
+    c = cache.get_cache()
+    if not policy.get('refresh'):
+        entry = c.get(key)
+        metrics.record_cache('upstream', entry is not None)
+        if entry is not None:
+            return _response_from_cache(url, entry)
+
+    def fetch():
+        r = get(url, params=params, **kwargs)
+        if r.status_code == 200:
+            c.set(key, {
+                'status': r.status_code,
+                'headers': {h: r.headers[h] for h in CACHED_HEADERS if h in r.headers},
+                'body': r.content.decode(r.encoding or 'utf-8', errors='replace'),
+            }, ttl)
+        return r
+
+    # Identical GETs already in flight wait for that response instead of issuing their own
+    try:
+        return singleflight.upstream.do(key + ('|refresh' if policy.get('refresh') else ''), fetch, timeout=deadline.remaining())
+    except TimeoutError:
+        deadline.check()
+        raise
+
+
+# --- Link-header pagination ---
+
+def max_page_bytes():
+    return int(os.getenv('PAGINATION_MAX_BYTES') or str(64 * 1024 * 1024))
+
+
+class Pages:
+    # Streams the items of a JSON listing page by page, following Link: rel="next".
+    # The only caps are max_bytes of response bodies and the digest deadline: when either is
+    # reached with pages left, iteration stops and truncated is set. A >= 400 answer stops iteration and is kept in error.
+    # Search endpoints wrap items in an object: pass items_key='items' to read total_count and
+    # incomplete_results alongside them.
+    def __init__(self, url, params=None, max_bytes=None, items_key=None, **kwargs):
+        self.url = url
+        self.params = params
+        self.max_bytes = max_page_bytes() if max_bytes is None else max_bytes
+        self.items_key = items_key
+        self.kwargs = kwargs
+        self.truncated = False
+        self.error = None
+        self.pages = 0
+        self.bytes = 0
+        self.total_count = None
+        self.incomplete = False
+
+    def __iter__(self):
+        url, params = self.url, self.params
+        while url:
+            try:
+                r = cached_get(url, params=params, **self.kwargs)
+            except deadline.DeadlineExceeded:
+                if not self.pages:
+                    raise
+                # Out of time mid-listing: keep the pages already read
+                self.truncated = True
+                return
+            if r.status_code >= 400:
+                self.error = r
+                return
+            self.pages += 1
+            self.bytes += len(r.content or b'')
+            url, params = (r.links.get('next') or {}).get('url'), None
+            if url and self.bytes >= self.max_bytes:
+                self.truncated = True
+                url = None
+            body = r.json()
+            if self.items_key:
+                body = body or {}
+                self.total_count = body.get('total_count')
+                self.incomplete = self.incomplete or bool(body.get('incomplete_results'))
+                body = body.get(self.items_key)
+            yield from body or []
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Response encoding helpers for the webapp: content-coding negotiation, compression and
+# strong ETags. The ETag hashes the uncompressed payload; each coding gets its own suffix
+# (a strong validator must differ per representation) and If-None-Match compares the payload part.
+
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_codings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    # -> 'br', 'gzip' or None; honours q=0 and prefers br at equal weight
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for p in params.split(';'):
+            k, _, v = p.strip().partition('=')
+            if k == 'q':
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    best, best_q = None, 0.0
+    for coding in available_codings():
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, coding):
+    if coding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if coding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+def compressible(mimetype, body):
+    return len(body) >= MIN_COMPRESS_BYTES and (mimetype or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def payload_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag_for(tag, coding):
+    return f'"{tag}-{coding}"' if coding else f'"{tag}"'
+
+
+def etag_matches(if_none_match, tag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        c = candidate.strip()
+        if c == '*':
+            return True
+        if c.startswith('W/'):
+            c = c[2:]
+        c = c.strip('"')
+        if c == tag or c.split('-', 1)[0] == tag:
+            return True
+    return False
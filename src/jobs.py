@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import secrets
+import threading
+import metrics
+from cache import SQLiteStore, lazy
+
+# Durable job queue for slow upstream work (LLM summaries), kept in SQLite so every gunicorn
+# worker sees the same jobs. Request threads only submit and poll; a small pool of worker
+# threads per process claims jobs, with a global cap on running jobs, a lease so jobs held by
+# a dead process are picked up again, and retries with backoff for transient failures.
+# A running handler renews its lease from a heartbeat, so only a dead holder lets it lapse.
+# Identical payloads submitted while a job is queued, running or recently done share that job.
+# Finished jobs are deleted once they are older than retain_seconds.
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+metrics.describe('jobs_total', 'Finished jobs by kind and outcome (done, failed, retried)')
+metrics.describe('job_wait_seconds', 'Time from submit (or retry) to a worker picking the job up, by kind')
+metrics.describe('job_run_seconds', 'Handler run time per attempt, by kind')
+
+
+class RetryableError(Exception):
+    # Raised by handlers for transient failures; retry_after (seconds) overrides the backoff
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def now():
+    return time.time()
+
+
+def iso(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts)) if ts else None
+
+
+class JobQueue(SQLiteStore):
+    def __init__(self, path, workers=2, max_running=4, max_attempts=4, lease_seconds=120,
+                 backoff_seconds=2.0, keep_seconds=3600, retain_seconds=7 * 86400):
+        super().__init__(path)
+        self.workers = workers
+        self.max_running = max_running
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+        self.keep_seconds = keep_seconds
+        self.retain_seconds = max(retain_seconds, keep_seconds)
+        self._purged = 0.0
+        self.handlers = {}
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT, dedupe TEXT, status TEXT, payload TEXT,
+                result TEXT, error TEXT, attempts INTEGER DEFAULT 0,
+                created REAL, not_before REAL, started REAL, finished REAL, lease_until REAL, owner TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, not_before);
+            CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe);
+        ''')
+
+    def register(self, kind, handler):
+        # handler(payload) -> JSON-serializable result; raise RetryableError for transient failures
+        self.handlers[kind] = handler
+
+    # --- producer side ---
+
+    def submit(self, kind, payload):
+        # -> (job, deduped)
+        self.start()
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        dedupe = hashlib.sha256(f'{kind}\n{body}'.encode('utf-8')).hexdigest()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id FROM jobs WHERE dedupe = ? AND (status IN (?, ?) OR (status = ? AND finished > ?)) '
+                'ORDER BY created DESC LIMIT 1', (dedupe, QUEUED, RUNNING, DONE, now() - self.keep_seconds)).fetchone()
+            if row:
+                conn.execute('COMMIT')
+                return self.get(row[0]), True
+            jid = secrets.token_hex(12)
+            t = now()
+            conn.execute('INSERT INTO jobs (id, kind, dedupe, status, payload, created, not_before) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (jid, kind, dedupe, QUEUED, body, t, t))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        with self._wake:
+            self._wake.notify()
+        return self.get(jid), False
+
+    def get(self, jid):
+        row = self._conn().execute(
+            'SELECT id, kind, status, result, error, attempts, created, started, finished, not_before FROM jobs WHERE id = ?',
+            (jid,)).fetchone()
+        if not row:
+            return None
+        job = {'id': row[0], 'kind': row[1], 'status': row[2], 'attempts': row[5],
+               'created': iso(row[6]), 'started': iso(row[7]), 'finished': iso(row[8])}
+        if row[2] == DONE:
+            job['result'] = json.loads(row[3]) if row[3] else None
+        if row[4]:
+            job['error'] = row[4]
+        if row[2] == QUEUED and row[5]:
+            job['retryAt'] = iso(row[9])
+        return job
+
+    def wait(self, jid, timeout):
+        # Long poll: -> the job once it is done/failed, or as it stands when timeout runs out.
+        # Finishes in this process wake waiters at once; other processes' are seen by polling.
+        # Waiting also starts this process's workers, so polling clients keep the queue moving.
+        self.start()
+        end = now() + max(0.0, timeout)
+        while True:
+            job = self.get(jid)
+            left = end - now()
+            if job is None or job['status'] in (DONE, FAILED) or left <= 0:
+                return job
+            with self._wake:
+                self._wake.wait(min(0.5, left))
+
+    def stats(self, limit=20):
+        conn = self._conn()
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        oldest = conn.execute('SELECT MIN(created) FROM jobs WHERE status = ?', (QUEUED,)).fetchone()[0]
+        recent = [r[0] for r in conn.execute('SELECT id FROM jobs ORDER BY created DESC LIMIT ?', (limit,)).fetchall()]
+        return {
+            'counts': {s: counts.get(s, 0) for s in (QUEUED, RUNNING, DONE, FAILED)},
+            'oldestQueuedSeconds': round(now() - oldest, 1) if oldest else None,
+            'maxRunning': self.max_running,
+            'workersPerProcess': self.workers,
+            'jobs': [{k: v for k, v in self.get(j).items() if k != 'result'} for j in recent],
+        }
+
+    # --- worker side ---
+
+    def start(self):
+        # Worker threads start lazily in each process that uses the queue
+        if self._started:
+            return
+        with self._start_lock:
+            if self._started:
+                return
+            for i in range(self.workers):
+                threading.Thread(target=self._loop, name=f'jobs-{i}', daemon=True).start()
+            self._started = True
+
+    def claim(self, owner):
+        # -> (id, kind, payload, attempts, ready_at) or None. Global running cap and
+        # expired leases are checked in the same write transaction as the claim.
+        conn = self._conn()
+        t = now()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # A lapsed lease means the holder died mid-run; that counts as an attempt
+            expired = conn.execute('SELECT id, kind, attempts FROM jobs WHERE status = ? AND lease_until < ?', (RUNNING, t)).fetchall()
+            for jid, kind, attempts in expired:
+                if attempts >= self.max_attempts:
+                    conn.execute('UPDATE jobs SET status = ?, error = ?, finished = ?, owner = NULL WHERE id = ?',
+                                 (FAILED, f'Lease expired (gave up after {attempts} attempts)', t, jid))
+                    metrics.inc('jobs_total', {'kind': kind, 'outcome': FAILED})
+                else:
+                    conn.execute('UPDATE jobs SET status = ?, owner = NULL WHERE id = ?', (QUEUED, jid))
+            running = conn.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (RUNNING,)).fetchone()[0]
+            row = None
+            if running < self.max_running:
+                row = conn.execute('SELECT id, kind, payload, attempts, not_before FROM jobs WHERE status = ? AND not_before <= ? '
+                                   'ORDER BY not_before LIMIT 1', (QUEUED, t)).fetchone()
+            if row:
+                conn.execute('UPDATE jobs SET status = ?, started = ?, lease_until = ?, owner = ?, attempts = attempts + 1 WHERE id = ?',
+                             (RUNNING, t, t + self.lease_seconds, owner, row[0]))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def renew(self, jid, owner):
+        # -> False once the job is no longer ours (lease lost to another worker)
+        cur = self._conn().execute('UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = ?',
+                                   (now() + self.lease_seconds, jid, owner, RUNNING))
+        return cur.rowcount > 0
+
+    def _heartbeat(self, jid, owner, stop):
+        while not stop.wait(self.lease_seconds / 3.0):
+            try:
+                if not self.renew(jid, owner):
+                    return
+            except sqlite3.Error:
+                pass
+
+    def purge(self):
+        # Drops finished jobs past retention; -> rows deleted
+        cur = self._conn().execute('DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?',
+                                   (DONE, FAILED, now() - self.retain_seconds))
+        self._purged = now()
+        return cur.rowcount
+
+    def _finish(self, jid, owner, status, result=None, error=None, retry_at=None):
+        # Only the lease holder may record an outcome; a job re-claimed after a lease expiry is left alone
+        if retry_at is not None:
+            self._conn().execute('UPDATE jobs SET status = ?, error = ?, not_before = ?, owner = NULL WHERE id = ? AND owner = ?',
+                                 (QUEUED, error, retry_at, jid, owner))
+        else:
+            self._conn().execute('UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, owner = NULL WHERE id = ? AND owner = ?',
+                                 (status, json.dumps(result) if result is not None else None, error, now(), jid, owner))
+        with self._wake:
+            self._wake.notify_all()
+
+    def run_one(self, owner):
+        # -> True when a job was processed
+        row = self.claim(owner)
+        if not row:
+            return False
+        jid, kind, payload, attempts, ready_at = row
+        attempts += 1
+        metrics.observe('job_wait_seconds', max(0.0, now() - ready_at), {'kind': kind})
+        handler = self.handlers.get(kind)
+        start = time.perf_counter()
+        stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(jid, owner, stop), name=f'lease-{jid}', daemon=True).start()
+        try:
+            if handler is None:
+                raise ValueError(f'No handler for job kind {kind}')
+            result = handler(json.loads(payload))
+        except RetryableError as e:
+            if attempts < self.max_attempts:
+                delay = e.retry_after if e.retry_after is not None else self.backoff_seconds * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+                metrics.inc('jobs_total', {'kind': kind, 'outcome': 'retried'})
+                self._finish(jid, owner, QUEUED, error=str(e), retry_at=now() + delay)
+            else:
+                metrics.inc('jobs_total', {'kind': kind, 'outcome': FAILED})
+                self._finish(jid, owner, FAILED, error=f'{e} (gave up after {attempts} attempts)')
+        except Exception as e:
+            metrics.inc('jobs_total', {'kind': kind, 'outcome': FAILED})
+            self._finish(jid, owner, FAILED, error=f'{type(e).__name__}: {e}')
+        else:
+            metrics.inc('jobs_total', {'kind': kind, 'outcome': DONE})
+            self._finish(jid, owner, DONE, result=result)
+        finally:
+            stop.set()
+            metrics.observe('job_run_seconds', time.perf_counter() - start, {'kind': kind})
+        return True
+
+    def _loop(self):
+        owner = f'{os.getpid()}:{threading.current_thread().name}'
+        while True:
+            try:
+                if self.run_one(owner):
+                    continue
+                if now() - self._purged > 600:
+                    self.purge()
+            except sqlite3.Error:
+                pass
+            # Idle: woken by local submits, and polls for jobs submitted by other processes
+            with self._wake:
+                self._wake.wait(0.5)
+
+
+get_queue = lazy(lambda: JobQueue(
+    os.getenv('JOBS_PATH') or '/tmp/daily-digest-jobs.sqlite3',
+    workers=int(os.getenv('JOBS_WORKERS') or '2'),
+    max_running=int(os.getenv('JOBS_MAX_RUNNING') or '4'),
+    max_attempts=int(os.getenv('JOBS_MAX_ATTEMPTS') or '4'),
+    retain_seconds=float(os.getenv('JOBS_RETAIN_SECONDS') or str(7 * 86400)),
+))
@@ -0,0 +1,173 @@
+import json
+import threading
+
+# --- minimal in-process metrics registry (Prometheus text format, no external deps) ---
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_counters = {}    # name -> { labels_tuple: value }
+_histograms = {}  # name -> { labels_tuple: [bucket_counts..., sum, count] }
+_help = {}
+_buckets = {}
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def describe(name, help_text, buckets=None):
+    _help[name] = help_text
+    if buckets:
+        _buckets[name] = tuple(buckets)
+
+
+def inc(name, labels=None, value=1):
+    k = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[k] = series.get(k, 0) + value
+
+
+def observe(name, value, labels=None):
+    bounds = _buckets.get(name, DEFAULT_BUCKETS)
+    k = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        h = series.get(k)
+        if h is None:
+            h = series[k] = [0] * len(bounds) + [0.0, 0]
+        for i, b in enumerate(bounds):
+            if value <= b:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def export_state():
+    # Picklable copy of the raw series, for folding a worker process's metrics into its parent
+    with _lock:
+        return ({n: dict(s) for n, s in _counters.items()},
+                {n: {k: list(h) for k, h in s.items()} for n, s in _histograms.items()})
+
+
+def merge_state(state):
+    counters, histograms = state
+    with _lock:
+        for name, series in counters.items():
+            dst = _counters.setdefault(name, {})
+            for k, v in series.items():
+                dst[k] = dst.get(k, 0) + v
+        for name, series in histograms.items():
+            dst = _histograms.setdefault(name, {})
+            for k, h in series.items():
+                cur = dst.get(k)
+                dst[k] = list(h) if cur is None else [a + b for a, b in zip(cur, h)]
+
+
+describe('http_request_duration_seconds', 'Webapp request latency by route, method and status')
+describe('upstream_requests_total', 'Outbound upstream calls by host, method and status')
+describe('upstream_request_duration_seconds', 'Outbound upstream call latency by host and status')
+describe('upstream_response_bytes_total', 'Bytes received from upstreams by host')
+describe('cache_requests_total', 'Cache lookups by cache name and result (hit/miss)')
+describe('llm_tokens_total', 'LLM token usage by model and kind (prompt/completion)')
+describe('webhook_events_total', 'Webhook deliveries by source and event type (or rejected)')
+describe('github_commit_search_total', 'Org commit search attempts by outcome (ok, or the reason for falling back to per-repo listing)')
+describe('commit_details_total', 'Commit detail lookups by outcome (cached, fetched, failed, skipped at the rate-limit floor)')
+describe('singleflight_calls_total', 'Coalesced computations by group and role (leader ran it, follower shared it)')
+
+
+# --- convenience hooks ---
+
+def record_upstream(host, method, status, seconds, nbytes=0):
+    labels = {'host': host, 'method': method, 'status': status}
+    inc('upstream_requests_total', labels)
+    observe('upstream_request_duration_seconds', seconds, {'host': host, 'status': status})
+    if nbytes:
+        inc('upstream_response_bytes_total', {'host': host}, nbytes)
+
+
+def record_cache(cache, hit):
+    inc('cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+
+def record_llm_usage(model, usage):
+    usage = usage or {}
+    for kind in ('prompt', 'completion'):
+        n = usage.get(f'{kind}_tokens') or 0
+        if n:
+            inc('llm_tokens_total', {'model': model or 'unknown', 'kind': kind}, n)
+
+
+# --- export ---
+
+def _fmt_labels(k, extra=None):
+    items = list(k) + list(extra or [])
+    if not items:
+        return ''
+    body = ','.join('{}="{}"'.format(n, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for n, v in items)
+    return '{' + body + '}'
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        for name in sorted(_counters):
+            if name in _help:
+                lines.append(f'# HELP {name} {_help[name]}')
+            lines.append(f'# TYPE {name} counter')
+            for k, v in sorted(_counters[name].items()):
+                lines.append(f'{name}{_fmt_labels(k)} {v}')
+        for name in sorted(_histograms):
+            bounds = _buckets.get(name, DEFAULT_BUCKETS)
+            if name in _help:
+                lines.append(f'# HELP {name} {_help[name]}')
+            lines.append(f'# TYPE {name} histogram')
+            for k, h in sorted(_histograms[name].items()):
+                for i, b in enumerate(bounds):
+                    lines.append(f'{name}_bucket{_fmt_labels(k, [("le", b)])} {h[i]}')
+                lines.append(f'{name}_bucket{_fmt_labels(k, [("le", "+Inf")])} {h[-1]}')
+                lines.append(f'{name}_sum{_fmt_labels(k)} {round(h[-2], 6)}')
+                lines.append(f'{name}_count{_fmt_labels(k)} {h[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def summary():
+    # Compact JSON-friendly view for cron runs: totals, mean latency and cache hit ratios
+    out = {'upstream': {}, 'cache': {}, 'llm_tokens': {}}
+    with _lock:
+        for k, v in (_counters.get('upstream_requests_total') or {}).items():
+            d = dict(k)
+            entry = out['upstream'].setdefault(d.get('host', ''), {'calls': 0, 'byStatus': {}, 'seconds': 0.0, 'bytes': 0})
+            entry['calls'] += v
+            entry['byStatus'][d.get('status', '')] = entry['byStatus'].get(d.get('status', ''), 0) + v
+        for k, h in (_histograms.get('upstream_request_duration_seconds') or {}).items():
+            host = dict(k).get('host', '')
+            if host in out['upstream']:
+                out['upstream'][host]['seconds'] = round(out['upstream'][host]['seconds'] + h[-2], 4)
+        for k, v in (_counters.get('upstream_response_bytes_total') or {}).items():
+            host = dict(k).get('host', '')
+            if host in out['upstream']:
+                out['upstream'][host]['bytes'] += v
+        for k, v in (_counters.get('cache_requests_total') or {}).items():
+            d = dict(k)
+            entry = out['cache'].setdefault(d.get('cache', ''), {'hit': 0, 'miss': 0})
+            entry[d.get('result', 'miss')] = entry.get(d.get('result', 'miss'), 0) + v
+        for k, v in (_counters.get('llm_tokens_total') or {}).items():
+            d = dict(k)
+            out['llm_tokens'][f"{d.get('model')}:{d.get('kind')}"] = v
+    for entry in out['cache'].values():
+        total = entry['hit'] + entry['miss']
+        entry['hitRatio'] = round(entry['hit'] / total, 4) if total else 0.0
+    return out
+
+
+def write_summary(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary(), f, indent=2)
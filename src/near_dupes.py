@@ -0,0 +1,106 @@
+import os
+import re
+import struct
+import hashlib
+
+# Near-duplicate detection for short texts (commit messages, Trello comments) before they go
+# into a prompt. Texts are normalized and split into word shingles; each gets a MinHash
+# signature, and LSH banding over the signatures finds candidate pairs through a hash index,
+# so the work grows linearly with the number of texts instead of comparing every pair.
+# Candidates whose estimated Jaccard similarity reaches the threshold are clustered, and each
+# cluster keeps its first item as the representative with a count of the others.
+
+NUM_PERM = 64
+BANDS = 16              # 16 bands x 4 rows: pairs around 0.5 similarity and up become candidates
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 2
+MIN_WORDS = 4           # shorter texts are only merged when they match exactly after normalizing
+DEFAULT_THRESHOLD = 0.6
+MAX_BUCKET_SCAN = 32
+
+_UNPACK = struct.Struct(f'<{NUM_PERM}Q').unpack
+
+_CHERRY_PICK = re.compile(r'\(cherry picked from commit [0-9a-f]+\)|(signed-off-by|co-authored-by|change-id):.*', re.I)
+_NON_WORD = re.compile(r'[^\w:/.#-]+')
+
+
+def threshold():
+    # PROMPT_DEDUPE_THRESHOLD: Jaccard similarity for two texts to count as one (0 turns dedupe off)
+    raw = os.getenv('PROMPT_DEDUPE_THRESHOLD')
+    return DEFAULT_THRESHOLD if raw is None or raw.strip() == '' else float(raw)
+
+
+def normalize(text):
+    # Lowercase words; trailers added by cherry-picks and sign-offs do not make a text different
+    return _NON_WORD.sub(' ', _CHERRY_PICK.sub(' ', str(text or '')).lower()).split()
+
+
+def shingles(words):
+    if len(words) < SHINGLE_WORDS:
+        return {' '.join(words)}
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(shingle_set):
+    # One SHAKE-128 read per shingle gives its NUM_PERM independent 64-bit hashes at once;
+    # the signature is their column-wise minimum
+    rows = [_UNPACK(hashlib.shake_128(sh.encode('utf-8')).digest(8 * NUM_PERM)) for sh in shingle_set]
+    return tuple(map(min, zip(*rows)))
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def cluster(texts, min_similarity=None):
+    # -> list of clusters (lists of indices into texts, in input order), first index = representative.
+    # Each text joins the first earlier representative it matches; only representatives are
+    # indexed, and each bucket is scanned for at most MAX_BUCKET_SCAN of them, which keeps the
+    # cost per text bounded however many texts share a band.
+    min_similarity = threshold() if min_similarity is None else min_similarity
+    clusters = {}   # representative index -> member indices
+    exact = {}      # normalized text -> representative index
+    sigs = {}
+    buckets = {}
+    for i, text in enumerate(texts):
+        words = normalize(text)
+        key = ' '.join(words)
+        rep = exact.get(key)
+        if rep is None and min_similarity > 0 and len(words) >= MIN_WORDS:
+            sig = signature(shingles(words))
+            keys = [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+            seen = set()
+            for k in keys:
+                for j in buckets.get(k, ())[-MAX_BUCKET_SCAN:]:
+                    if j not in seen:
+                        seen.add(j)
+                        if similarity(sig, sigs[j]) >= min_similarity:
+                            rep = j
+                            break
+                if rep is not None:
+                    break
+            if rep is None:
+                sigs[i] = sig
+                for k in keys:
+                    buckets.setdefault(k, []).append(i)
+        if rep is None:
+            clusters[i] = [i]
+            exact[key] = i
+        else:
+            clusters[rep].append(i)
+            exact.setdefault(key, rep)
+    return list(clusters.values())
+
+
+def collapse(items, text, min_similarity=None):
+    # -> [(representative item, number of near-duplicates dropped)], in input order.
+    # text(item) gives the text to compare.
+    if min_similarity is None:
+        min_similarity = threshold()
+    if min_similarity <= 0 or len(items) < 2:
+        return [(it, 0) for it in items]
+    return [(items[g[0]], len(g) - 1) for g in cluster([text(it) for it in items], min_similarity)]
+
+
+def similar_suffix(n):
+    return f' (+{n} similar)' if n else ''
@@ -1,11 +1,19 @@
 import { API_BASE_URL } from './config.js';
-export async function callOpenAI({ systemPrompt, input }) {
-  const url = `${API_BASE_URL}/api/openai/summarize`;
+// Summaries run as backend jobs: submit once, then long-poll the job until it is done or failed
+const POLL_WAIT_S = 20;
+export async function callOpenAI({ systemPrompt, input, onStatus }) {
   const userContent = buildUserContent(input);
-  const r = await fetch(url, { method: 'POST', headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' }, body: JSON.stringify({ systemPrompt, input: { ...input, userContent } }) });
-  if (!r.ok) { const t = await r.text(); throw new Error(`Backend /openai/summarize HTTP ${r.status} ${t}`); }
-  const data = await r.json();
-  return String(data?.text || '');
+  const r = await fetch(`${API_BASE_URL}/api/openai/summarize/jobs?wait=${POLL_WAIT_S}`, { method: 'POST', headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' }, body: JSON.stringify({ systemPrompt, input: { ...input, userContent } }) });
+  if (!r.ok) { const t = await r.text(); throw new Error(`Backend /openai/summarize/jobs HTTP ${r.status} ${t}`); }
+  let job = await r.json();
+  while (job.status === 'queued' || job.status === 'running') {
+    onStatus?.(job);
+    const p = await fetch(`${API_BASE_URL}/api/jobs/${encodeURIComponent(job.id)}?wait=${POLL_WAIT_S}`, { headers: { 'Accept': 'application/json' } });
+    if (!p.ok) { const t = await p.text(); throw new Error(`Backend /jobs HTTP ${p.status} ${t}`); }
+    job = await p.json();
+  }
+  if (job.status === 'failed') throw new Error(`Summary job ${job.id} failed: ${job.error || 'unknown error'}`);
+  return String(job.result?.text || '');
 }
 function buildUserContent(input) {
   const { week, transcripts = [], github = [], trello = [] } = input || {};
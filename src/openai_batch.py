@@ -0,0 +1,146 @@
+import os
+import io
+import json
+import time
+import metrics
+import http_client
+from digest_core import openai_api_base
+
+# OpenAI Batch API client for the nightly digest: every summary of the night goes into one
+# JSONL file and one batch, which OpenAI prices lower and runs outside the interactive rate
+# limits. submit() uploads and creates the batch, wait() polls it to a terminal state and
+# results() reads the output and error files back into { custom_id: text | error }.
+
+DEFAULT_MODEL = 'gpt-4o-mini'
+ENDPOINT = '/v1/chat/completions'
+TERMINAL = ('completed', 'failed', 'expired', 'cancelled')
+
+metrics.describe('openai_batches_total', 'OpenAI batches by final status')
+metrics.describe('openai_batch_requests_total', 'Requests inside OpenAI batches by outcome (ok, error, missing)')
+
+
+def headers():
+    key = os.getenv('OPENAI_API_KEY', '').strip()
+    if not key:
+        raise RuntimeError('Missing OPENAI_API_KEY')
+    return {'Authorization': f'Bearer {key}'}
+
+
+def chat_body(system_prompt, user_content, model=None):
+    return {
+        'model': model or DEFAULT_MODEL,
+        'messages': [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_content},
+        ],
+        'temperature': 0.2,
+    }
+
+
+def completion_text(data):
+    metrics.record_llm_usage(data.get('model'), data.get('usage'))
+    return (((data.get('choices') or [{}])[0]).get('message') or {}).get('content') or ''
+
+
+def complete(body):
+    # Synchronous chat completion, for requests a batch did not answer
+    r = http_client.post(f'{openai_api_base()}/chat/completions', json=body, headers=headers(), timeout=120)
+    r.raise_for_status()
+    return completion_text(r.json())
+
+
+def submit(bodies, metadata=None):
+    # bodies: { custom_id: chat body } -> batch object
+    lines = ''.join(json.dumps({'custom_id': cid, 'method': 'POST', 'url': ENDPOINT, 'body': body}) + '\n'
+                    for cid, body in bodies.items())
+    r = http_client.post(f'{openai_api_base()}/files', headers=headers(), data={'purpose': 'batch'},
+                         files={'file': ('digest-batch.jsonl', io.BytesIO(lines.encode('utf-8')), 'application/jsonl')},
+                         timeout=120)
+    r.raise_for_status()
+    r = http_client.post(f'{openai_api_base()}/batches', headers=headers(), timeout=60, json={
+        'input_file_id': r.json()['id'],
+        'endpoint': ENDPOINT,
+        'completion_window': '24h',
+        'metadata': metadata or {},
+    })
+    r.raise_for_status()
+    return r.json()
+
+
+def get(batch_id):
+    r = http_client.get(f'{openai_api_base()}/batches/{batch_id}', headers=headers(), timeout=60)
+    r.raise_for_status()
+    return r.json()
+
+
+def cancel(batch_id):
+    r = http_client.post(f'{openai_api_base()}/batches/{batch_id}/cancel', headers=headers(), timeout=60)
+    r.raise_for_status()
+    return r.json()
+
+
+def wait(batch, timeout, interval=30, on_status=None):
+    # -> the batch in a terminal state, or as last seen when timeout runs out.
+    # Polling errors are tolerated; the batch keeps running on OpenAI's side.
+    end = time.time() + timeout
+    last = None
+    while batch.get('status') not in TERMINAL:
+        if batch.get('status') != last and on_status:
+            on_status(batch)
+        last = batch.get('status')
+        left = end - time.time()
+        if left <= 0:
+            return batch
+        time.sleep(min(interval, left))
+        try:
+            batch = get(batch['id'])
+        except Exception as e:
+            if on_status:
+                on_status({**batch, 'pollError': str(e)})
+    metrics.inc('openai_batches_total', {'status': batch['status']})
+    return batch
+
+
+def _file_lines(file_id):
+    if not file_id:
+        return []
+    r = http_client.get(f'{openai_api_base()}/files/{file_id}/content', headers=headers(), timeout=120)
+    r.raise_for_status()
+    return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+
+def results(batch, ids):
+    # -> ({ custom_id: text }, { custom_id: error }) for the requested ids; ids the batch
+    # never answered (failed, expired or cancelled part-way) are reported as errors
+    texts, errors = {}, {}
+    for line in _file_lines(batch.get('output_file_id')) + _file_lines(batch.get('error_file_id')):
+        cid = line.get('custom_id')
+        resp = line.get('response') or {}
+        if resp.get('status_code') == 200 and not line.get('error'):
+            texts[cid] = completion_text(resp.get('body') or {})
+        else:
+            err = line.get('error') or (resp.get('body') or {}).get('error') or {}
+            errors[cid] = err.get('message') if isinstance(err, dict) else str(err)
+            errors[cid] = errors[cid] or f"HTTP {resp.get('status_code')}"
+    for cid in ids:
+        if cid not in texts and cid not in errors:
+            errors[cid] = f"no result (batch {batch.get('status')})"
+    for cid in ids:
+        metrics.inc('openai_batch_requests_total', {'outcome': 'ok' if cid in texts else 'error'})
+    return texts, errors
+
+
+def run(bodies, timeout, interval=30, log=print):
+    # Submits bodies as one batch and waits for it -> ({ custom_id: text }, { custom_id: error }).
+    # A batch still running at the timeout is cancelled; whatever it finished is still read.
+    batch = submit(bodies, {'source': 'daily-digest'})
+    log(f"Submitted batch {batch['id']} with {len(bodies)} request(s)")
+    batch = wait(batch, timeout, interval, on_status=lambda b: log(f"Batch {b['id']}: {b.get('pollError') or b.get('status')}"))
+    if batch.get('status') not in TERMINAL:
+        log(f"Batch {batch['id']} not finished after {timeout:g}s; cancelling")
+        try:
+            batch = wait(cancel(batch['id']), min(timeout, 120), interval)
+        except Exception as e:
+            log(f"Batch {batch['id']} cancel failed: {e}")
+    log(f"Batch {batch['id']}: {batch.get('status')} {batch.get('request_counts') or ''}")
+    return results(batch, list(bodies))
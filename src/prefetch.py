@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from digest_core import get_sgt_time_range
+
+# Background warm-up of the daily window around the 09:00 SGT cutoff.
+# The scheduler only decides *when* and *which windows*; the webapp supplies warm(since, until).
+
+def iso_z(dt):
+    return dt.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def iso_ms_z(dt):
+    # Matches the browser's Date.toISOString() so prefetched upstream URLs equal the page's
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f'{dt.microsecond // 1000:03d}Z'
+
+
+def utc_day_window(day):
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    end = start + timedelta(days=1) - timedelta(milliseconds=1)
+    return iso_ms_z(start), iso_ms_z(end)
+
+
+def next_cutoff(now_utc):
+    _, end_utc, _, _ = get_sgt_time_range(now_utc)
+    return end_utc if end_utc > now_utc else end_utc + timedelta(days=1)
+
+
+def closing_windows(cutoff_utc):
+    # Windows people open right after the cutoff: the SGT digest window ending at the cutoff
+    # and the frontend's default "yesterday" (a UTC calendar day) as seen from SGT.
+    sgt_window = (iso_z(cutoff_utc - timedelta(days=1)), iso_z(cutoff_utc))
+    yesterday_sgt = (cutoff_utc + timedelta(hours=8)).date() - timedelta(days=1)
+    return [sgt_window, utc_day_window(yesterday_sgt)]
+
+
+def open_windows(now_utc):
+    # Windows still accumulating activity, synced periodically during the day (the webapp's warm
+    # polls only what happened since the last sync)
+    cutoff = next_cutoff(now_utc)
+    return [(iso_z(cutoff - timedelta(days=1)), iso_z(cutoff)), utc_day_window(now_utc.date())]
+
+
+class PrefetchScheduler:
+    def __init__(self, warm, lead_minutes=10, lag_minutes=2, interval_minutes=30, lock_path=None):
+        self.warm = warm
+        self.lead = timedelta(minutes=lead_minutes)
+        self.lag = timedelta(minutes=lag_minutes)
+        self.interval = timedelta(minutes=interval_minutes)
+        self.lock_path = lock_path
+        self.status = {'runs': [], 'leader': False}
+        self._done = set()
+        self._last_refresh = None
+        self._stop = threading.Event()
+        self._lock_file = None
+
+    def _acquire_leadership(self):
+        # One scheduler per host: gunicorn workers race for an exclusive file lock
+        if self._lock_file is not None:
+            return True
+        if not self.lock_path:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        f = open(self.lock_path, 'a+')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+    def due(self, now_utc):
+        # -> list of (slot, [(since, until), ...]) to run at now_utc
+        jobs = []
+        cutoff = next_cutoff(now_utc)
+        prev_cutoff = cutoff - timedelta(days=1)
+        pre_slot = ('pre', cutoff.date().isoformat())
+        if cutoff - self.lead <= now_utc and pre_slot not in self._done:
+            jobs.append((pre_slot, closing_windows(cutoff)))
+        post_slot = ('post', prev_cutoff.date().isoformat())
+        if prev_cutoff + self.lag <= now_utc and post_slot not in self._done:
+            jobs.append((post_slot, closing_windows(prev_cutoff)))
+        if self._last_refresh is None or now_utc - self._last_refresh >= self.interval:
+            jobs.append((('refresh', iso_z(now_utc)), open_windows(now_utc)))
+        return jobs
+
+    def run_once(self, now_utc=None):
+        now_utc = now_utc or datetime.now(timezone.utc)
+        for slot, windows in self.due(now_utc):
+            started = time.perf_counter()
+            errors = []
+            for since, until in windows:
+                try:
+                    self.warm(since, until)
+                except Exception as e:
+                    errors.append(f'{since}..{until}: {e}')
+            if slot[0] == 'refresh':
+                self._last_refresh = now_utc
+            else:
+                self._done.add(slot)
+            self.status['runs'] = (self.status['runs'] + [{
+                'slot': slot[0],
+                'at': iso_z(now_utc),
+                'windows': windows,
+                'seconds': round(time.perf_counter() - started, 3),
+                'errors': errors,
+            }])[-20:]
+        # Forget slots older than two days
+        cutoff_day = (now_utc - timedelta(days=2)).date().isoformat()
+        self._done = {s for s in self._done if s[1] >= cutoff_day}
+
+    def loop(self, poll_seconds=30):
+        while not self._stop.is_set():
+            if self._acquire_leadership():
+                self.status['leader'] = True
+                try:
+                    self.run_once()
+                except Exception as e:
+                    self.status['lastError'] = str(e)
+            self._stop.wait(poll_seconds)
+
+    def start(self):
+        t = threading.Thread(target=self.loop, name='prefetch', daemon=True)
+        t.start()
+        return t
+
+    def stop(self):
+        self._stop.set()
+
+
+def from_env(warm):
+    return PrefetchScheduler(
+        warm,
+        lead_minutes=int(os.getenv('PREFETCH_LEAD_MINUTES') or '10'),
+        lag_minutes=int(os.getenv('PREFETCH_LAG_MINUTES') or '2'),
+        interval_minutes=int(os.getenv('PREFETCH_INTERVAL_MINUTES') or '30'),
+        lock_path=(os.getenv('CACHE_PATH') or '/tmp/daily-digest-cache.sqlite3') + '.prefetch.lock',
+    )
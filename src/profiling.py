@@ -0,0 +1,88 @@
+import json
+import time
+import platform
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import metrics
+
+# Stage-level wall/CPU timing for the digest job. Disabled profilers are no-ops,
+# so callers can wrap stages unconditionally.
+
+def _upstream_totals():
+    up = metrics.summary()['upstream']
+    return sum(u['calls'] for u in up.values()), sum(u['bytes'] for u in up.values())
+
+
+class StageProfiler:
+    def __init__(self, enabled=False, cprofile_path=None):
+        self.enabled = enabled or bool(cprofile_path)
+        self.cprofile_path = cprofile_path
+        self.stages = []
+        self.meta = {}
+        self._profile = None
+        self._started = None
+
+    def start(self, **meta):
+        if not self.enabled:
+            return
+        self.meta.update(meta)
+        self._started = (time.perf_counter(), time.process_time(), datetime.now(timezone.utc))
+        if self.cprofile_path:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        calls0, bytes0 = _upstream_totals()
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            calls1, bytes1 = _upstream_totals()
+            self.stages.append({
+                'name': name,
+                'wallSeconds': round(time.perf_counter() - wall0, 4),
+                'cpuSeconds': round(time.process_time() - cpu0, 4),
+                'upstreamCalls': calls1 - calls0,
+                'bytes': bytes1 - bytes0,
+                **({'error': error} if error else {}),
+            })
+
+    def report(self):
+        wall0, cpu0, started_at = self._started or (time.perf_counter(), time.process_time(), datetime.now(timezone.utc))
+        calls, nbytes = _upstream_totals()
+        return {
+            'version': 1,
+            'startedAt': started_at.isoformat().replace('+00:00', 'Z'),
+            'python': platform.python_version(),
+            **self.meta,
+            'total': {
+                'wallSeconds': round(time.perf_counter() - wall0, 4),
+                'cpuSeconds': round(time.process_time() - cpu0, 4),
+                'upstreamCalls': calls,
+                'bytes': nbytes,
+            },
+            'stages': self.stages,
+            'metrics': metrics.summary(),
+        }
+
+    def finish(self, path):
+        if not self.enabled:
+            return None
+        if self._profile is not None:
+            self._profile.disable()
+            # Load with `snakeviz`, or render a flamegraph with `flameprof <file> > flame.svg`
+            self._profile.dump_stats(self.cprofile_path)
+        rep = self.report()
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(rep, f, indent=2)
+        return rep
@@ -0,0 +1,146 @@
+// Incremental rendering for long digest sections. A list is built as DOM nodes a chunk at a
+// time, only while its end is within AHEAD_PX of the viewport, and each chunk stays inside
+// one animation frame's budget, so a multi-day range never blocks the tab. A collapsed
+// section renders nothing until it is first expanded.
+const FRAME_BUDGET_MS = 8;
+const AHEAD_PX = 1500;
+const CHUNK = 25;
+
+const pending = new WeakMap();  // collapsed element -> render to run on its next expand
+const tpl = document.createElement('template');
+
+// Renders into el now, or on its next expand when it is collapsed
+export function renderWhenExpanded(el, render) {
+  el.replaceChildren();
+  if (el.classList.contains('collapsed')) {
+    pending.set(el, render);
+    return;
+  }
+  pending.delete(el);
+  render(el);
+}
+
+// Expand/collapse button for el, persisted per element id for the session
+export function bindToggle(btn, el, defaultExpanded = true) {
+  const key = `section:${el.id}:expanded`;
+  const persisted = sessionStorage.getItem(key);
+  let expanded = persisted === null ? defaultExpanded : (persisted === 'true');
+  const apply = () => {
+    el.classList.toggle('collapsed', !expanded);
+    btn.setAttribute('aria-expanded', String(expanded));
+    btn.textContent = expanded ? '▾ Collapse' : '▸ Expand';
+    const render = expanded && pending.get(el);
+    if (render) {
+      pending.delete(el);
+      render(el);
+    }
+  };
+  apply();
+  btn.addEventListener('click', () => {
+    expanded = !expanded;
+    apply();
+    sessionStorage.setItem(key, String(expanded));
+  });
+}
+
+// -> header + body for a collapsible subsection; render(body) runs when the body is first shown
+export function collapsible({ id, heading, label, render }) {
+  const frag = document.createDocumentFragment();
+  const header = document.createElement('div');
+  header.className = 'section-header section-sub';
+  header.innerHTML = heading;
+  const btn = document.createElement('button');
+  Object.assign(btn, { id: `btn-${id}`, className: 'section-toggle', type: 'button' });
+  btn.setAttribute('aria-controls', id);
+  btn.setAttribute('aria-label', label);
+  header.append(btn);
+  const body = document.createElement('div');
+  body.id = id;
+  frag.append(header, body);
+  bindToggle(btn, body, true);
+  renderWhenExpanded(body, render);
+  return frag;
+}
+
+// All lazy lists share one animation-frame loop and its budget, so many small lists on screen
+// cost no more per frame than one long one
+const queue = new Set();
+let frameRequested = false;
+
+function enqueue(task) {
+  queue.add(task);
+  if (!frameRequested) {
+    frameRequested = true;
+    requestAnimationFrame(runFrame);
+  }
+}
+
+function runFrame() {
+  frameRequested = false;
+  const t0 = performance.now();
+  for (const task of queue) {
+    if (performance.now() - t0 >= FRAME_BUDGET_MS) break;
+    queue.delete(task);
+    task(t0);
+  }
+  if (queue.size && !frameRequested) {
+    frameRequested = true;
+    requestAnimationFrame(runFrame);
+  }
+}
+
+// Appends renderItem(item, i) for each item into a new <tag> under parent. renderItem returns
+// an HTML string (parsed a chunk at a time) or a Node. Chunks follow frame by frame while the
+// list end is near the viewport, and resume when scrolling brings it back. Replacing parent's
+// children stops it.
+export function lazyList(parent, items, renderItem, { tag = 'ul' } = {}) {
+  const list = document.createElement(tag);
+  const sentinel = document.createElement('div');
+  parent.append(list, sentinel);
+  let next = 0;
+  let near = false;
+  const io = new IntersectionObserver((entries) => {
+    near = entries[entries.length - 1].isIntersecting;
+    if (near) enqueue(step);
+  }, { rootMargin: `${AHEAD_PX}px 0px` });
+
+  function chunk() {
+    const frag = document.createDocumentFragment();
+    let html = '';
+    const flush = () => {
+      if (!html) return;
+      tpl.innerHTML = html;
+      frag.append(tpl.content);
+      html = '';
+    };
+    const end = Math.min(items.length, next + CHUNK);
+    for (; next < end; next++) {
+      const out = renderItem(items[next], next);
+      if (typeof out === 'string') html += out;
+      else { flush(); frag.append(out); }
+    }
+    flush();
+    list.append(frag);
+  }
+  function step(t0) {
+    if (!sentinel.isConnected) {
+      io.disconnect();
+      return;
+    }
+    do chunk();
+    while (next < items.length && performance.now() - t0 < FRAME_BUDGET_MS);
+    if (next >= items.length) {
+      io.disconnect();
+      sentinel.remove();
+    } else if (near) {
+      enqueue(step);
+    }
+  }
+
+  // A list on the page shows its first chunk at once. One built inside another list's chunk
+  // (still detached) waits for the observer, so lists far below the viewport build nothing.
+  if (parent.isConnected) chunk();
+  if (next < items.length) io.observe(sentinel);
+  else sentinel.remove();
+  return list;
+}
@@ -0,0 +1,259 @@
+import os
+import time
+import threading
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+import metrics
+import deadline
+
+# Tail-latency controls for outbound calls, kept per upstream host:
+# - hedging: a GET still running after the host's recent p<N> latency gets one duplicate and
+#   the first good answer wins, within a budget of hedges per GET;
+# - circuit breaker: when the failure rate (connection errors, 5xx, 429) over a rolling window
+#   crosses a threshold the host fails fast for a cooldown, then one half-open probe decides
+#   whether it closes again or stays open.
+# Settings are env vars taking a bare default and/or host=value pairs, e.g.
+# UPSTREAM_HEDGE_PERCENTILE="95,api.trello.com=90".
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+DEFAULTS = {
+    'UPSTREAM_HEDGE_PERCENTILE': 95.0,     # 0 disables hedging
+    'UPSTREAM_HEDGE_MIN_SAMPLES': 20.0,
+    'UPSTREAM_HEDGE_MIN_DELAY_MS': 50.0,
+    'UPSTREAM_HEDGE_BUDGET': 0.1,          # hedges per GET
+    'UPSTREAM_BREAKER_ERROR_RATE': 0.5,    # 0 disables the breaker
+    'UPSTREAM_BREAKER_MIN_CALLS': 10.0,
+    'UPSTREAM_BREAKER_WINDOW_SECONDS': 30.0,
+    'UPSTREAM_BREAKER_COOLDOWN_SECONDS': 15.0,
+}
+LATENCY_SAMPLES = 256
+
+metrics.describe('upstream_hedges_total', 'Hedged duplicate GETs by host and result (sent, won)')
+metrics.describe('circuit_breaker_transitions_total', 'Circuit breaker state changes by host and new state')
+metrics.describe('circuit_breaker_rejections_total', 'Calls failed fast by an open circuit, by host')
+
+
+class CircuitOpenError(requests.ConnectionError):
+    def __init__(self, host, retry_after):
+        super().__init__(f'Circuit open for {host}; retry in {retry_after:.0f}s')
+        self.host = host
+        self.retry_after = retry_after
+
+
+@lru_cache(maxsize=64)
+def _parse(raw):
+    out = {}
+    for part in (raw or '').split(','):
+        host, sep, value = part.strip().rpartition('=')
+        if not value:
+            continue
+        try:
+            out[host.strip().lower() if sep else '*'] = float(value)
+        except ValueError:
+            pass
+    return out
+
+
+def setting(name, host):
+    spec = _parse(os.getenv(name) or '')
+    return spec.get(host.lower(), spec.get('*', DEFAULTS[name]))
+
+
+def failed(r):
+    return r.status_code >= 500 or r.status_code == 429
+
+
+class HostState:
+    def __init__(self, host):
+        self.host = host
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # successful calls only
+        self.outcomes = deque()                         # (monotonic time, failed)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        self.gets = 0
+        self.hedges = 0
+
+    def _transition(self, state):
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self.outcomes.clear()
+        metrics.inc('circuit_breaker_transitions_total', {'host': self.host, 'state': state})
+
+    def allow(self):
+        # -> True when this call is the half-open probe; raises CircuitOpenError to fail fast
+        if setting('UPSTREAM_BREAKER_ERROR_RATE', self.host) <= 0:
+            return False
+        with self.lock:
+            if self.state == OPEN:
+                left = setting('UPSTREAM_BREAKER_COOLDOWN_SECONDS', self.host) - (time.monotonic() - self.opened_at)
+                if left > 0:
+                    metrics.inc('circuit_breaker_rejections_total', {'host': self.host})
+                    raise CircuitOpenError(self.host, left)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probing:
+                    metrics.inc('circuit_breaker_rejections_total', {'host': self.host})
+                    raise CircuitOpenError(self.host, 1.0)
+                self.probing = True
+                return True
+        return False
+
+    def record(self, ok, seconds, probe=False):
+        now = time.monotonic()
+        with self.lock:
+            if ok:
+                self.latencies.append(seconds)
+            if probe:
+                self.probing = False
+                self._transition(CLOSED if ok else OPEN)
+                return
+            if self.state != CLOSED:
+                return
+            self.outcomes.append((now, not ok))
+            horizon = now - setting('UPSTREAM_BREAKER_WINDOW_SECONDS', self.host)
+            while self.outcomes and self.outcomes[0][0] < horizon:
+                self.outcomes.popleft()
+            threshold = setting('UPSTREAM_BREAKER_ERROR_RATE', self.host)
+            n = len(self.outcomes)
+            if threshold > 0 and n >= setting('UPSTREAM_BREAKER_MIN_CALLS', self.host):
+                if sum(1 for _, f in self.outcomes if f) / n >= threshold:
+                    self._transition(OPEN)
+
+    def release_probe(self, probe):
+        if probe:
+            with self.lock:
+                self.probing = False
+
+    def percentile(self, p):
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+    def hedge_delay(self):
+        # -> seconds to wait before hedging a GET, or None when hedging is off or under-sampled
+        p = setting('UPSTREAM_HEDGE_PERCENTILE', self.host)
+        if p <= 0 or len(self.latencies) < setting('UPSTREAM_HEDGE_MIN_SAMPLES', self.host):
+            return None
+        return max(setting('UPSTREAM_HEDGE_MIN_DELAY_MS', self.host) / 1000.0, self.percentile(p))
+
+    def take_hedge(self):
+        with self.lock:
+            if self.hedges + 1 > self.gets * setting('UPSTREAM_HEDGE_BUDGET', self.host):
+                return False
+            self.hedges += 1
+            return True
+
+    def count_get(self):
+        with self.lock:
+            self.gets += 1
+
+    def status(self):
+        with self.lock:
+            n = len(self.outcomes)
+            errors = sum(1 for _, f in self.outcomes if f)
+            state, gets, hedges = self.state, self.gets, self.hedges
+        delay = self.hedge_delay()
+        return {
+            'state': state,
+            'p50Ms': _ms(self.percentile(50)),
+            'p95Ms': _ms(self.percentile(95)),
+            'hedgeDelayMs': _ms(delay),
+            'windowCalls': n,
+            'windowErrorRate': round(errors / n, 4) if n else 0.0,
+            'gets': gets,
+            'hedges': hedges,
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+_executor = None
+_executor_pid = None
+
+
+def host_state(host):
+    st = _hosts.get(host)
+    if st is None:
+        with _hosts_lock:
+            st = _hosts.setdefault(host, HostState(host))
+    return st
+
+
+def executor():
+    # Created lazily per process, so forked workers never share the parent's threads
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _hosts_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=int(os.getenv('UPSTREAM_HEDGE_THREADS') or '64'),
+                                               thread_name_prefix='upstream-hedge')
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def status():
+    return {host: st.status() for host, st in sorted(_hosts.items())}
+
+
+def _attempt(st, send, probe=False, due=None):
+    start = time.perf_counter()
+    try:
+        r = send()
+    except Exception:
+        if due is not None and time.time() >= due:
+            # Cut short by the caller's own budget, which says nothing about the host
+            st.release_probe(probe)
+        else:
+            st.record(False, time.perf_counter() - start, probe)
+        raise
+    st.record(not failed(r), time.perf_counter() - start, probe)
+    return r
+
+
+def call(host, send, hedge=False):
+    # Runs send() (-> Response, raising RequestException) under the host's breaker, hedged if asked
+    st = host_state(host)
+    due = deadline.at()  # captured here: attempts may run on hedge threads
+    probe = st.allow()
+    delay = None
+    if hedge:
+        st.count_get()
+        delay = None if probe else st.hedge_delay()
+    if delay is None:
+        return _attempt(st, send, probe, due)
+
+    first = executor().submit(_attempt, st, send, False, due)
+    if wait([first], timeout=delay).done or not st.take_hedge():
+        return first.result()
+    metrics.inc('upstream_hedges_total', {'host': host, 'result': 'sent'})
+    second = executor().submit(_attempt, st, send, False, due)
+    pending, fallback, error = {first, second}, None, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            try:
+                r = f.result()
+            except requests.RequestException as e:
+                error = e
+                continue
+            if not failed(r):
+                if f is second:
+                    metrics.inc('upstream_hedges_total', {'host': host, 'result': 'won'})
+                return r
+            fallback = r
+    if fallback is not None:
+        return fallback
+    raise error
@@ -0,0 +1,96 @@
+import os
+import re
+import json
+import hashlib
+from cache import SQLiteStore, lazy
+
+# Local full-text index (SQLite FTS5) over the digests the nightly job produces and the
+# meeting notes behind them, so "when did we decide X" is one query instead of paging
+# through Trello. Documents are keyed (digest:<target>:<day>, note:<card id>) and re-adding a
+# key replaces the document; unchanged documents are skipped by content hash.
+
+DIGEST, NOTE = 'digest', 'note'
+TITLE_WEIGHT = 5.0  # bm25 weight of a title match relative to the body
+
+
+def fts_query(q):
+    # User text -> a safe FTS5 query: every word must match, the last one as a prefix
+    words = re.findall(r'\w+', q or '')
+    if not words:
+        return None
+    return ' '.join(f'"{w}"' for w in words[:-1]) + (' ' if len(words) > 1 else '') + f'"{words[-1]}"*'
+
+
+class SearchIndex(SQLiteStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS docs (
+                key TEXT PRIMARY KEY, kind TEXT, title TEXT, url TEXT, date TEXT, target TEXT, hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS docs_kind_date ON docs (kind, date);
+            CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(title, body, tokenize = 'porter unicode61');
+        ''')
+
+    def add(self, key, kind, title, body, url=None, date=None, target=None):
+        # -> True when the document was new or changed
+        digest = hashlib.sha256(json.dumps([kind, title, body, url, date, target]).encode('utf-8')).hexdigest()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT rowid, hash FROM docs WHERE key = ?', (key,)).fetchone()
+            if row and row[1] == digest:
+                conn.execute('COMMIT')
+                return False
+            if row:
+                conn.execute('DELETE FROM docs_fts WHERE rowid = ?', (row[0],))
+                conn.execute('UPDATE docs SET kind = ?, title = ?, url = ?, date = ?, target = ?, hash = ? WHERE rowid = ?',
+                             (kind, title, url, date, target, digest, row[0]))
+                rowid = row[0]
+            else:
+                rowid = conn.execute('INSERT INTO docs (key, kind, title, url, date, target, hash) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                     (key, kind, title, url, date, target, digest)).lastrowid
+            conn.execute('INSERT INTO docs_fts (rowid, title, body) VALUES (?, ?, ?)', (rowid, title or '', body or ''))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return True
+
+    def search(self, q, limit=20, kind=None, since=None, until=None, target=None):
+        # -> ranked hits [{ key, kind, title, url, date, target, snippet, score }]; dates are YYYY-MM-DD
+        match = fts_query(q)
+        if not match:
+            return []
+        where, args = ['docs_fts MATCH ?'], [match]
+        for col, op, value in (('kind', '=', kind), ('date', '>=', since), ('date', '<=', until), ('target', '=', target)):
+            if value:
+                where.append(f'd.{col} {op} ?')
+                args.append(value)
+        rows = self._conn().execute(f'''
+            SELECT d.key, d.kind, d.title, d.url, d.date, d.target,
+                   snippet(docs_fts, 1, '[', ']', '…', 16), bm25(docs_fts, {TITLE_WEIGHT}, 1.0) AS score
+            FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid
+            WHERE {' AND '.join(where)}
+            ORDER BY score LIMIT ?''', args + [limit]).fetchall()
+        return [{'key': r[0], 'kind': r[1], 'title': r[2], 'url': r[3], 'date': r[4], 'target': r[5],
+                 'snippet': r[6], 'score': round(-r[7], 4)} for r in rows]
+
+    def documents(self):
+        # -> every stored document with its body, oldest first, for copying the index elsewhere
+        rows = self._conn().execute('''
+            SELECT d.key, d.kind, d.title, f.body, d.url, d.date, d.target
+            FROM docs d JOIN docs_fts f ON f.rowid = d.rowid ORDER BY d.date, d.key''').fetchall()
+        return [{'key': r[0], 'kind': r[1], 'title': r[2], 'body': r[3], 'url': r[4], 'date': r[5], 'target': r[6]} for r in rows]
+
+    def stats(self):
+        counts = dict(self._conn().execute('SELECT kind, COUNT(*) FROM docs GROUP BY kind').fetchall())
+        latest = self._conn().execute('SELECT MAX(date) FROM docs').fetchone()[0]
+        return {'documents': counts, 'latest': latest}
+
+
+def index_path():
+    return os.getenv('SEARCH_INDEX_PATH') or '/tmp/daily-digest-search.sqlite3'
+
+
+get_index = lazy(lambda: SearchIndex(index_path()))
@@ -0,0 +1,51 @@
+import threading
+import metrics
+
+# Request coalescing: concurrent callers with the same key share one in-flight computation.
+# Coalescing is per process; across gunicorn workers the shared cache absorbs the rest.
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=None):
+        # timeout bounds only how long a follower waits for the leader (raises TimeoutError)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        metrics.inc('singleflight_calls_total', {'group': self.name, 'role': 'leader' if leader else 'follower'})
+        if not leader:
+            if not call.event.wait(timeout):
+                raise TimeoutError(f'{self.name}: gave up waiting for in-flight {key}')
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+endpoints = Group('endpoint')
+upstream = Group('upstream')
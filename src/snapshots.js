@@ -0,0 +1,36 @@
+import { SNAPSHOT_BASE_URL } from './config.js';
+
+// Loader mode: past days come from content-hashed static snapshots listed in index.json;
+// only today (still accumulating) goes to the live API.
+let indexPromise = null;
+
+function loadIndex() {
+  if (!indexPromise) {
+    indexPromise = fetch(`${SNAPSHOT_BASE_URL}/index.json`, { cache: 'no-cache' })
+      .then(r => (r.ok ? r.json() : { days: {} }))
+      .catch(() => ({ days: {} }));
+  }
+  return indexPromise;
+}
+
+export function isPastUtcDay(dateStr) {
+  return dateStr < new Date().toISOString().split('T')[0];
+}
+
+// -> { orgGroups, meetingNotes, actionGroups, window } or null when no snapshot exists.
+// window is the digest's own (09:00 SGT to 09:00 SGT from dateStr), not the UTC day.
+export async function loadSnapshot(dateStr) {
+  if (!SNAPSHOT_BASE_URL || !isPastUtcDay(dateStr)) return null;
+  const index = await loadIndex();
+  const entry = index?.days?.[dateStr];
+  if (!entry?.file) return null;
+  try {
+    // File names carry the content hash, so the browser may reuse any cached copy
+    const r = await fetch(`${SNAPSHOT_BASE_URL}/${entry.file}`, { cache: 'force-cache' });
+    if (!r.ok) return null;
+    const snap = await r.json();
+    return snap?.date === dateStr ? snap : null;
+  } catch {
+    return null;
+  }
+}
@@ -0,0 +1,63 @@
+import os
+import json
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+
+# Static per-day digest snapshots for the frontend's loader mode, taken from the data the
+# nightly digest already collected for its window. Each day's payload is written as
+# <date>.<hash>.json (content-hashed, so it can be cached forever) and listed in index.json,
+# the only file a viewer has to revalidate.
+
+INDEX_NAME = 'index.json'
+SCHEMA_VERSION = 2  # 2: every commit group in orgGroups, no separate repoCommits
+
+
+def _atomic_write(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)  # published as static files
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load_index(out_dir):
+    path = os.path.join(out_dir, INDEX_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': SCHEMA_VERSION, 'days': {}}
+
+
+def write_snapshot(out_dir, date, payload):
+    # -> index entry for date; unchanged content keeps the existing file and entry
+    os.makedirs(out_dir, exist_ok=True)
+    body = json.dumps({'version': SCHEMA_VERSION, 'date': date, **payload}, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(body).hexdigest()
+    name = f'{date}.{digest[:12]}.json'
+    index = load_index(out_dir)
+    prev = index.get('days', {}).get(date)
+    if prev and prev.get('sha256') == digest and os.path.exists(os.path.join(out_dir, prev['file'])):
+        return prev
+    _atomic_write(os.path.join(out_dir, name), body)
+    entry = {
+        'file': name,
+        'sha256': digest,
+        'bytes': len(body),
+        'generatedAt': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+    days = dict(index.get('days') or {})
+    days[date] = entry
+    index = {'version': SCHEMA_VERSION, 'days': dict(sorted(days.items(), reverse=True))}
+    _atomic_write(os.path.join(out_dir, INDEX_NAME), json.dumps(index, indent=2).encode('utf-8'))
+    if prev and prev.get('file') != name:
+        try:
+            os.remove(os.path.join(out_dir, prev['file']))
+        except OSError:
+            pass
+    return entry
@@ -0,0 +1,273 @@
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+import metrics
+import deadline
+import digest_core
+
+# Multi-tenant digest generation. A targets file lists the teams to build digests for, each
+# with its own boards, orgs, repos and destination list. The fetches of all targets are
+# planned as one set of unique units, so a board or repo shared by several teams is fetched
+# once, and the units run across a process pool whose workers share the sqlite response cache.
+
+DEFAULT_NOTES_LIST = 'Meeting Notes'
+DEFAULT_IN_PROGRESS = 'In Progress'
+DEFAULT_COMPLETED = 'Completed'
+DEFAULT_MAX_REPOS = 50
+DEADLINE_GRACE_SECONDS = 2  # how long past the deadline to wait for workers to hand back what they have
+
+SECTIONS = {'notes': 'notes', 'actions': 'activity', 'org': 'commits', 'repo': 'commits'}
+
+
+def _board(b):
+    if isinstance(b, str):
+        b = {'name': b}
+    if not (b.get('name') or '').strip():
+        raise ValueError(f'Board entry without a name: {b}')
+    return {
+        'name': b['name'].strip(),
+        'notesList': b.get('notesList', DEFAULT_NOTES_LIST),
+        'inProgressList': b.get('inProgressList', DEFAULT_IN_PROGRESS),
+        'completedList': b.get('completedList', DEFAULT_COMPLETED),
+    }
+
+
+def _org(o):
+    if isinstance(o, str):
+        o = {'name': o}
+    if not (o.get('name') or '').strip():
+        raise ValueError(f'Org entry without a name: {o}')
+    repos = o.get('repos')
+    if isinstance(repos, list):
+        repos = ','.join(repos)
+    return {'name': o['name'].strip(), 'repos': repos or None, 'maxRepos': int(o.get('maxRepos') or DEFAULT_MAX_REPOS)}
+
+
+def _repo(r):
+    # "owner/name" or "owner/name@branch"
+    full, _, branch = r.strip().partition('@')
+    owner, _, name = full.partition('/')
+    if not owner or not name:
+        raise ValueError(f'Repo must be owner/name[@branch]: {r}')
+    return {'owner': owner, 'name': name, 'branch': branch or 'main'}
+
+
+def normalize_target(t):
+    name = (t.get('name') or '').strip()
+    if not name:
+        raise ValueError('Every digest target needs a name')
+    if not t.get('listId'):
+        raise ValueError(f'Digest target {name} has no listId')
+    return {
+        'name': name,
+        'listId': t['listId'],
+        'memberIds': list(t.get('memberIds') or []),
+        'labelIds': list(t.get('labelIds') or []),
+        'boards': [_board(b) for b in t.get('boards') or []],
+        'orgs': [_org(o) for o in t.get('orgs') or []],
+        'repos': [_repo(r) for r in t.get('repos') or []],
+    }
+
+
+def load_targets(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    targets = [normalize_target(t) for t in (data.get('targets') if isinstance(data, dict) else data) or []]
+    if not targets:
+        raise ValueError(f'No digest targets in {path}')
+    names = [t['name'] for t in targets]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Duplicate digest target names in {path}')
+    return targets
+
+
+# --- fetch units: hashable tuples, shared by every target that needs them ---
+
+def org_key(o):
+    return ('org', o['name'], o['repos'], o['maxRepos'])
+
+
+def repo_key(owner, name, branch):
+    return ('repo', owner, name, branch)
+
+
+def expand_org(o, forks=None):
+    # -> repo units for an org, or None to fetch it as one unit (commit search, or a failed listing).
+    # Units of repos that are forks are added to forks.
+    if digest_core.commit_search_enabled():
+        return None
+    try:
+        selected = digest_core.select_repos(digest_core.github_org_repo_pages(o['name']), o['repos'], o['maxRepos'])
+    except Exception:
+        return None  # the org unit reports the error
+    if forks is not None:
+        forks.update(repo_key(o['name'], r['name'], r['default_branch']) for r in selected if r['fork'])
+    return [repo_key(o['name'], r['name'], r['default_branch']) for r in selected]
+
+
+def find_mirrors(units, forks):
+    # -> { mirror unit: unit with the same head }. Only repos that may be copies of another are
+    # checked: forks, and repos sharing a name with another unit. Each check is one SHA-only call;
+    # non-forks are preferred as the unit that gets fetched.
+    repos = [u for u in units if u[0] == 'repo']
+    names = {}
+    for u in repos:
+        names.setdefault(u[2].lower(), []).append(u)
+    candidates = [u for u in repos if u in forks or len(names[u[2].lower()]) > 1]
+    if len(candidates) < 2:
+        return {}
+
+    def head(u):
+        try:
+            return digest_core.repo_head_sha(u[1], u[2], u[3])
+        except Exception:
+            return None  # fetched normally
+
+    with ThreadPoolExecutor(max_workers=min(8, len(candidates))) as pool:
+        heads = dict(zip(candidates, pool.map(head, candidates)))
+    canonical, mirrors = {}, {}
+    for u in sorted(candidates, key=lambda u: u in forks):
+        h = heads[u]
+        if h is None:
+            continue
+        if h in canonical:
+            mirrors[u] = canonical[h]
+        else:
+            canonical[h] = u
+    return mirrors
+
+
+def plan(targets):
+    # -> (unique units in first-seen order, { org key: its repo units or None }, { mirror: unit })
+    # Orgs are expanded into per-repo units here, so an org's repos spread across the pool
+    # and a repo that one team follows directly and another gets through its org is fetched once.
+    # Repos whose branch head matches another unit's are mirrors and are not fetched at all.
+    seen, orgs, forks = {}, {}, set()
+    for t in targets:
+        for b in t['boards']:
+            if b['notesList']:
+                seen.setdefault(('notes', b['name'], b['notesList']), None)
+            seen.setdefault(('actions', b['name'], b['inProgressList'], b['completedList']), None)
+        for o in t['orgs']:
+            k = org_key(o)
+            if k not in orgs:
+                orgs[k] = expand_org(o, forks)
+            for u in orgs[k] if orgs[k] is not None else [k]:
+                seen.setdefault(u, None)
+        for r in t['repos']:
+            seen.setdefault(repo_key(r['owner'], r['name'], r['branch']), None)
+    mirrors = find_mirrors(list(seen), forks)
+    return [u for u in seen if u not in mirrors], orgs, mirrors
+
+
+def fetch_unit(unit, since, until):
+    kind = unit[0]
+    if kind == 'notes':
+        return digest_core.fetch_trello_notes(unit[1], unit[2], since, until)
+    if kind == 'actions':
+        return digest_core.fetch_trello_actions(unit[1], since, until, in_progress_list=unit[2], completed_list=unit[3])
+    if kind == 'org':
+        return digest_core.fetch_org_commits(unit[1], since, until, unit[2], unit[3])
+    if kind == 'repo':
+        return digest_core.fetch_github_commit_group(unit[1], unit[2], unit[3], since, until)
+    raise ValueError(f'Unknown fetch unit: {unit}')
+
+
+def _run(unit, since, until):
+    try:
+        return fetch_unit(unit, since, until), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def run_unit(unit, since, until, due=None):
+    # Pool entry point -> (result, error, metrics of this unit only)
+    metrics.reset()
+    with deadline.until(due):
+        result, error = _run(unit, since, until)
+    return result, error, metrics.export_state()
+
+
+def fetch_all(units, since, until, workers=1):
+    # -> { unit: (result, error) }. Honours the caller's deadline: units not finished by then
+    # come back as DeadlineExceeded errors. Worker metrics are merged into this process's registry.
+    out = {}
+    due = deadline.at()
+    if workers <= 1 or len(units) <= 1:
+        for u in units:
+            out[u] = _run(u, since, until)
+        return out
+    # Workers share upstream responses through the sqlite cache unless a backend was chosen
+    os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+    ctx = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(units)), mp_context=ctx)
+    try:
+        futures = {u: pool.submit(run_unit, u, since, until, due) for u in units}
+        wait(futures.values(), timeout=None if due is None else max(0, due - time.time()) + DEADLINE_GRACE_SECONDS)
+        for u, fut in futures.items():
+            if not fut.done():
+                deadline.mark_hit()
+                out[u] = (None, 'DeadlineExceeded: not finished within the digest time budget')
+                continue
+            try:
+                result, error, state = fut.result()
+                metrics.merge_state(state)
+            except Exception as e:
+                result, error = None, f'{type(e).__name__}: {e}'
+            out[u] = (result, error)
+    finally:
+        # Stragglers are abandoned; they stop on their own at the deadline
+        pool.shutdown(wait=due is None, cancel_futures=True)
+    return out
+
+
+def assemble(t, results, orgs, mirrors=None):
+    # -> (notes, commit_groups, activity_groups, errors, sections) for one target from the
+    # shared results; sections maps notes/commits/activity to 'complete' or 'partial'.
+    # Commits are listed once by SHA: mirrors and duplicates are collapsed into the first repo.
+    mirrors = mirrors or {}
+    notes, commit_groups, activity_groups, errors = [], [], [], []
+    sections = {'notes': 'complete', 'commits': 'complete', 'activity': 'complete'}
+    seen_repos = set()
+    multi_board = len(t['boards']) > 1
+
+    def take(unit):
+        result, error = results.get(unit, (None, 'not fetched'))
+        if error:
+            errors.append(f'{unit[0]} {"/".join(str(p) for p in unit[1:] if p)}: {error}')
+            sections[SECTIONS[unit[0]]] = 'partial'
+        return result
+
+    for b in t['boards']:
+        if b['notesList']:
+            notes.extend(take(('notes', b['name'], b['notesList'])) or [])
+        for g in take(('actions', b['name'], b['inProgressList'], b['completedList'])) or []:
+            activity_groups.append({**g, 'column': f"{b['name']} · {g['column']}"} if multi_board else g)
+    units = []
+    for o in t['orgs']:
+        k = org_key(o)
+        if orgs.get(k) is None:
+            commit_groups.extend(take(k) or [])
+        else:
+            units.extend(orgs[k])
+    units.extend(repo_key(r['owner'], r['name'], r['branch']) for r in t['repos'])
+    # Mirrors go last, so the repo they copy keeps its own name and lists them
+    for u in sorted(units, key=lambda u: u in mirrors):
+        if u in seen_repos:
+            continue
+        seen_repos.add(u)
+        if u in mirrors:
+            # Not fetched: listed under the repo it mirrors, as that repo's own group or a relabelled copy
+            g = take(mirrors[u])
+            if g:
+                commit_groups.append({**g, 'repo': u[2], 'url': f'https://github.com/{u[1]}/{u[2]}'})
+            continue
+        g = take(u)
+        if g:
+            commit_groups.append(g)
+    commit_groups = digest_core.dedupe_commit_groups(commit_groups)
+    if any(g.get('truncated') for g in commit_groups):
+        sections['commits'] = 'partial'
+    return notes, commit_groups, activity_groups, errors, sections
@@ -0,0 +1,210 @@
+import os
+import re
+import codecs
+import hashlib
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+
+from cache import SQLiteStore, lazy
+
+# Content-addressed transcript store. Uploads are spooled to disk while their bytes are
+# hashed, parsed (.txt / .docx) in a streaming pass into <id>.txt, and indexed in SQLite.
+# The id is the sha256 of the extracted text, so re-uploads (even re-saved files with the
+# same text) map to the stored copy; a known upload hash skips parsing entirely.
+
+CHUNK = 64 * 1024
+EXCERPT_CHARS = 2000  # what build_user_content sends per transcript
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def max_upload_bytes():
+    return int(os.getenv('TRANSCRIPT_MAX_BYTES') or str(50 * 1024 * 1024))
+
+
+def max_text_bytes():
+    # Cap on the XML a .docx inflates to: a few KB of zip can expand to gigabytes
+    return int(os.getenv('TRANSCRIPT_MAX_TEXT_BYTES') or str(100 * 1024 * 1024))
+
+
+def guess_date_from_name(name):
+    # Same rule as guessDateFromName in src/dragdrop.js
+    m = re.search(r'(20\d{2})[-_](\d{2})[-_](\d{2})', name or '')
+    if not m:
+        return None
+    try:
+        d = datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)), tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return d.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def iter_txt(fp):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    while True:
+        block = fp.read(CHUNK)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class CappedReader:
+    # Stops reading a stream once more than limit bytes came out of it
+    def __init__(self, fp, limit, what):
+        self.fp = fp
+        self.limit = limit
+        self.what = what
+        self.read_bytes = 0
+
+    def read(self, n=-1):
+        block = self.fp.read(CHUNK if n is None or n < 0 else n)
+        self.read_bytes += len(block)
+        if self.limit and self.read_bytes > self.limit:
+            raise UploadTooLarge(f'{self.what} expands to more than {self.limit} bytes')
+        return block
+
+
+def iter_docx(path, max_xml_bytes=None, filename=None):
+    # Streams word/document.xml: runs of w:t text, w:tab/w:br as whitespace, one line per paragraph
+    with zipfile.ZipFile(path) as z, z.open('word/document.xml') as doc:
+        for event, el in ET.iterparse(CappedReader(doc, max_xml_bytes, filename or path), events=('end',)):
+            tag = el.tag
+            if tag == W_NS + 't':
+                if el.text:
+                    yield el.text
+            elif tag == W_NS + 'tab':
+                yield '\t'
+            elif tag in (W_NS + 'br', W_NS + 'cr'):
+                yield '\n'
+            elif tag == W_NS + 'p':
+                yield '\n'
+                el.clear()
+
+
+def public(rec):
+    return {k: v for k, v in rec.items() if k != 'excerpt'}
+
+
+class TranscriptStore(SQLiteStore):
+    def __init__(self, root, max_bytes=None, max_text_bytes=None):
+        super().__init__(os.path.join(root, 'index.sqlite3'))
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_text_bytes = max_text_bytes
+        self._conn().executescript('''
+            CREATE TABLE IF NOT EXISTS transcripts (
+                id TEXT PRIMARY KEY, filename TEXT, date_guess TEXT, chars INTEGER,
+                bytes INTEGER, created TEXT, excerpt TEXT
+            );
+            CREATE TABLE IF NOT EXISTS uploads (sha256 TEXT PRIMARY KEY, id TEXT);
+        ''')
+
+    def text_path(self, tid):
+        return os.path.join(self.root, f'{tid}.txt')
+
+    def get(self, tid):
+        if not re.fullmatch(r'[0-9a-f]{64}', tid or ''):
+            return None
+        row = self._conn().execute(
+            'SELECT id, filename, date_guess, chars, bytes, created, excerpt FROM transcripts WHERE id = ?', (tid,)).fetchone()
+        if not row:
+            return None
+        return {'id': row[0], 'filename': row[1], 'dateGuess': row[2], 'chars': row[3],
+                'bytes': row[4], 'created': row[5], 'excerpt': row[6]}
+
+    def list(self, limit=100):
+        rows = self._conn().execute('SELECT id FROM transcripts ORDER BY created DESC LIMIT ?', (limit,)).fetchall()
+        return [self.get(r[0]) for r in rows]
+
+    def add(self, filename, stream):
+        # -> (record without excerpt, deduped). Raises ValueError for unsupported or unreadable files.
+        ext = os.path.splitext(filename or '')[1].lower()
+        if ext not in ('.txt', '.docx'):
+            raise ValueError(f'Unsupported transcript type: {filename} (expected .txt or .docx)')
+        raw_hash = hashlib.sha256()
+        size = 0
+        fd, spool = tempfile.mkstemp(dir=self.root, suffix=ext)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    block = stream.read(CHUNK)
+                    if not block:
+                        break
+                    raw_hash.update(block)
+                    size += len(block)
+                    # Counted here, as chunked uploads carry no Content-Length to check up front
+                    if self.max_bytes and size > self.max_bytes:
+                        raise UploadTooLarge(f'{filename} is larger than {self.max_bytes} bytes')
+                    out.write(block)
+            if size == 0:
+                raise ValueError(f'Empty upload: {filename}')
+            raw = raw_hash.hexdigest()
+            row = self._conn().execute('SELECT id FROM uploads WHERE sha256 = ?', (raw,)).fetchone()
+            if row and self.get(row[0]):
+                return public(self.get(row[0])), True
+            return self._ingest(filename, ext, spool, raw, size)
+        finally:
+            if os.path.exists(spool):
+                os.remove(spool)
+
+    def _ingest(self, filename, ext, spool, raw, size):
+        text_hash = hashlib.sha256()
+        chars = 0
+        excerpt = []
+        fd, staged = tempfile.mkstemp(dir=self.root, suffix='.part')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as out:
+                if ext == '.docx':
+                    try:
+                        for part in iter_docx(spool, self.max_text_bytes, filename):
+                            chars, excerpt = self._emit(part, out, text_hash, chars, excerpt)
+                    except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+                        raise ValueError(f'Could not read .docx {filename}: {e}')
+                else:
+                    with open(spool, 'rb') as fp:
+                        for part in iter_txt(fp):
+                            chars, excerpt = self._emit(part, out, text_hash, chars, excerpt)
+            tid = text_hash.hexdigest()
+            conn = self._conn()
+            existing = self.get(tid)
+            if existing is None:
+                os.replace(staged, self.text_path(tid))
+                conn.execute('INSERT OR IGNORE INTO transcripts VALUES (?, ?, ?, ?, ?, ?, ?)', (
+                    tid, filename, guess_date_from_name(filename), chars, size,
+                    datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'), ''.join(excerpt)))
+            conn.execute('INSERT OR REPLACE INTO uploads VALUES (?, ?)', (raw, tid))
+            return public(self.get(tid)), existing is not None
+        finally:
+            if os.path.exists(staged):
+                os.remove(staged)
+
+    @staticmethod
+    def _emit(part, out, text_hash, chars, excerpt):
+        out.write(part)
+        text_hash.update(part.encode('utf-8'))
+        if chars < EXCERPT_CHARS:
+            excerpt.append(part[:EXCERPT_CHARS - chars])
+        return chars + len(part), excerpt
+
+    def excerpt_for_prompt(self, tid):
+        # -> (record, text as build_user_content would slice it) or (None, None)
+        rec = self.get(tid)
+        if rec is None:
+            return None, None
+        text = rec['excerpt'] + ('…' if rec['chars'] > EXCERPT_CHARS else '')
+        return rec, text
+
+
+get_store = lazy(lambda: TranscriptStore(os.getenv('TRANSCRIPT_DIR') or '/tmp/daily-digest-transcripts',
+                                         max_upload_bytes(), max_text_bytes()))
@@ -1,25 +1,22 @@
 import { API_BASE_URL } from './config.js';
-export async function fetchMeetingNotes({ boardName, listName, since, until }) {
-  const url = `${API_BASE_URL}/api/trello/meeting-notes`;
-  const r = await fetch(url, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
-    body: JSON.stringify({ boardName, listName, since, until })
-  });
-  if (!r.ok) { const t = await r.text(); throw new Error(`Backend /trello/meeting-notes HTTP ${r.status} ${t}`); }
+import { backendError, budgetedFetch, withPartial } from './budget.js';
+function query(params) {
+  return new URLSearchParams(Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== '')).toString();
+}
+export async function fetchMeetingNotes({ boardName, listName, since, until, budgetMs }) {
+  // GET so the browser can revalidate with If-None-Match and get a 304 when nothing changed
+  const url = `${API_BASE_URL}/api/trello/meeting-notes?${query({ boardName, listName, since, until })}`;
+  const { r, partial } = await budgetedFetch(url, budgetMs);
+  if (!r.ok) { const t = await r.text(); throw backendError('/trello/meeting-notes', r.status, t); }
   const data = await r.json();
   // Support both shapes: raw array or { notes: [] }
-  return Array.isArray(data) ? data : (Array.isArray(data?.notes) ? data.notes : []);
+  return withPartial(Array.isArray(data) ? data : (Array.isArray(data?.notes) ? data.notes : []), partial);
 }
 
-export async function fetchBoardActions({ boardName, since, until, types = 'all', inProgressList, completedList }) {
-  const url = `${API_BASE_URL}/api/trello/board-actions`;
-  const r = await fetch(url, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
-    body: JSON.stringify({ boardName, since, until, types, inProgressList, completedList })
-  });
-  if (!r.ok) { const t = await r.text(); throw new Error(`Backend /trello/board-actions HTTP ${r.status} ${t}`); }
+export async function fetchBoardActions({ boardName, since, until, types = 'all', inProgressList, completedList, budgetMs }) {
+  const url = `${API_BASE_URL}/api/trello/board-actions?${query({ boardName, since, until, types, inProgressList, completedList })}`;
+  const { r, partial } = await budgetedFetch(url, budgetMs);
+  if (!r.ok) { const t = await r.text(); throw backendError('/trello/board-actions', r.status, t); }
   const data = await r.json();
-  return Array.isArray(data?.groups) ? data.groups : [];
+  return withPartial(Array.isArray(data?.groups) ? data.groups : [], partial);
 }
\ No newline at end of file
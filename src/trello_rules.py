@@ -0,0 +1,121 @@
+# Board-activity classifier shared by the digest job and the webapp.
+# Column and action-type rules are compiled once into a dispatch table keyed by action
+# type; group() then classifies and groups a stream of actions in a single pass.
+
+IN_PROGRESS = 'In Progress'
+COMPLETED = 'Completed'
+COLUMN_ORDER = {IN_PROGRESS: 0, COMPLETED: 1}
+
+# Common aliases are always included, even when explicit list names are provided
+BASE_IN_PROGRESS = ('in progress', 'in-progress', 'doing')
+BASE_COMPLETED = ('completed', 'complete', 'done')
+
+MOVE_TYPES = ('updateCard', 'createCard', 'copyCard', 'moveCardToBoard')
+DETAIL_TYPES = ('commentCard', 'updateCheckItemStateOnCard', 'addAttachmentToCard')
+# Every action type some rule looks at; anything else is dropped unread
+RULE_TYPES = MOVE_TYPES + DETAIL_TYPES
+
+MOVE = 'move'
+DETAIL = 'detail'
+
+
+def norm(s):
+    return (s or '').strip().lower()
+
+
+def pick_action(a):
+    data = a.get('data') or {}
+    card = data.get('card') or {}
+    list_name = (data.get('list') or {}).get('name') or ((data.get('listAfter') or {}).get('name'))
+    return {
+        'date': a.get('date'),
+        'type': a.get('type'),
+        'member': (a.get('memberCreator') or {}).get('fullName'),
+        'cardId': card.get('id'),
+        'card': card.get('name'),
+        'list': list_name,
+        'text': data.get('text'),
+        'attachment': (data.get('attachment') or {}),
+        'checkItemName': ((data.get('checkItem') or {}).get('name'))
+    }
+
+
+class ActionRules:
+    def __init__(self, in_progress_list=None, completed_list=None):
+        # normalized list name -> column; In Progress wins when a name is in both
+        columns = {}
+        for n in BASE_COMPLETED + ((norm(completed_list),) if completed_list else ()):
+            columns[n] = COMPLETED
+        for n in BASE_IN_PROGRESS + ((norm(in_progress_list),) if in_progress_list else ()):
+            columns[n] = IN_PROGRESS
+        self.columns = columns
+        self.dispatch = {t: self._move for t in MOVE_TYPES}
+        self.dispatch.update({
+            'commentCard': self._comment_with_link,
+            'updateCheckItemStateOnCard': self._checklist_complete,
+            'addAttachmentToCard': self._attachment_added,
+        })
+
+    # Each rule returns (MOVE, column) for a move/create into a target column,
+    # (DETAIL, None) for activity kept only on target cards, or None.
+
+    def _move(self, a, d):
+        name = ((d.get('listAfter') or {}).get('name')) or ((d.get('list') or {}).get('name'))
+        col = self.columns.get(norm(name))
+        return (MOVE, col) if col else None
+
+    def _comment_with_link(self, a, d):
+        txt = d.get('text') or ''
+        return (DETAIL, None) if ('http://' in txt or 'https://' in txt) else None
+
+    def _checklist_complete(self, a, d):
+        state = ((d.get('checkItem') or {}).get('state') or '').strip().lower()
+        return (DETAIL, None) if state == 'complete' else None
+
+    def _attachment_added(self, a, d):
+        return (DETAIL, None)
+
+    def classify(self, a):
+        rule = self.dispatch.get((a.get('type') or '').strip())
+        if rule is None:
+            return None
+        return rule(a, a.get('data') or {})
+
+    def group(self, actions):
+        # -> [(column, [(card_id, [action, ...]), ...]), ...] in column order.
+        # Cards land in Completed if any qualifying move targets it, otherwise In Progress.
+        # Detail actions are kept only for cards that end up with a target column, so they
+        # are buffered per card until the stream ends. Input order is preserved per card.
+        card_column = {}
+        card_actions = {}
+        orphans = {}
+        dispatch = self.dispatch
+        for a in actions:
+            rule = dispatch.get((a.get('type') or '').strip())
+            if rule is None:
+                continue
+            d = a.get('data') or {}
+            hit = rule(a, d)
+            if hit is None:
+                continue
+            kind, col = hit
+            cid = (d.get('card') or {}).get('id')
+            if cid is None:
+                if kind == MOVE:
+                    orphans.setdefault(col, []).append(a)
+                continue
+            if kind == MOVE and card_column.get(cid) != COMPLETED:
+                card_column[cid] = col
+            bucket = card_actions.get(cid)
+            if bucket is None:
+                bucket = card_actions[cid] = []
+            bucket.append(a)
+
+        grouped = {IN_PROGRESS: [], COMPLETED: []}
+        for cid, acts in card_actions.items():
+            col = card_column.get(cid)
+            if col:
+                grouped[col].append((cid, acts))
+        for col, acts in orphans.items():
+            grouped[col].append((None, acts))
+        return [(col, cards) for col, cards in grouped.items() if cards]
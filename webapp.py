@@ -1,9 +1,38 @@
 import os
+import sys
 import json
 import re
-from datetime import datetime
-from flask import Flask, request, jsonify, make_response
+import time
+import hmac
+import base64
+import hashlib
+import functools
+from datetime import datetime, timedelta
+from flask import Flask, request, jsonify, make_response, send_file, g
+from flask.json.provider import DefaultJSONProvider
 import requests
+try:
+    import orjson
+except ImportError:  # optional: falls back to Flask's stdlib encoder
+    orjson = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+import metrics
+import http_client
+import resilience
+import deadline
+import singleflight
+import prefetch
+import event_log
+import trello_rules
+import http_encoding
+import transcripts as transcripts_store
+import jobs
+import near_dupes
+import search_index
+import fetch_profiles
+from digest_core import (github_commit_pages, github_org_repo_pages, normalize_commit, select_repos,
+                         commit_search_enabled, search_org_commits)
 
 # --- simple .env loader (no external deps) ---
 def load_env_file(path='.env'):
@@ -29,12 +58,52 @@ def load_env_file(path='.env'):
 # Load env from local .env if present
 load_env_file()
 
+# Upstream base URLs; override to point at a local stand-in (scripts/stub_upstream.py)
+def github_api_base():
+    return (os.getenv('GITHUB_API_BASE') or 'https://api.github.com').strip().rstrip('/')
+
+def trello_api_base():
+    return (os.getenv('TRELLO_API_BASE') or 'https://api.trello.com/1').strip().rstrip('/')
+
+def openai_api_base():
+    return (os.getenv('OPENAI_API_BASE') or 'https://api.openai.com/v1').strip().rstrip('/')
+
+class OrjsonProvider(DefaultJSONProvider):
+    # orjson encodes the large action/notes lists several times faster than the stdlib;
+    # output keeps Flask's sorted keys so ETags match either encoder.
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+# No route takes a body larger than a transcript upload; werkzeug stops reading past it
+app.config['MAX_CONTENT_LENGTH'] = transcripts_store.max_upload_bytes()
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f'Request body larger than {app.config["MAX_CONTENT_LENGTH"]} bytes'}), 413
 
 # Simple CORS for local dev and GitHub Pages
 # You can restrict origins via env: ALLOWED_ORIGINS="https://xiang-suc.github.io,https://localhost:8022"
 ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', '*')
 
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(resp):
+    start = getattr(g, 'request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                        {'route': route, 'method': request.method, 'status': resp.status_code})
+    return resp
+
 @app.after_request
 def add_cors(resp):
     origin = (request.headers.get('Origin') or '').strip()
@@ -50,10 +119,100 @@ def add_cors(resp):
     req_headers = request.headers.get('Access-Control-Request-Headers', '')
     resp.headers['Access-Control-Allow-Headers'] = req_headers or 'Content-Type, Authorization'
     resp.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-    resp.headers['Vary'] = 'Origin'
+    resp.headers['Access-Control-Expose-Headers'] = 'X-Digest-Truncated, X-Digest-Partial, Retry-After, Location'
+    resp.vary.add('Origin')
     return resp
 
+@app.after_request
+def encode_response(resp):
+    # Strong ETag + 304 for GET JSON, then br/gzip by Accept-Encoding for large text bodies
+    if resp.direct_passthrough or resp.status_code != 200 or 'Content-Encoding' in resp.headers:
+        return resp
+    body = resp.get_data()
+    coding = http_encoding.negotiate(request.headers.get('Accept-Encoding')) if http_encoding.compressible(resp.mimetype, body) else None
+    if coding or resp.mimetype == 'application/json':
+        resp.vary.add('Accept-Encoding')
+    if request.method == 'GET' and resp.mimetype == 'application/json':
+        tag = http_encoding.payload_etag(body)
+        resp.headers['ETag'] = http_encoding.etag_for(tag, coding)
+        # Always revalidate: the data moves, but unchanged payloads cost a 304
+        resp.headers['Cache-Control'] = 'no-cache'
+        if http_encoding.etag_matches(request.headers.get('If-None-Match'), tag):
+            resp.status_code = 304
+            resp.set_data(b'')
+            return resp
+    if coding:
+        resp.set_data(http_encoding.compress(body, coding))
+        resp.headers['Content-Encoding'] = coding
+    return resp
+
+# --- request coalescing ---
+
+# Names compared case-insensitively by the handlers, so they can share a flight
+CASE_INSENSITIVE_PARAMS = {'org', 'owner', 'repo', 'repos', 'boardName', 'listName', 'inProgressList', 'completedList'}
+
+def request_key():
+    params = dict(request.args.items())
+    if request.method == 'POST':
+        params.update(request.get_json(force=True, silent=True) or {})
+    norm = []
+    for k, v in sorted(params.items()):
+        v = v.strip() if isinstance(v, str) else json.dumps(v, sort_keys=True)
+        norm.append((k, v.lower() if k in CASE_INSENSITIVE_PARAMS else v))
+    return f"{request.path}?{json.dumps(norm)}"
+
+def upstream_unavailable(e):
+    # An open circuit fails fast; tell the caller when the host will be probed again
+    resp = jsonify({'error': f'Upstream unavailable: {e.host}', 'details': str(e)})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(max(1, int(e.retry_after + 0.999)))
+    return resp
+
+def request_budget():
+    # Seconds the caller is willing to wait (X-Digest-Budget-Ms), else REQUEST_BUDGET_SECONDS, else none
+    try:
+        ms = float(request.headers.get('X-Digest-Budget-Ms') or 0)
+    except ValueError:
+        ms = 0
+    return ms / 1000.0 if ms > 0 else (float(os.getenv('REQUEST_BUDGET_SECONDS') or 0) or None)
+
+def budget_exhausted(e):
+    return jsonify({'error': 'Time budget exhausted before any data arrived', 'details': str(e), 'partial': True}), 504
+
+def coalesce(view):
+    # Concurrent requests with identical normalized params run the handler once;
+    # each caller gets its own copy of the response so per-request headers stay separate.
+    # The handler runs under the request's time budget; answers cut short carry X-Digest-Partial
+    # and are given only to the caller whose budget ran out.
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method == 'OPTIONS' or http_client.refreshing():
+            return view(*args, **kwargs)
+
+        ran = []
+
+        def compute(seconds):
+            ran.append(True)
+            with deadline.budget(seconds):
+                resp = app.make_response(view(*args, **kwargs))
+                partial = deadline.hit()
+                if partial:
+                    resp.headers['X-Digest-Partial'] = 'true'
+            headers = [(k, v) for k, v in resp.headers.items() if k.lower() != 'content-length']
+            return resp.status_code, resp.get_data(), headers, partial
+
+        seconds = request_budget()
+        status, body, headers, partial = singleflight.endpoints.do(request_key(), lambda: compute(seconds))
+        if partial and not ran:
+            # The leader was cut short by its own budget, which need not be ours: a follower
+            # spends what is left of its budget on its own run instead of sharing the partial answer
+            left = None if seconds is None else max(0.001, seconds - (time.perf_counter() - g.request_start))
+            status, body, headers, partial = compute(left)
+        return app.response_class(body, status=status, headers=headers)
+    return wrapper
+
 @app.route('/api/github/commits', methods=['GET', 'OPTIONS'])
+@coalesce
 def github_commits():
     if request.method == 'OPTIONS':
         return make_response('', 204)
@@ -67,53 +226,39 @@ def github_commits():
     if not owner or not repo or not since or not until:
         return jsonify({ 'error': 'Missing required params: owner, repo, since, until' }), 400
 
-    token = os.getenv('GITHUB_TOKEN', '').strip()
-    headers = {
-        'Accept': 'application/vnd.github+json',
-        **({ 'Authorization': f'Bearer {token}' } if token else {})
-    }
-
-    commits = []
-    page = 1
-    try:
-        while page < 10:
-            url = f"https://api.github.com/repos/{owner}/{repo}/commits?sha={branch}&since={since}&until={until}&per_page=100&page={page}"
-            r = requests.get(url, headers=headers, timeout=30)
-            if r.status_code >= 400:
-                return jsonify({ 'error': f'GitHub HTTP {r.status_code}', 'details': r.text }), r.status_code
-            batch = r.json()
-            commits.extend(batch)
-            if len(batch) < 100:
-                break
-            page += 1
-    except requests.RequestException as e:
-        return jsonify({ 'error': 'GitHub request failed', 'details': str(e) }), 502
+    # Webhook event log answers the covered parts of the window; poll only the gaps. It holds
+    # default-branch pushes only, so any other branch is always polled.
+    hooks = ['github:' + owner.lower(), f'github:{owner.lower()}/{repo.lower()}'] if logs_branch(owner, repo, branch) else []
+    poll, logged = webhook_window(hooks, since, until, synced=[event_log.branch_source(owner, repo, branch)])
 
-    def to_utc_iso(s):
+    normalized = []
+    truncated = False
+    for poll_since, poll_until in poll:
+        pages = github_commit_pages(owner, repo, branch, poll_since, poll_until)
         try:
-            return datetime.fromisoformat(s.replace('Z', '+00:00')).astimezone().isoformat().replace('+00:00', 'Z')
-        except Exception:
-            try:
-                return datetime.strptime(s, '%Y-%m-%dT%H:%M:%S%z').astimezone().isoformat().replace('+00:00', 'Z')
-            except Exception:
-                return s or ''
+            window = [normalize_commit(c) for c in pages]
+        except http_client.CircuitOpenError as e:
+            return upstream_unavailable(e)
+        except deadline.DeadlineExceeded as e:
+            return budget_exhausted(e)
+        except requests.RequestException as e:
+            return jsonify({ 'error': 'GitHub request failed', 'details': str(e) }), 502
+        if pages.error is not None:
+            return jsonify({ 'error': f'GitHub HTTP {pages.error.status_code}', 'details': pages.error.text }), pages.error.status_code
+        normalized = merge_commits(normalized, window) if normalized else window
+        truncated = truncated or pages.truncated
 
-    normalized = []
-    for c in commits:
-        msg = (c.get('commit') or {}).get('message', '')
-        author_name = ((c.get('commit') or {}).get('author') or {}).get('name') or (c.get('author') or {}).get('login') or ''
-        author_date = ((c.get('commit') or {}).get('author') or {}).get('date') or ''
-        normalized.append({
-            'sha': c.get('sha'),
-            'url': c.get('html_url'),
-            'message': msg,
-            'author': author_name,
-            'date': to_utc_iso(author_date)
-        })
-
-    return jsonify(normalized)
+    for log_since, log_until in logged:
+        normalized = merge_commits(normalized, logged_commits(owner, log_since, log_until, repo=repo, branch=branch))
+
+    resp = jsonify(normalized)
+    if truncated:
+        # The body stays a plain array for existing clients; truncation is flagged in a header
+        resp.headers['X-Digest-Truncated'] = 'true'
+    return resp
 
 @app.route('/api/github/org-commits', methods=['GET', 'OPTIONS'])
+@coalesce
 def github_org_commits():
     if request.method == 'OPTIONS':
         return make_response('', 204)
@@ -127,103 +272,86 @@ def github_org_commits():
     if not org or not since or not until:
         return jsonify({'error': 'Missing required params: org, since, until'}), 400
 
-    token = os.getenv('GITHUB_TOKEN', '').strip()
-    headers = {
-        'Accept': 'application/vnd.github+json',
-        **({ 'Authorization': f'Bearer {token}' } if token else {})
-    }
-
-    # List repos in the organization (paginate, up to max_repos)
-    repos = []
-    page = 1
-    try:
-        while len(repos) < max_repos and page < 10:
-            url = f"https://api.github.com/orgs/{org}/repos?per_page=100&page={page}&type=all&sort=updated"
-            r = requests.get(url, headers=headers, timeout=30)
-            if r.status_code >= 400:
-                return jsonify({ 'error': f'GitHub HTTP {r.status_code}', 'details': r.text }), r.status_code
-            batch = r.json() or []
-            repos.extend(batch)
-            if len(batch) < 100:
-                break
-            page += 1
-    except requests.RequestException as e:
-        return jsonify({ 'error': 'GitHub list repos failed', 'details': str(e) }), 502
+    # Webhook event log answers the covered parts of the window; poll only the gaps
+    poll, logged = webhook_window(['github:' + org.lower()], since, until)
 
-    # Optional filter by repo names
     filter_set = {n.strip().lower() for n in repos_filter.split(',') if n.strip()} if repos_filter else None
-    selected = []
-    for r in repos:
-        name = (r.get('name') or '').strip()
-        if not name:
-            continue
-        if filter_set and name.lower() not in filter_set:
-            continue
-        selected.append({
-            'name': name,
-            'full_name': r.get('full_name') or name,
-            'html_url': r.get('html_url') or '',
-            'default_branch': r.get('default_branch') or 'main',
-            'pushed_at': r.get('pushed_at') or ''
-        })
-        if len(selected) >= max_repos:
-            break
 
-    def to_utc_iso(s):
+    # List repos in the organization, streamed only as far as needed for max_repos
+    selected = []
+    truncated = False
+    if poll:
+        repo_pages = github_org_repo_pages(org)
         try:
-            return datetime.fromisoformat(s.replace('Z', '+00:00')).astimezone().isoformat().replace('+00:00', 'Z')
-        except Exception:
-            try:
-                return datetime.strptime(s, '%Y-%m-%dT%H:%M:%S%z').astimezone().isoformat().replace('+00:00', 'Z')
-            except Exception:
-                return s or ''
+            selected = select_repos(repo_pages, repos_filter, max_repos)
+        except http_client.CircuitOpenError as e:
+            return upstream_unavailable(e)
+        except deadline.DeadlineExceeded as e:
+            return budget_exhausted(e)
+        except requests.RequestException as e:
+            return jsonify({ 'error': 'GitHub list repos failed', 'details': str(e) }), 502
+        if repo_pages.error is not None:
+            return jsonify({ 'error': f'GitHub HTTP {repo_pages.error.status_code}', 'details': repo_pages.error.text }), repo_pages.error.status_code
+        truncated = repo_pages.truncated
 
-    # For each repo, fetch commits in range
     groups = []
-    for repo in selected:
-        commits = []
-        page = 1
-        try:
-            while page < 10:
-                url = (
-                    f"https://api.github.com/repos/{org}/{repo['name']}/commits"
-                    f"?sha={repo['default_branch']}&since={since}&until={until}&per_page=100&page={page}"
-                )
-                r = requests.get(url, headers=headers, timeout=30)
-                if r.status_code >= 400:
-                    # If commits endpoint fails (e.g., archived), skip repo but continue
-                    break
-                batch = r.json() or []
-                commits.extend(batch)
-                if len(batch) < 100:
+    by_repo = {}
+
+    def add_group(repo, url, branch, commits, cut=False):
+        g = by_repo.get(repo.lower())
+        if g is None:
+            g = by_repo[repo.lower()] = {'repo': repo, 'url': url, 'branch': branch, 'commits': [], 'truncated': False}
+            groups.append(g)
+        g['commits'] = merge_commits(g['commits'], commits)
+        g['truncated'] = g['truncated'] or cut
+
+    stopped = False
+    for poll_since, poll_until in (poll if selected else []):
+        if stopped:
+            break
+        # Optional fast path: one org-wide commit search; None means fall back to per-repo listing
+        found = search_org_commits(org, poll_since, poll_until, selected) if commit_search_enabled() else None
+        if found is not None:
+            for g in found:
+                add_group(g['repo'], g['url'], g['branch'], g['commits'], g.get('truncated', False))
+            continue
+
+        # For each repo, fetch commits in range; what the prefetcher synced for the repo's
+        # default branch is read from the log
+        for repo in selected:
+            repo_poll, repo_logged = webhook_window([], poll_since, poll_until,
+                                                    synced=[event_log.branch_source(org, repo['name'], repo['default_branch'])])
+            normalized = []
+            cut = False
+            for a, b in repo_poll:
+                pages = github_commit_pages(org, repo['name'], repo['default_branch'], a, b)
+                try:
+                    normalized += [normalize_commit(c) for c in pages]
+                except (http_client.CircuitOpenError, deadline.DeadlineExceeded):
+                    # Failing fast or out of time: the remaining repos would be too, so flag the list as incomplete
+                    truncated = stopped = True
                     break
-                page += 1
-        except requests.RequestException:
-            # Skip on error for this repo
-            commits = []
-
-        normalized = []
-        for c in commits:
-            msg = (c.get('commit') or {}).get('message', '')
-            author_name = ((c.get('commit') or {}).get('author') or {}).get('name') or (c.get('author') or {}).get('login') or ''
-            author_date = ((c.get('commit') or {}).get('author') or {}).get('date') or ''
-            normalized.append({
-                'sha': c.get('sha'),
-                'url': c.get('html_url'),
-                'message': msg,
-                'author': author_name,
-                'date': to_utc_iso(author_date)
-            })
+                except requests.RequestException:
+                    # Skip on error for this repo
+                    pass
+                # If the commits endpoint fails (e.g., archived), pages stops early and the repo is skipped
+                cut = cut or pages.truncated
+            if stopped:
+                break
+            for a, b in repo_logged:
+                normalized = merge_commits(normalized, logged_commits(org, a, b, repo=repo['name'], branch=repo['default_branch']))
 
-        if normalized:
-            groups.append({
-                'repo': repo['name'],
-                'url': repo['html_url'],
-                'branch': repo['default_branch'],
-                'commits': normalized
-            })
+            if normalized:
+                add_group(repo['name'], repo['html_url'], repo['default_branch'], normalized, cut)
+                truncated = truncated or cut
 
-    return jsonify({'groups': groups})
+    for log_since, log_until in logged:
+        for c in logged_commits(org, log_since, log_until):
+            if filter_set and c['repo'] not in filter_set:
+                continue
+            add_group(c['repo'], c['repoUrl'], c['branch'], [c])
+
+    return jsonify({'groups': groups, 'truncated': truncated})
 
 # --- Trello proxy ---
 
@@ -234,11 +362,12 @@ def trello_get(url, params=None):
         raise ValueError('Missing TRELLO_KEY/TRELLO_TOKEN')
     params = params or {}
     params.update({'key': key, 'token': token})
-    r = requests.get(url, params=params, timeout=30)
+    r = http_client.cached_get(url, params=params, timeout=30)
     r.raise_for_status()
     return r.json()
 
 @app.route('/api/trello/meeting-notes', methods=['GET', 'POST', 'OPTIONS'])
+@coalesce
 def trello_meeting_notes():
     if request.method == 'OPTIONS':
         return make_response('', 204)
@@ -257,15 +386,15 @@ def trello_meeting_notes():
         return jsonify({'error': 'Missing required params: boardName, listName, since, until'}), 400
 
     try:
-        boards = trello_get('https://api.trello.com/1/members/me/boards')
+        boards = trello_get(f'{trello_api_base()}/members/me/boards', params=dict(fetch_profiles.NAME_ONLY))
         board = next((b for b in boards if (b.get('name') or '').lower() == board_name.lower()), None)
         if not board:
             return jsonify({'error': f'Board not found: {board_name}'}), 404
-        lists = trello_get(f'https://api.trello.com/1/boards/{board.get("id")}/lists')
+        lists = trello_get(f'{trello_api_base()}/boards/{board.get("id")}/lists', params=dict(fetch_profiles.NAME_ONLY))
         lst = next((l for l in lists if (l.get('name') or '').lower() == list_name.lower()), None)
         if not lst:
             return jsonify({'error': f'List not found: {list_name}'}), 404
-        cards = trello_get(f'https://api.trello.com/1/lists/{lst.get("id")}/cards', params={'fields': 'name,desc,dateLastActivity,shortUrl'})
+        cards = trello_get(f'{trello_api_base()}/lists/{lst.get("id")}/cards', params=dict(fetch_profiles.NOTE_CARDS))
 
         since_t = datetime.fromisoformat(since.replace('Z', '+00:00')).timestamp()
         until_t = datetime.fromisoformat(until.replace('Z', '+00:00')).timestamp()
@@ -330,18 +459,15 @@ def trello_meeting_notes():
                 # Include end timestamp (<= until_t)
                 if not act_ts or act_ts < since_t or act_ts > until_t:
                     continue
-            comments = trello_get(f'https://api.trello.com/1/cards/{c.get("id")}/actions', params={'filter': 'commentCard', 'limit': 1000, 'since': since, 'before': until})
-            attachments = trello_get(f'https://api.trello.com/1/cards/{c.get("id")}/attachments')
-            # Added date: earliest create/copy action if available
-            added_date_iso = ''
             try:
-                add_actions = trello_get(f'https://api.trello.com/1/cards/{c.get("id")}/actions', params={'filter': 'all', 'limit': 100})
-                created_events = [a for a in (add_actions or []) if (a.get('type') or '') in {'createCard', 'copyCard'}]
-                if created_events:
-                    earliest = sorted(created_events, key=lambda a: (a.get('date') or ''))[0]
-                    added_date_iso = to_utc_iso(earliest.get('date') or '')
-            except Exception:
-                added_date_iso = ''
+                comments = trello_get(f'{trello_api_base()}/cards/{c.get("id")}/actions', params={**fetch_profiles.COMMENTS, 'limit': 1000, 'since': since, 'before': until})
+                attachments = trello_get(f'{trello_api_base()}/cards/{c.get("id")}/attachments', params=dict(fetch_profiles.ATTACHMENTS))
+            except deadline.DeadlineExceeded:
+                # Out of time: list the card without its details; the response is flagged partial
+                comments, attachments = [], []
+            # Added date: the card id carries its creation time, the same moment as its
+            # createCard/copyCard action, so no action listing is needed
+            added_date_iso = fetch_profiles.created_from_id(c.get('id') or '')
             results.append({
                 'cardId': c.get('id'),
                 'name': c.get('name'),
@@ -368,6 +494,10 @@ def trello_meeting_notes():
                 ],
             })
         return jsonify(results)
+    except http_client.CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except deadline.DeadlineExceeded as e:
+        return budget_exhausted(e)
     except requests.HTTPError as e:
         return jsonify({'error': 'Trello HTTP error', 'details': str(e)}), 502
     except ValueError as e:
@@ -392,16 +522,32 @@ def build_user_content(input_obj):
         return (s[:n] + '…') if len(s) > n else s
     def first_line(s):
         return str(s or '').split('\n')[0].strip()
-    tx = '\n\n'.join([f"- {t.get('filename')}{(' (' + t.get('dateGuess') + ')') if t.get('dateGuess') else ''}\n{slice_text(t.get('text'), 2000)}" for t in transcripts])
-    gh = '\n'.join([f"- {c.get('date')} {c.get('author')}: {first_line(c.get('message'))} ({c.get('url')})" for c in github])
-    def trello_block(c):
-        comments = '\n'.join([f"  * {cm.get('date')} {cm.get('member')}: {cm.get('text')}" for cm in (c.get('comments') or [])])
+    def transcript_entry(t):
+        # Stored transcripts are referenced by id; their prompt excerpt was cut once at upload
+        if t.get('id') and not t.get('text'):
+            rec, text = transcripts_store.get_store().excerpt_for_prompt(t.get('id'))
+            if rec is None:
+                raise ValueError(f"Unknown transcript id: {t.get('id')}")
+            t = {'filename': t.get('filename') or rec['filename'], 'dateGuess': t.get('dateGuess') or rec['dateGuess'], 'excerpt': text}
+        body = t['excerpt'] if 'excerpt' in t else slice_text(t.get('text'), 2000)
+        return f"- {t.get('filename')}{(' (' + t.get('dateGuess') + ')') if t.get('dateGuess') else ''}\n{body}"
+    tx = '\n\n'.join([transcript_entry(t) for t in transcripts])
+    # Near-identical commit messages and comments (cherry-picks, reposted links) go in once, with a count
+    gh = '\n'.join([f"- {c.get('date')} {c.get('author')}: {first_line(c.get('message'))}{near_dupes.similar_suffix(n)} ({c.get('url')})"
+                    for c, n in near_dupes.collapse(github, lambda c: first_line(c.get('message')))])
+    all_comments = [(ci, cm) for ci, c in enumerate(trello) for cm in (c.get('comments') or [])]
+    kept = {}
+    for (ci, cm), n in near_dupes.collapse(all_comments, lambda x: x[1].get('text')):
+        kept.setdefault(ci, []).append((cm, n))
+    def trello_block(ci, c):
+        comments = '\n'.join([f"  * {cm.get('date')} {cm.get('member')}: {cm.get('text')}{near_dupes.similar_suffix(n)}" for cm, n in kept.get(ci, [])])
         atts = '\n'.join([f"  * [{a.get('name')}]({a.get('url')})" for a in (c.get('attachments') or [])])
         return f"- {c.get('dateLastActivity')} {c.get('name')} ({c.get('url')})\n  Desc: {slice_text(c.get('desc'), 500)}\n" + (comments + '\n' if comments else '') + (atts + '\n' if atts else '')
-    tr = '\n\n'.join([trello_block(c) for c in trello])
+    tr = '\n\n'.join([trello_block(ci, c) for ci, c in enumerate(trello)])
     return f"{header}\n\n== Transcripts ==\n{tx}\n\n== GitHub Commits ==\n{gh}\n\n== Trello Meeting Notes ==\n{tr}"
 
 @app.route('/api/trello/board-actions', methods=['GET', 'POST', 'OPTIONS'])
+@coalesce
 def trello_board_actions():
     if request.method == 'OPTIONS':
         return make_response('', 204)
@@ -429,105 +575,36 @@ def trello_board_actions():
         return jsonify({'error': 'Missing required params: boardName, since, until'}), 400
 
     try:
-        boards = trello_get('https://api.trello.com/1/members/me/boards')
+        boards = trello_get(f'{trello_api_base()}/members/me/boards', params=dict(fetch_profiles.NAME_ONLY))
         board = next((b for b in boards if (b.get('name') or '').lower() == board_name.lower()), None)
         if not board:
             return jsonify({'error': f'Board not found: {board_name}'}), 404
 
-        # Build Trello actions request
-        params = {
-            'limit': 1000,
-            'since': since,
-            'before': until,
-        }
-        if types and types.lower() != 'all':
-            params['filter'] = types
-        else:
-            params['filter'] = 'all'
-
-        actions = trello_get(f'https://api.trello.com/1/boards/{board.get("id")}/actions', params=params) or []
-
-        # Normalize list names and target columns
-        def norm(s):
-            return (s or '').strip().lower()
-        # Always include common aliases even when explicit names are provided
-        base_in_progress = {'in progress', 'in-progress', 'doing'}
-        base_completed = {'completed', 'complete', 'done'}
-        target_in_progress = (base_in_progress | ({norm(in_progress_list)} if in_progress_list else set()))
-        target_completed = (base_completed | ({norm(completed_list)} if completed_list else set()))
-
-        def action_card_id(a):
-            return ((a.get('data') or {}).get('card') or {}).get('id')
-
-        def action_list_after(a):
-            d = a.get('data') or {}
-            return ((d.get('listAfter') or {}).get('name')) or ((d.get('list') or {}).get('name'))
-
-        # Filter relevant actions: moved/created into target columns; comments with links; checklist complete; attachments added
-        def is_move_or_create_into_target(a):
-            t = (a.get('type') or '').strip()
-            la = norm(action_list_after(a))
-            return ((t == 'updateCard' and la in target_in_progress.union(target_completed)) or
-                    (t == 'createCard' and la in target_in_progress.union(target_completed)) or
-                    (t == 'copyCard' and la in target_in_progress.union(target_completed)) or
-                    (t == 'moveCardToBoard' and la in target_in_progress.union(target_completed)))
-
-        def is_comment_with_link(a):
-            t = (a.get('type') or '').strip()
-            txt = ((a.get('data') or {}).get('text') or '')
-            return t == 'commentCard' and ('http://' in txt or 'https://' in txt)
-
-        def is_checklist_complete(a):
-            t = (a.get('type') or '').strip()
-            d = (a.get('data') or {})
-            state = ((d.get('checkItem') or {}).get('state') or '').strip().lower()
-            return t == 'updateCheckItemStateOnCard' and state == 'complete'
-
-        def is_attachment_added(a):
-            t = (a.get('type') or '').strip()
-            return t == 'addAttachmentToCard'
-
-        # Build card -> target column map based on move/create/copy/add to target columns
-        def column_key_from_action(a):
-            name = action_list_after(a)
-            n = norm(name)
-            if n in target_in_progress:
-                return 'In Progress'
-            if n in target_completed:
-                return 'Completed'
-            return None
-
-        card_target_map = {}
-        for a in actions:
-            if is_move_or_create_into_target(a):
-                cid = action_card_id(a)
-                col = column_key_from_action(a)
-                if cid and col:
-                    prev = card_target_map.get(cid)
-                    # Prefer Completed when conflicting; otherwise use latest seen
-                    if prev != 'Completed':
-                        card_target_map[cid] = col
-
-        # Now filter actions strictly to target cards; always include the qualifying move/create actions
-        filtered = []
-        for a in actions:
-            if is_move_or_create_into_target(a):
-                filtered.append(a)
-                continue
-            cid = action_card_id(a)
-            if cid in card_target_map and (is_comment_with_link(a) or is_checklist_complete(a) or is_attachment_added(a)):
-                filtered.append(a)
+        # Build Trello actions request: only the action types and fields the classifier reads
+        params = fetch_profiles.board_actions(since, until, types)
 
-        # Group by target column and card
-        # Build a map: { column_key: { cardId: { meta, actions: [] } } }
-        groups_map = {}
+        # Webhook event log answers the covered parts of the window; poll only the gaps
+        poll, logged = webhook_window(['trello:' + board.get('id')], since, until, synced=['trello:' + board.get('id')])
+        actions = []
+        for poll_since, poll_until in poll:
+            actions += trello_get(f'{trello_api_base()}/boards/{board.get("id")}/actions',
+                                  params={**params, 'since': poll_since, 'before': poll_until}) or []
+        wanted = [t.strip() for t in params['filter'].split(',') if t.strip()]
+        for log_since, log_until in logged:
+            actions += event_log.get_event_log().trello_actions(board.get('id'), log_since, log_until, wanted)
+        if len(poll) + len(logged) > 1:
+            unique = {}
+            for a in actions:
+                unique.setdefault(a.get('id'), a)
+            actions = sorted(unique.values(), key=lambda a: a.get('date') or '', reverse=True)
+
+        # Classify and group in one pass; detail activity is kept only on target cards
+        grouped = trello_rules.ActionRules(in_progress_list, completed_list).group(actions)
 
         # Fetch minimal list map for board to resolve list names by id
-        lists = trello_get(f'https://api.trello.com/1/boards/{board.get("id")}/lists')
+        lists = trello_get(f'{trello_api_base()}/boards/{board.get("id")}/lists', params=dict(fetch_profiles.NAME_ONLY))
         list_id_to_name = {l.get('id'): (l.get('name') or '') for l in (lists or [])}
 
-        # Group strictly by target column using card_target_map
-
         # Cache for card metadata
         card_meta_cache = {}
 
@@ -535,10 +612,12 @@ def trello_board_actions():
             if not card_id:
                 return None
             if card_id in card_meta_cache:
+                metrics.record_cache('card_meta', True)
                 return card_meta_cache[card_id]
+            metrics.record_cache('card_meta', False)
             try:
                 info = trello_get(
-                    f'https://api.trello.com/1/cards/{card_id}',
+                    f'{trello_api_base()}/cards/{card_id}',
                     params={
                         'fields': 'name,shortUrl,idList,labels',
                         'members': 'true',
@@ -570,51 +649,22 @@ def trello_board_actions():
             except Exception:
                 return None
 
-        def pick_action(a):
-            data = a.get('data') or {}
-            card = data.get('card') or {}
-            list_name = (data.get('list') or {}).get('name') or ((data.get('listAfter') or {}).get('name'))
-            return {
-                'date': a.get('date'),
-                'type': a.get('type'),
-                'member': (a.get('memberCreator') or {}).get('fullName'),
-                'cardId': card.get('id'),
-                'card': card.get('name'),
-                'list': list_name,
-                'text': data.get('text'),
-                'attachment': (data.get('attachment') or {}),
-                'checkItemName': ((data.get('checkItem') or {}).get('name'))
-            }
-
-        for a in filtered:
-            cid_for_group = action_card_id(a)
-            col_key = card_target_map.get(cid_for_group) or column_key_from_action(a)
-            if col_key not in groups_map:
-                groups_map[col_key] = {}
-            pa = pick_action(a)
-            cid = pa.get('cardId')
-            if cid not in groups_map[col_key]:
-                meta = get_card_meta(cid) or {'cardId': cid, 'name': pa.get('card'), 'url': '', 'owners': [], 'labels': [], 'completion': {'completed': 0, 'total': 0}}
-                groups_map[col_key][cid] = { 'meta': meta, 'actions': [] }
-            groups_map[col_key][cid]['actions'].append(pa)
-
-        # Convert map to array
         result_groups = []
-        for col, cards_map in groups_map.items():
+        for col, cards_in_col in grouped:
             cards = []
-            for _, entry in cards_map.items():
-                cards.append({ **entry['meta'], 'actions': entry['actions'] })
+            for cid, acts in cards_in_col:
+                picked = [trello_rules.pick_action(a) for a in acts]
+                meta = get_card_meta(cid) or {'cardId': cid, 'name': picked[0].get('card'), 'url': '', 'owners': [], 'labels': [], 'completion': {'completed': 0, 'total': 0}}
+                cards.append({ **meta, 'actions': picked })
             # Sort cards by name for stable output
             cards.sort(key=lambda x: (x.get('name') or '').lower())
             result_groups.append({ 'column': col, 'cards': cards })
 
-        # Sort groups by desired order
-        # Ensure only the two target columns are present and ordered
-        order = {'In Progress': 0, 'Completed': 1}
-        result_groups = [g for g in result_groups if g['column'] in order]
-        result_groups.sort(key=lambda g: order.get(g['column'], 99))
-
         return jsonify({'groups': result_groups})
+    except http_client.CircuitOpenError as e:
+        return upstream_unavailable(e)
+    except deadline.DeadlineExceeded as e:
+        return budget_exhausted(e)
     except requests.HTTPError as e:
         return jsonify({'error': 'Trello HTTP error', 'details': str(e)}), 502
     except ValueError as e:
@@ -622,39 +672,431 @@ def trello_board_actions():
     except Exception as e:
         return jsonify({'error': 'Unexpected trello error', 'details': str(e)}), 500
 
-@app.route('/api/openai/summarize', methods=['POST', 'OPTIONS'])
-def openai_summarize():
+# --- Transcripts ---
+
+def transcript_max_bytes():
+    return transcripts_store.max_upload_bytes()
+
+@app.route('/api/transcripts', methods=['GET', 'POST', 'OPTIONS'])
+def transcripts_upload():
     if request.method == 'OPTIONS':
         return make_response('', 204)
+    store = transcripts_store.get_store()
+    if request.method == 'GET':
+        return jsonify({'transcripts': [transcripts_store.public(r) for r in store.list(int(request.args.get('limit') or '100'))]})
+    if request.content_length and request.content_length > transcript_max_bytes():
+        return jsonify({'error': f'Upload larger than {transcript_max_bytes()} bytes'}), 413
     try:
-        data = request.get_json(force=True) or {}
-        system_prompt = (data.get('systemPrompt') or '').strip()
-        input_obj = data.get('input') or {}
-        if not system_prompt:
-            return jsonify({'error': 'Missing systemPrompt'}), 400
-        api_key = os.getenv('OPENAI_API_KEY', '').strip()
-        if not api_key:
-            return jsonify({'error': 'Missing OPENAI_API_KEY'}), 400
-        user_content = build_user_content(input_obj)
-        body = {
-            'model': 'gpt-4o-mini',
-            'messages': [
-                { 'role': 'system', 'content': system_prompt },
-                { 'role': 'user', 'content': user_content }
-            ],
-            'temperature': 0.2,
-        }
-        r = requests.post('https://api.openai.com/v1/chat/completions', json=body, headers={
+        out = []
+        if request.mimetype == 'multipart/form-data':
+            # multipart/form-data: one or more "file" parts (spooled to disk by werkzeug when large)
+            for f in request.files.getlist('file'):
+                rec, deduped = store.add(f.filename, f.stream)
+                out.append({**rec, 'deduped': deduped})
+        else:
+            # Any other body is the file itself (?filename=...), read straight from the request stream
+            filename = (request.args.get('filename') or '').strip()
+            if not filename:
+                return jsonify({'error': 'Missing file part or filename param'}), 400
+            rec, deduped = store.add(filename, request.stream)
+            out.append({**rec, 'deduped': deduped})
+        if not out:
+            return jsonify({'error': 'No files uploaded'}), 400
+        return jsonify({'transcripts': out})
+    except transcripts_store.UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/transcripts/<tid>', methods=['GET'])
+def transcript_get(tid):
+    store = transcripts_store.get_store()
+    rec = store.get(tid)
+    if rec is None:
+        return jsonify({'error': 'Transcript not found'}), 404
+    if request.args.get('text') in ('1', 'true'):
+        return send_file(store.text_path(tid), mimetype='text/plain; charset=utf-8', download_name=rec['filename'] + '.txt')
+    return jsonify(transcripts_store.public(rec))
+
+def summarize_job(payload):
+    # Job handler: one chat completion. Rate limits, 5xx and connection errors are retried by the queue.
+    api_key = os.getenv('OPENAI_API_KEY', '').strip()
+    body = {
+        'model': payload.get('model') or 'gpt-4o-mini',
+        'messages': [
+            { 'role': 'system', 'content': payload['systemPrompt'] },
+            { 'role': 'user', 'content': payload['userContent'] }
+        ],
+        'temperature': 0.2,
+    }
+    try:
+        r = http_client.post(f'{openai_api_base()}/chat/completions', json=body, headers={
             'Authorization': f'Bearer {api_key}',
             'Content-Type': 'application/json'
         }, timeout=60)
-        if r.status_code >= 400:
-            return jsonify({'error': f'OpenAI HTTP {r.status_code}', 'details': r.text}), r.status_code
-        data = r.json()
-        text = (((data.get('choices') or [{}])[0]).get('message') or {}).get('content') or ''
-        return jsonify({'text': text})
-    except Exception as e:
-        return jsonify({'error': 'Unexpected openai error', 'details': str(e)}), 500
+    except http_client.CircuitOpenError as e:
+        raise jobs.RetryableError(str(e), retry_after=e.retry_after)
+    except requests.RequestException as e:
+        raise jobs.RetryableError(f'OpenAI request failed: {e}')
+    if r.status_code == 429 or r.status_code >= 500:
+        try:
+            retry_after = float(r.headers.get('Retry-After') or '')
+        except ValueError:
+            retry_after = None
+        raise jobs.RetryableError(f'OpenAI HTTP {r.status_code}', retry_after=retry_after)
+    if r.status_code >= 400:
+        raise RuntimeError(f'OpenAI HTTP {r.status_code}: {r.text[:500]}')
+    data = r.json()
+    metrics.record_llm_usage(data.get('model') or body['model'], data.get('usage'))
+    return {'text': (((data.get('choices') or [{}])[0]).get('message') or {}).get('content') or ''}
+
+job_queue = jobs.get_queue()
+job_queue.register('summarize', summarize_job)
+
+def submit_summarize():
+    # -> (job, deduped) or an error response. The prompt is built here, so bad input fails the request, not the job.
+    data = request.get_json(force=True) or {}
+    system_prompt = (data.get('systemPrompt') or '').strip()
+    if not system_prompt:
+        return jsonify({'error': 'Missing systemPrompt'}), 400
+    if not os.getenv('OPENAI_API_KEY', '').strip():
+        return jsonify({'error': 'Missing OPENAI_API_KEY'}), 400
+    user_content = build_user_content(data.get('input') or {})
+    return job_queue.submit('summarize', {'systemPrompt': system_prompt, 'userContent': user_content})
+
+def job_wait_seconds(default=0.0):
+    # ?wait=N long-polls for up to N seconds (capped below gunicorn's request timeout)
+    try:
+        wait = float(request.args.get('wait') or default)
+    except ValueError:
+        wait = default
+    return min(max(wait, 0.0), float(os.getenv('JOBS_MAX_WAIT_SECONDS') or '25'))
+
+@app.route('/api/openai/summarize/jobs', methods=['POST', 'OPTIONS'])
+def openai_summarize_submit():
+    if request.method == 'OPTIONS':
+        return make_response('', 204)
+    try:
+        out = submit_summarize()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not isinstance(out[0], dict):
+        return out
+    job, deduped = out
+    job = job_queue.wait(job['id'], job_wait_seconds())
+    resp = jsonify({**job, 'deduped': deduped})
+    resp.status_code = 200 if job['status'] in (jobs.DONE, jobs.FAILED) else 202
+    resp.headers['Location'] = f"/api/jobs/{job['id']}"
+    return resp
+
+@app.route('/api/jobs/<jid>', methods=['GET'])
+def job_get(jid):
+    job = job_queue.wait(jid, job_wait_seconds())
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs', methods=['GET'])
+def jobs_status():
+    # Queue depth by status, age of the oldest queued job and the most recent jobs (all workers)
+    return jsonify(job_queue.stats(int(request.args.get('limit') or '20')))
+
+@app.route('/api/openai/summarize', methods=['POST', 'OPTIONS'])
+def openai_summarize():
+    # Synchronous form for older clients: submits a job and waits for it
+    if request.method == 'OPTIONS':
+        return make_response('', 204)
+    try:
+        out = submit_summarize()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not isinstance(out[0], dict):
+        return out
+    job = job_queue.wait(out[0]['id'], float(os.getenv('JOBS_SYNC_WAIT_SECONDS') or '90'))
+    if job['status'] == jobs.DONE:
+        return jsonify(job['result'])
+    if job['status'] == jobs.FAILED:
+        return jsonify({'error': 'OpenAI summarize failed', 'details': job.get('error'), 'jobId': job['id']}), 502
+    resp = jsonify({'error': 'Summary still in progress', 'jobId': job['id'], 'status': job['status']})
+    resp.status_code = 202
+    resp.headers['Location'] = f"/api/jobs/{job['id']}"
+    return resp
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    # Full-text search over indexed digests and meeting notes (filled by create_daily_card.py --search-index)
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'error': 'Missing q'}), 400
+    kind = request.args.get('kind') or None
+    if kind not in (None, search_index.DIGEST, search_index.NOTE):
+        return jsonify({'error': f'Unknown kind: {kind}'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit') or '20'), 100))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    # Documents carry a day, so ISO timestamps are compared by their date part
+    since, until = (request.args.get(k, '')[:10] or None for k in ('since', 'until'))
+    t0 = time.perf_counter()
+    hits = search_index.get_index().search(q, limit, kind, since, until, request.args.get('target') or None)
+    return jsonify({'query': q, 'hits': hits, 'tookMs': round((time.perf_counter() - t0) * 1000, 2)})
+
+@app.route('/api/search/documents', methods=['POST'])
+def search_ingest():
+    # The nightly job builds its index in CI and sends its documents here (SEARCH_INGEST_URL)
+    token = os.getenv('SEARCH_INGEST_TOKEN', '').strip()
+    if not token:
+        return jsonify({'error': 'Search ingest is disabled (SEARCH_INGEST_TOKEN not set)'}), 403
+    if not hmac.compare_digest((request.headers.get('Authorization') or '').encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+        return jsonify({'error': 'Invalid ingest token'}), 401
+    docs = (request.get_json(silent=True) or {}).get('documents')
+    if not isinstance(docs, list):
+        return jsonify({'error': 'Missing documents'}), 400
+    for d in docs:
+        if not isinstance(d, dict) or not d.get('key') or d.get('kind') not in (search_index.DIGEST, search_index.NOTE):
+            return jsonify({'error': 'Each document needs a key and a kind of digest or note'}), 400
+    index = search_index.get_index()
+    counts = {'added or updated': 0, 'unchanged': 0}
+    for d in docs:
+        changed = index.add(d['key'], d['kind'], d.get('title') or '', d.get('body') or '',
+                            url=d.get('url'), date=d.get('date'), target=d.get('target'))
+        counts['added or updated' if changed else 'unchanged'] += 1
+    return jsonify(counts)
+
+# --- webhooks ---
+
+def webhook_window(sources, since, until, synced=()):
+    # -> (poll, logged): sub-windows to poll and to read from the event log, given what the log
+    # holds for this query: the coverage spans of the webhook sources that can answer it, and
+    # the windows the background prefetcher synced for the sources in synced
+    hooks = [s for s in sources if os.getenv('GITHUB_WEBHOOK_SECRET' if s.startswith('github:') else 'TRELLO_WEBHOOK_SECRET', '').strip()]
+    synced = list(synced) if prefetcher is not None else []
+    if not hooks and not synced:
+        return [(since, until)], []
+    try:
+        log = event_log.get_event_log()
+        spans = [span for src in hooks for span in log.spans(src)]
+        spans += [w for w in (log.synced(src) for src in synced) if w]
+    except Exception:
+        return [(since, until)], []
+    return event_log.split_window(since, until, spans)
+
+def logs_branch(owner, repo, branch):
+    # -> True when webhook pushes for this branch are logged: it is the repo's default branch
+    if not os.getenv('GITHUB_WEBHOOK_SECRET', '').strip():
+        return False
+    try:
+        return event_log.get_event_log().default_branch(owner, repo) == branch
+    except Exception:
+        return False
+
+def logged_commits(owner, since, until, repo=None, branch=None):
+    return event_log.get_event_log().commits(owner, since, until, repo=repo, branch=branch)
+
+def merge_commits(commits, extra):
+    seen = {c.get('sha') for c in commits}
+    merged = commits + [{k: c[k] for k in ('sha', 'url', 'message', 'author', 'date')} for c in extra if c.get('sha') not in seen]
+    merged.sort(key=lambda c: c.get('date') or '', reverse=True)
+    return merged
+
+def verify_github_signature(body, header):
+    secret = os.getenv('GITHUB_WEBHOOK_SECRET', '').strip()
+    if not secret or not header.startswith('sha256='):
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, header[len('sha256='):])
+
+def verify_trello_signature(body, header, callback_url):
+    # Trello signs base64(HMAC-SHA1(app secret, body + callbackURL))
+    secret = os.getenv('TRELLO_WEBHOOK_SECRET', '').strip()
+    if not secret or not header:
+        return False
+    digest = hmac.new(secret.encode('utf-8'), body + callback_url.encode('utf-8'), hashlib.sha1).digest()
+    return hmac.compare_digest(base64.b64encode(digest).decode('ascii'), header)
+
+def webhook_payload(body):
+    # -> the JSON object a delivery carries, or None when it is not one
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+@app.route('/webhooks/github', methods=['POST'])
+def webhook_github():
+    body = request.get_data()
+    if not verify_github_signature(body, request.headers.get('X-Hub-Signature-256', '')):
+        metrics.inc('webhook_events_total', {'source': 'github', 'result': 'rejected'})
+        return jsonify({'error': 'Invalid signature'}), 401
+    event = request.headers.get('X-GitHub-Event', '')
+    payload = webhook_payload(body)
+    if payload is None:
+        metrics.inc('webhook_events_total', {'source': 'github', 'result': 'malformed'})
+        return jsonify({'error': 'Malformed JSON body'}), 400
+    log = event_log.get_event_log()
+    # Any delivery (pings and other events too) keeps the hook's coverage alive. Repo hook
+    # payloads name the organization as well, but only an org hook sees every repo in it.
+    if request.headers.get('X-GitHub-Hook-Installation-Target-Type', '') == 'organization':
+        org = ((payload.get('organization') or {}).get('login') or '').lower()
+        if org:
+            log.touch(f'github:{org}')
+    else:
+        repo_full = ((payload.get('repository') or {}).get('full_name') or '').lower()
+        if repo_full:
+            log.touch(f'github:{repo_full}')
+    stored = 0
+    if event == 'push':
+        owner, repo, branch, default_branch, repo_url, commits = event_log.normalize_push(payload)
+        if owner and repo and default_branch:
+            log.set_default_branch(owner, repo, default_branch)
+        # The digest reports default-branch history only
+        if owner and repo and branch and branch == default_branch:
+            stored = log.add_commits(owner, repo, branch, repo_url, commits)
+    metrics.inc('webhook_events_total', {'source': 'github', 'result': event or 'unknown'})
+    return jsonify({'ok': True, 'event': event, 'stored': stored})
+
+@app.route('/webhooks/trello', methods=['HEAD', 'POST'])
+def webhook_trello():
+    if request.method == 'HEAD':
+        # Trello probes the callback with HEAD when the webhook is created
+        return make_response('', 200)
+    body = request.get_data()
+    callback_url = os.getenv('TRELLO_WEBHOOK_CALLBACK_URL', '').strip() or request.base_url
+    if not verify_trello_signature(body, request.headers.get('X-Trello-Webhook', ''), callback_url):
+        metrics.inc('webhook_events_total', {'source': 'trello', 'result': 'rejected'})
+        return jsonify({'error': 'Invalid signature'}), 401
+    payload = webhook_payload(body)
+    if payload is None:
+        metrics.inc('webhook_events_total', {'source': 'trello', 'result': 'malformed'})
+        return jsonify({'error': 'Malformed JSON body'}), 400
+    action = payload.get('action') or {}
+    board_id = (payload.get('model') or {}).get('id') or (((action.get('data') or {}).get('board') or {}).get('id')) or ''
+    stored = 0
+    if board_id:
+        log = event_log.get_event_log()
+        log.touch(f'trello:{board_id}')
+        stored = log.add_trello_action(board_id, action)
+    metrics.inc('webhook_events_total', {'source': 'trello', 'result': action.get('type') or 'unknown'})
+    return jsonify({'ok': True, 'stored': stored})
+
+@app.route('/api/webhooks/coverage', methods=['GET'])
+def webhook_coverage():
+    return jsonify({'coverage': event_log.get_event_log().coverage_all()})
+
+# --- background prefetch ---
+
+PREFETCH_ORG = os.getenv('PREFETCH_ORG', 'zcashme')
+PREFETCH_BOARD = os.getenv('PREFETCH_BOARD', 'Zcash Me')
+SYNC_OVERLAP = timedelta(minutes=5)  # commits can be listed a little after their timestamp
+SYNC_FRESH = timedelta(minutes=1)  # a source synced this recently is current (a slot syncs its windows in turn)
+prefetcher = None
+
+def sync_source(log, source, since, until, poll):
+    # Polls into the log only what its synced window for source lacks of [since, until]:
+    # after the first sync of the day, the activity since the last one
+    have = log.synced(source)
+    if not have or until < have[0] or since > have[1]:
+        gaps = [(since, until)]
+    else:
+        gaps = [(since, have[0])] if since < have[0] else []
+        if until > have[1] and event_log.parse_ts(until) - event_log.parse_ts(have[1]) >= SYNC_FRESH:
+            gaps.append((event_log.to_ms_z((event_log.parse_ts(have[1]) - SYNC_OVERLAP).isoformat()), until))
+        else:
+            until = min(until, have[1])
+    for a, b in gaps:
+        poll(a, b)
+    log.mark_synced(source, since, until)
+
+def sync_repo_commits(log, owner, repo, branch, url, since, until):
+    pages = github_commit_pages(owner, repo, branch, since, until)
+    commits = [normalize_commit(c) for c in pages]
+    if pages.truncated:
+        raise RuntimeError(f'{owner}/{repo}: commit listing truncated')
+    if pages.error is not None and pages.error.status_code != 409:  # 409: empty repository
+        raise RuntimeError(f'{owner}/{repo}: GitHub HTTP {pages.error.status_code}')
+    log.add_commits(owner, repo, branch, url, commits)
+
+def sync_window(since, until):
+    # Brings the event log up to date for the prefetched sources over [since, until], as far as now
+    log = event_log.get_event_log()
+    since, until = event_log.to_ms_z(since), min(event_log.to_ms_z(until), event_log.to_ms_z(event_log.now_z()))
+    if until <= since:
+        return
+    failed = []
+    sync_source(log, event_log.branch_source('ZcashUsersGroup', 'zcashme', 'main'), since, until, lambda a, b: sync_repo_commits(
+        log, 'ZcashUsersGroup', 'zcashme', 'main', 'https://github.com/ZcashUsersGroup/zcashme', a, b))
+
+    # Synced per repo on its default branch, never as the whole org: a query for any other repo
+    # or branch, or for more repos than these, still polls what it needs
+    repo_pages = github_org_repo_pages(PREFETCH_ORG)
+    selected = select_repos(repo_pages, None, 50)
+    if repo_pages.error is not None:
+        raise RuntimeError(f'{PREFETCH_ORG}: GitHub HTTP {repo_pages.error.status_code} listing repos')
+    for r in selected:
+        log.set_default_branch(PREFETCH_ORG, r['name'], r['default_branch'])
+        try:
+            sync_source(log, event_log.branch_source(PREFETCH_ORG, r['name'], r['default_branch']), since, until,
+                        lambda a, b, r=r: sync_repo_commits(log, PREFETCH_ORG, r['name'], r['default_branch'], r['html_url'], a, b))
+        except Exception as e:
+            failed.append(f"{r['name']}: {e}")
+
+    boards = trello_get(f'{trello_api_base()}/members/me/boards', params=dict(fetch_profiles.NAME_ONLY))
+    board = next((b for b in boards if (b.get('name') or '').lower() == PREFETCH_BOARD.lower()), None)
+    if not board:
+        raise ValueError(f'Board not found: {PREFETCH_BOARD}')
+
+    def poll_board(a, b):
+        params = fetch_profiles.board_actions(a, b, 'all')
+        actions = trello_get(f'{trello_api_base()}/boards/{board["id"]}/actions', params=params) or []
+        if len(actions) >= params['limit']:
+            raise RuntimeError(f'{PREFETCH_BOARD}: more than {params["limit"]} actions in {a}..{b}')
+        for action in actions:
+            log.add_trello_action(board['id'], action)
+    sync_source(log, 'trello:' + board['id'], since, until, poll_board)
+    if failed:
+        raise RuntimeError('; '.join(failed))
+
+def warm_window(since, until):
+    # Syncs the window into the event log (only the delta once it was synced before), then calls
+    # the real handlers with the same params the frontend sends. They read the synced part from
+    # the log and poll only the still-open tail; what else they fetch (repo and list lookups,
+    # card details, meeting notes) is left in the shared cache for the next page load. A closed
+    # window keeps that for PREFETCH_TTL_SECONDS; an open one only PREFETCH_OPEN_TTL_SECONDS,
+    # as it is still changing.
+    open_ttl = int(os.getenv('PREFETCH_OPEN_TTL_SECONDS') or prefetcher.interval.total_seconds())
+    with http_client.cache_policy(refresh=True, ttl=open_ttl):
+        sync_window(since, until)
+    if event_log.to_ms_z(until) > event_log.to_ms_z(event_log.now_z()):
+        policy = http_client.cache_policy(ttl=open_ttl)
+    else:
+        policy = http_client.cache_policy(refresh=True, ttl=int(os.getenv('PREFETCH_TTL_SECONDS') or '7200'))
+    client = app.test_client()
+    with policy:
+        client.get('/api/github/commits', query_string={'owner': 'ZcashUsersGroup', 'repo': 'zcashme', 'branch': 'main', 'since': since, 'until': until})
+        client.get('/api/github/org-commits', query_string={'org': PREFETCH_ORG, 'since': since, 'until': until, 'maxRepos': '50'})
+        client.get('/api/trello/meeting-notes', query_string={'boardName': PREFETCH_BOARD, 'listName': 'Meeting Notes', 'since': since, 'until': until})
+        client.get('/api/trello/board-actions', query_string={'boardName': PREFETCH_BOARD, 'since': since, 'until': until, 'types': 'all', 'inProgressList': 'In Progress', 'completedList': 'Completed'})
+
+@app.route('/api/prefetch/status', methods=['GET'])
+def prefetch_status():
+    if prefetcher is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **prefetcher.status, 'synced': event_log.get_event_log().synced_all()})
+
+if os.getenv('PREFETCH_ENABLED', '').strip().lower() in ('1', 'true', 'yes'):
+    prefetcher = prefetch.from_env(warm_window)
+    prefetcher.start()
+
+@app.route('/api/upstreams/status', methods=['GET'])
+def upstreams_status():
+    # Per-host breaker state, recent latency percentiles and hedging counts (this worker only)
+    return jsonify(resilience.status())
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    resp = make_response(metrics.render_prometheus(), 200)
+    resp.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return resp
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '8000'))